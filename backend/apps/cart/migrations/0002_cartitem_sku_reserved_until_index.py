@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cart", "0001_initial"),
+        ("products", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cartitem",
+            index=models.Index(
+                fields=["sku", "reserved_until"], name="cart_cartit_sku_id_7b0557_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:25
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def detach_duplicate_session_carts(apps, schema_editor):
+    """
+    Keep the most recently updated cart per session_id. Older duplicates
+    get a unique session_id so they expire (and release their
+    reservations) through the regular cleanup task.
+    """
+    Cart = apps.get_model("cart", "Cart")
+
+    duplicated = (
+        Cart.objects.values("session_id")
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+        .values_list("session_id", flat=True)
+    )
+
+    for session_id in duplicated:
+        carts = Cart.objects.filter(session_id=session_id).order_by("-updated_at")
+        for cart in carts[1:]:
+            Cart.objects.filter(id=cart.id).update(
+                session_id=f"{session_id}:detached:{cart.id}"[:255]
+            )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cart", "0002_cartitem_sku_reserved_until_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(detach_duplicate_session_carts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="cart",
+            name="session_id",
+            field=models.CharField(
+                help_text="Session identifier for anonymous carts",
+                max_length=255,
+                unique=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cart", "0003_cart_session_id_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cart",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Incremented on every cart mutation (lets clients apply deltas)",
+            ),
+        ),
+    ]
@@ -1,10 +1,42 @@
 from django.db import models, transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Coalesce, NullIf
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 from apps.core.models import TimeStampedModel
 from apps.core.exceptions import InsufficientStockError, CartExpiredError
+from apps.core.db import upsert_returning
 from apps.products.models import SKU
+from . import reservation_queue
+
+
+class CartManager(models.Manager):
+    def resolve_for_session(self, session_id, extend=False):
+        """
+        Return the active cart for a session, creating it if needed.
+
+        The common case is a single read by the unique session_id. Missing
+        carts (and, with extend=True, carts whose expiry is due for an
+        extension) go through one INSERT ... ON CONFLICT (session_id)
+        DO UPDATE ... RETURNING, so concurrent requests never create
+        duplicate carts.
+        """
+        cart = self.filter(session_id=session_id).first()
+
+        if cart is not None:
+            if cart.is_expired:
+                # Clean up expired cart and create new one
+                cart.clear()
+                cart.delete()
+            elif not (extend and cart.expiry_extension_due):
+                return cart
+
+        return upsert_returning(
+            Cart(session_id=session_id, expires_at=Cart.next_expiry()),
+            conflict_fields=['session_id'],
+            update_fields=['expires_at', 'updated_at']
+        )
 
 
 class Cart(TimeStampedModel):
@@ -14,7 +46,7 @@ class Cart(TimeStampedModel):
     """
     session_id = models.CharField(
         max_length=255,
-        db_index=True,
+        unique=True,
         help_text="Session identifier for anonymous carts"
     )
 
@@ -32,6 +64,13 @@ class Cart(TimeStampedModel):
         help_text="Cart expiration timestamp"
     )
 
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text="Incremented on every cart mutation (lets clients apply deltas)"
+    )
+
+    objects = CartManager()
+
     class Meta:
         indexes = [
             models.Index(fields=['session_id', 'expires_at']),
@@ -43,11 +82,14 @@ class Cart(TimeStampedModel):
 
     def save(self, *args, **kwargs):
         if not self.expires_at:
-            self.expires_at = timezone.now() + timedelta(
-                days=settings.CART_EXPIRY_DAYS
-            )
+            self.expires_at = self.next_expiry()
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def next_expiry():
+        """Expiration timestamp for a cart touched now."""
+        return timezone.now() + timedelta(days=settings.CART_EXPIRY_DAYS)
+
     @property
     def is_expired(self):
         """Check if cart has expired."""
@@ -63,10 +105,43 @@ class Cart(TimeStampedModel):
         """Total number of items in cart."""
         return sum(item.quantity for item in self.items.all())
 
+    @property
+    def expiry_extension_due(self):
+        """
+        Whether extending the expiry would move it by more than the
+        configured slack. Smaller moves are skipped to avoid a write
+        on every interaction.
+        """
+        slack = timedelta(minutes=settings.CART_EXPIRY_EXTENSION_SLACK_MINUTES)
+        return self.next_expiry() - self.expires_at > slack
+
+    def bump_version(self):
+        """Record a mutation so clients holding an older version refetch."""
+        Cart.objects.filter(id=self.id).update(version=F('version') + 1)
+
+    def totals(self):
+        """
+        Version and totals computed in a single aggregate query,
+        without loading the lines.
+        """
+        return Cart.objects.filter(id=self.id).annotate(
+            items_quantity=Coalesce(Sum('items__quantity'), 0),
+            items_subtotal_cents=Coalesce(
+                Sum(F('items__quantity') * F('items__unit_price_cents')), 0
+            ),
+        ).values('version', 'items_quantity', 'items_subtotal_cents').get()
+
     def extend_expiry(self):
-        """Extend cart expiration when user interacts with it."""
-        self.expires_at = timezone.now() + timedelta(days=settings.CART_EXPIRY_DAYS)
+        """
+        Extend cart expiration when user interacts with it.
+        Returns True if the new expiry was written.
+        """
+        if not self.expiry_extension_due:
+            return False
+
+        self.expires_at = self.next_expiry()
         self.save(update_fields=['expires_at', 'updated_at'])
+        return True
 
     @transaction.atomic
     def clear(self, release_reservations=True):
@@ -82,12 +157,205 @@ class Cart(TimeStampedModel):
         - After checkout: cart.clear(release_reservations=False)
         - Expired cart cleanup: cart.clear(release_reservations=True) [default]
         """
+        if not release_reservations:
+            # Reservation already handled (e.g., consumed during checkout)
+            self.items.all().delete()
+            return
+
         for item in self.items.all():
-            if release_reservations:
-                item.release_and_delete()
-            else:
-                # Reservation already handled (e.g., consumed during checkout)
-                item.delete()
+            item.release_and_delete()
+
+    def revalidate_prices(self, apply=None):
+        """
+        Compare every line's price snapshot with the SKU's current effective
+        price in one query, and (in 'apply' mode) update all stale lines in
+        one statement.
+
+        Args:
+            apply: Update stale snapshots. Defaults to
+                   settings.CART_PRICE_REVALIDATION_MODE == 'apply';
+                   otherwise differences are only reported.
+
+        Returns:
+            List of price changes:
+            [{'item_id', 'sku_id', 'old_unit_price_cents', 'new_unit_price_cents'}]
+        """
+        if apply is None:
+            apply = settings.CART_PRICE_REVALIDATION_MODE == 'apply'
+
+        # Mirrors SKU.effective_price_cents (a 0 sale price means no sale)
+        current_price = Coalesce(
+            NullIf('sku__sale_price_cents', Value(0)),
+            'sku__price_cents'
+        )
+
+        stale = list(
+            CartItem.objects.filter(cart=self).annotate(
+                current_price_cents=current_price
+            ).exclude(
+                unit_price_cents=F('current_price_cents')
+            ).values('id', 'sku_id', 'unit_price_cents', 'current_price_cents')
+        )
+
+        if stale and apply:
+            CartItem.objects.filter(id__in=[line['id'] for line in stale]).update(
+                unit_price_cents=Case(*[
+                    When(id=line['id'], then=Value(line['current_price_cents']))
+                    for line in stale
+                ]),
+                updated_at=timezone.now()
+            )
+
+        return [
+            {
+                'item_id': str(line['id']),
+                'sku_id': str(line['sku_id']),
+                'old_unit_price_cents': line['unit_price_cents'],
+                'new_unit_price_cents': line['current_price_cents'],
+            }
+            for line in stale
+        ]
+
+    @transaction.atomic
+    def merge(self, source):
+        """
+        Merge another cart (typically the anonymous session cart) into this
+        one, e.g. when the user logs in.
+
+        Quantities are summed per SKU. Units still under an active lease
+        are already held; units from lapsed leases must fit into current
+        availability again. Each SKU gets a single net reservation delta and
+        all line changes are applied with set-based statements.
+
+        Returns:
+            List of conflicts for SKUs that could not be fully merged:
+            [{'sku_id', 'requested', 'merged'}]
+        """
+        from apps.inventory.models import Inventory
+
+        now = timezone.now()
+        reserved_until = now + timedelta(minutes=settings.CART_RESERVATION_TIMEOUT_MINUTES)
+
+        lines = CartItem.objects.filter(cart__in=[self, source])
+        inventories = {
+            inventory.sku_id: inventory
+            for inventory in Inventory.objects.filter(
+                sku_id__in=lines.values('sku_id')
+            ).lock_with_lapsed_reservations()
+        }
+
+        # Read the lines under the lock: leases may have been renewed meanwhile
+        lines_by_sku = {}
+        for line in lines:
+            lines_by_sku.setdefault(line.sku_id, []).append(line)
+
+        deltas = {}
+        conflicts = []
+        kept, removed = [], []
+
+        for sku_id, lines in lines_by_sku.items():
+            held = sum(line.quantity for line in lines if line.reserved_until > now)
+            lapsed = sum(line.quantity for line in lines if line.reserved_until <= now)
+
+            inventory = inventories.get(sku_id)
+            available = inventory.quantity_available if inventory else 0
+            reacquired = min(lapsed, available)
+            merged = held + reacquired
+
+            if reacquired < lapsed:
+                deltas[sku_id] = reacquired - lapsed
+                conflicts.append({
+                    'sku_id': str(sku_id),
+                    'requested': held + lapsed,
+                    'merged': merged,
+                })
+
+            # Keep this cart's line when there is one
+            lines.sort(key=lambda line: line.cart_id != self.id)
+            line, duplicates = lines[0], lines[1:]
+            removed.extend(duplicates)
+
+            if merged == 0:
+                removed.append(line)
+                continue
+
+            line.cart_id = self.id
+            line.quantity = merged
+            line.reserved_until = reserved_until
+            line.updated_at = now
+            kept.append(line)
+
+        if deltas:
+            Inventory.objects.filter(sku_id__in=deltas).update(
+                quantity_reserved=F('quantity_reserved') + Case(
+                    *[When(sku_id=sku_id, then=Value(delta)) for sku_id, delta in deltas.items()],
+                    default=Value(0)
+                ),
+                updated_at=now
+            )
+
+        if removed:
+            # Units are accounted for in the deltas above, never release twice
+            CartItem.objects.filter(id__in=[line.id for line in removed]).delete()
+
+        if kept:
+            CartItem.objects.bulk_update(
+                kept,
+                ['cart', 'quantity', 'reserved_until', 'updated_at']
+            )
+            for line in kept:
+                reservation_queue.schedule_on_commit(line)
+
+        source.delete()
+        self.extend_expiry()
+
+        return conflicts
+
+
+class CartItemManager(models.Manager):
+    @transaction.atomic
+    def add(self, cart, sku, quantity):
+        """
+        Add `quantity` units of a SKU to a cart: a locked inventory
+        reservation (Inventory.objects.reserve_for_cart) and one
+        INSERT ... ON CONFLICT (cart_id, sku_id) DO UPDATE upsert that sums
+        quantities and renews the lease.
+
+        The price snapshot comes from the already loaded SKU; existing lines
+        keep their original snapshot.
+
+        Raises:
+            InsufficientStockError: If the SKU cannot cover the quantity
+        """
+        from apps.inventory.models import Inventory
+
+        if not Inventory.objects.reserve_for_cart(sku.id, cart.id, quantity):
+            inventory = Inventory.objects.with_lapsed_reservations().get(sku_id=sku.id)
+            raise InsufficientStockError(
+                f"Insufficient stock for {sku.sku_code}. "
+                f"Available: {inventory.quantity_available}, Requested: {quantity}"
+            )
+
+        cart_item = upsert_returning(
+            CartItem(
+                cart=cart,
+                sku=sku,
+                quantity=quantity,
+                unit_price_cents=sku.effective_price_cents,
+                reserved_until=timezone.now() + timedelta(
+                    minutes=settings.CART_RESERVATION_TIMEOUT_MINUTES
+                ),
+            ),
+            conflict_fields=['cart', 'sku'],
+            update_fields={
+                'quantity': '{table}."quantity" + EXCLUDED."quantity"',
+                'reserved_until': 'EXCLUDED."reserved_until"',
+                'updated_at': 'EXCLUDED."updated_at"',
+            }
+        )
+        reservation_queue.schedule_on_commit(cart_item)
+
+        return cart_item
 
 
 class CartItem(TimeStampedModel):
@@ -117,10 +385,13 @@ class CartItem(TimeStampedModel):
         help_text="Price snapshot when added to cart (in cents)"
     )
 
+    objects = CartItemManager()
+
     class Meta:
         unique_together = [['cart', 'sku']]
         indexes = [
             models.Index(fields=['reserved_until']),
+            models.Index(fields=['sku', 'reserved_until']),
         ]
 
     def __str__(self):
@@ -137,8 +408,12 @@ class CartItem(TimeStampedModel):
                 minutes=settings.CART_RESERVATION_TIMEOUT_MINUTES
             )
 
+        is_new = self._state.adding
         super().save(*args, **kwargs)
 
+        if is_new:
+            reservation_queue.schedule_on_commit(self)
+
     @property
     def line_total_cents(self):
         """Calculate line total in cents."""
@@ -150,11 +425,24 @@ class CartItem(TimeStampedModel):
         return timezone.now() > self.reserved_until
 
     def renew_reservation(self):
-        """Extend reservation timeout."""
+        """
+        Extend reservation timeout and reschedule its expiry.
+
+        An active lease is renewed with a single timestamp update. A lapsed
+        lease may already have been handed to someone else, so it is
+        re-acquired against current availability first.
+        """
+        if self.is_reservation_expired and hasattr(self.sku, 'inventory'):
+            self.sku.inventory.reacquire(self.quantity, self.quantity)
+
+        self._extend_lease()
+
+    def _extend_lease(self):
         self.reserved_until = timezone.now() + timedelta(
             minutes=settings.CART_RESERVATION_TIMEOUT_MINUTES
         )
         self.save(update_fields=['reserved_until', 'updated_at'])
+        reservation_queue.schedule_on_commit(self)
 
     @transaction.atomic
     def update_quantity(self, new_quantity):
@@ -165,11 +453,9 @@ class CartItem(TimeStampedModel):
             raise CartExpiredError("Cannot modify expired cart")
 
         if self.is_reservation_expired:
-            # Release old reservation
-            self.sku.inventory.release(self.quantity)
-            # Re-reserve with new quantity
-            self.sku.inventory.reserve(new_quantity)
-            self.renew_reservation()
+            # Lapsed lease: re-acquire it at the new quantity
+            self.sku.inventory.reacquire(self.quantity, new_quantity)
+            self._extend_lease()
         else:
             # Adjust existing reservation
             quantity_diff = new_quantity - self.quantity
@@ -192,7 +478,7 @@ class CartItem(TimeStampedModel):
         RESERVATION LIFECYCLE:
         - User adds to cart: inventory.reserve() is called
         - User removes from cart: call this method (release + delete)
-        - Checkout consumes: inventory.consume() then delete() without release
+        - Checkout consumes: Inventory.objects.consume_many() then delete() without release
         - Cart expires: release reservation then delete() without release
         """
         if hasattr(self.sku, 'inventory'):
@@ -0,0 +1,68 @@
+"""
+Delayed queue of cart item reservation expiries.
+
+Each reservation is stored in a Redis sorted set with its `reserved_until`
+timestamp as the score, so the consumer task can fetch exactly the
+reservations that are due instead of scanning the cart item table.
+
+The database remains the source of truth: if Redis is unavailable the
+periodic sweep (`cleanup_expired_reservations`) still releases everything.
+"""
+
+import logging
+from django.conf import settings
+from django.db import transaction
+from redis.exceptions import RedisError
+from apps.core.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Atomically fetch and remove due members so concurrent consumers
+# never process the same reservation twice.
+CLAIM_DUE_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #ids > 0 then
+    redis.call('ZREM', KEYS[1], unpack(ids))
+end
+return ids
+"""
+
+
+def schedule(item_id, reserved_until):
+    """
+    Schedule (or reschedule) the expiry of a cart item reservation.
+    """
+    try:
+        get_redis_client().zadd(
+            settings.CART_RESERVATION_QUEUE_KEY,
+            {str(item_id): reserved_until.timestamp()}
+        )
+    except RedisError as e:
+        logger.warning(f"Could not schedule reservation expiry for {item_id}: {str(e)}")
+
+
+def schedule_on_commit(item):
+    """
+    Schedule the reservation once the surrounding transaction commits,
+    so rolled back reservations never reach the queue.
+    """
+    item_id, reserved_until = item.id, item.reserved_until
+    transaction.on_commit(lambda: schedule(item_id, reserved_until))
+
+
+def claim_due(now, limit):
+    """
+    Remove and return up to `limit` reservation ids due at `now`.
+
+    Raises:
+        RedisError: If Redis is unavailable (caller falls back to the sweep)
+    """
+    client = get_redis_client()
+    ids = client.eval(
+        CLAIM_DUE_SCRIPT,
+        1,
+        settings.CART_RESERVATION_QUEUE_KEY,
+        now.timestamp(),
+        limit
+    )
+    return [item_id.decode() for item_id in ids]
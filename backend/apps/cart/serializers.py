@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Cart, CartItem
 from apps.products.serializers import SKUSerializer
+from apps.promotions import engine as promotions
 
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -45,6 +46,9 @@ class CartSerializer(serializers.ModelSerializer):
     """
     items = CartItemSerializer(many=True, read_only=True)
     subtotal_brl = serializers.SerializerMethodField()
+    discount_cents = serializers.SerializerMethodField()
+    applied_promotions = serializers.SerializerMethodField()
+    price_changes = serializers.SerializerMethodField()
 
     class Meta:
         model = Cart
@@ -53,16 +57,52 @@ class CartSerializer(serializers.ModelSerializer):
             'session_id',
             'expires_at',
             'is_expired',
+            'version',
             'items',
             'total_items',
             'subtotal_cents',
             'subtotal_brl',
+            'discount_cents',
+            'applied_promotions',
+            'price_changes',
         ]
-        read_only_fields = ['session_id', 'expires_at']
+        read_only_fields = ['session_id', 'expires_at', 'version']
 
     def get_subtotal_brl(self, obj):
         return obj.subtotal_cents / 100
 
+    def get_discount_cents(self, obj):
+        return self._promotion(obj).discount_cents
+
+    def get_applied_promotions(self, obj):
+        return self._promotion(obj).applied
+
+    def _promotion(self, obj):
+        """Automatic promotions for the (prefetched) lines, evaluated once."""
+        if getattr(self, '_promotion_result', None) is None:
+            self._promotion_result = promotions.evaluate(obj.items.all())
+        return self._promotion_result
+
+    def get_price_changes(self, obj):
+        """Lines whose price snapshot differed from the current SKU price."""
+        return self.context.get('price_changes', [])
+
+
+class CartDeltaSerializer(serializers.Serializer):
+    """
+    Minimal mutation response: the changed line plus updated totals.
+    """
+    cart_id = serializers.UUIDField()
+    version = serializers.IntegerField()
+    item = CartItemSerializer(allow_null=True)
+    removed_item_ids = serializers.ListField(child=serializers.UUIDField())
+    total_items = serializers.IntegerField()
+    subtotal_cents = serializers.IntegerField()
+    subtotal_brl = serializers.SerializerMethodField()
+
+    def get_subtotal_brl(self, obj):
+        return obj['subtotal_cents'] / 100
+
 
 class AddToCartSerializer(serializers.Serializer):
     """
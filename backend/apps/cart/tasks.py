@@ -1,6 +1,12 @@
+from collections import defaultdict
+from datetime import timedelta
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import F
+from redis.exceptions import RedisError
+from . import reservation_queue
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,51 +37,148 @@ def cleanup_expired_carts():
     return count
 
 
+def _collect_lapsed_reservations(sku_id, item_ids):
+    """
+    Garbage collect lapsed cart leases for one SKU.
+
+    Leases in active carts are renewed with a timestamp update as long as
+    their units were not handed to someone else meanwhile; the rest are
+    deleted and their units removed from quantity_reserved in a single
+    update, so the common case never writes the Inventory row.
+
+    Returns the number of cart items renewed or removed.
+    """
+    from apps.inventory.models import Inventory
+    from .models import CartItem
+
+    now = timezone.now()
+
+    with transaction.atomic():
+        inventories = Inventory.objects.filter(sku_id=sku_id).lock_with_lapsed_reservations()
+        inventory = inventories[0] if inventories else None
+
+        # Re-check under the lock: items may have been renewed or removed
+        items = list(
+            CartItem.objects.filter(
+                id__in=item_ids,
+                reserved_until__lte=now
+            ).select_related('cart').order_by('reserved_until')
+        )
+
+        available = inventory.quantity_available if inventory else 0
+        renewed, dropped = [], []
+
+        for item in items:
+            if not item.cart.is_expired and item.quantity <= available:
+                renewed.append(item)
+                available -= item.quantity
+            else:
+                dropped.append(item)
+
+        if renewed:
+            reserved_until = now + timedelta(minutes=settings.CART_RESERVATION_TIMEOUT_MINUTES)
+            CartItem.objects.filter(id__in=[item.id for item in renewed]).update(
+                reserved_until=reserved_until,
+                updated_at=now
+            )
+            for item in renewed:
+                item.reserved_until = reserved_until
+                reservation_queue.schedule_on_commit(item)
+
+        if dropped:
+            if inventory:
+                Inventory.objects.filter(id=inventory.id).update(
+                    quantity_reserved=F('quantity_reserved') - sum(item.quantity for item in dropped),
+                    updated_at=now
+                )
+            # Queryset delete: units were released above, never release twice
+            CartItem.objects.filter(id__in=[item.id for item in dropped]).delete()
+
+            for item in dropped:
+                reason = "cart expired" if item.cart.is_expired else "stock unavailable"
+                logger.info(f"Removed cart item {item.id} - {reason}")
+
+    return len(renewed) + len(dropped)
+
+
+def _collect_lapsed_items(items):
+    """
+    Group lapsed cart items by SKU and collect each group.
+    Returns the number of cart items processed.
+    """
+    by_sku = defaultdict(list)
+    for item in items:
+        by_sku[item.sku_id].append(item.id)
+
+    count = 0
+    for sku_id, item_ids in by_sku.items():
+        try:
+            count += _collect_lapsed_reservations(sku_id, item_ids)
+        except Exception as e:
+            logger.error(f"Error collecting lapsed reservations for SKU {sku_id}: {str(e)}")
+            for item_id in item_ids:
+                # Put them back so the next run retries them
+                reservation_queue.schedule(item_id, timezone.now())
+
+    return count
+
+
 @shared_task
 def cleanup_expired_reservations():
     """
-    Release expired cart item reservations.
-    Runs more frequently than cart cleanup.
-
-    RESERVATION LIFECYCLE:
-    - Explicitly release reservation first
-    - Then delete item without re-releasing (prevents double-release)
+    Garbage collect lapsed cart leases.
+    Safety-net sweep for leases the delayed queue missed
+    (e.g. while Redis was unavailable); runs less often than
+    `release_due_reservations`.
     """
     from .models import CartItem
 
-    expired_items = CartItem.objects.filter(
+    lapsed_items = CartItem.objects.filter(
         reserved_until__lt=timezone.now()
-    ).select_related('sku', 'cart')
+    ).only('id', 'sku_id')
+
+    count = _collect_lapsed_items(lapsed_items)
+
+    logger.info(f"Processed {count} expired reservations")
+    return count
+
+
+@shared_task
+def release_due_reservations():
+    """
+    Collect leases whose expiry is due, driven by the delayed queue.
+    Claims due ids from Redis in batches and only touches those cart items.
+    """
+    from .models import CartItem
 
+    batch_size = settings.CART_RESERVATION_QUEUE_BATCH_SIZE
     count = 0
 
-    for item in expired_items:
+    for _ in range(settings.CART_RESERVATION_QUEUE_MAX_BATCHES):
+        now = timezone.now()
+
         try:
-            with transaction.atomic():
-                # Release the reservation explicitly
-                if hasattr(item.sku, 'inventory'):
-                    item.sku.inventory.release(item.quantity)
-
-                # Renew reservation if cart is still active
-                if not item.cart.is_expired:
-                    # Try to re-reserve
-                    try:
-                        item.sku.inventory.reserve(item.quantity)
-                        item.renew_reservation()
-                        logger.info(f"Renewed reservation for cart item {item.id}")
-                    except Exception:
-                        # Can't re-reserve (out of stock), remove item
-                        # Delete without releasing (already released above)
-                        item.delete()
-                        logger.warning(f"Removed cart item {item.id} - stock unavailable")
-                else:
-                    # Cart expired, remove item
-                    # Delete without releasing (already released above)
-                    item.delete()
+            due_ids = reservation_queue.claim_due(now, batch_size)
+        except RedisError as e:
+            logger.warning(f"Reservation queue unavailable: {str(e)}")
+            break
 
-                count += 1
-        except Exception as e:
-            logger.error(f"Error processing expired reservation {item.id}: {str(e)}")
+        if not due_ids:
+            break
 
-    logger.info(f"Processed {count} expired reservations")
+        lapsed = []
+        for item in CartItem.objects.filter(id__in=due_ids).only('id', 'sku_id', 'reserved_until'):
+            if item.reserved_until > now:
+                # Renewed after it was scheduled; keep it in the queue
+                reservation_queue.schedule(item.id, item.reserved_until)
+            else:
+                lapsed.append(item)
+
+        count += _collect_lapsed_items(lapsed)
+
+        if len(due_ids) < batch_size:
+            break
+
+    if count:
+        logger.info(f"Collected {count} due reservations")
     return count
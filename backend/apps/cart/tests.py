@@ -2,8 +2,12 @@
 Tests for cart reservation lifecycle and double-release prevention.
 """
 
+import threading
+import time
+from unittest import skipUnless
 import pytest
-from django.test import TestCase
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from datetime import timedelta
@@ -34,7 +38,7 @@ class InventoryReservationTestCase(TestCase):
         )
 
         # Inventory is auto-created via signal
-        self.inventory = Inventory.objects.get(sku=self.sku)
+        self.inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
         self.inventory.quantity_on_hand = 10
         self.inventory.save()
 
@@ -94,6 +98,13 @@ class InventoryReservationTestCase(TestCase):
 
         self.assertIn("only 3 reserved", str(context.exception))
 
+    def test_available_requires_annotation(self):
+        """Test that quantity_available refuses rows loaded without the lapsed lease annotation."""
+        inventory = Inventory.objects.get(sku=self.sku)
+
+        with self.assertNumQueries(0), self.assertRaises(LookupError):
+            inventory.quantity_available
+
 
 class CartItemReservationTestCase(TestCase):
     """Test cart item reservation lifecycle."""
@@ -115,7 +126,7 @@ class CartItemReservationTestCase(TestCase):
             price_cents=1000,
         )
 
-        self.inventory = Inventory.objects.get(sku=self.sku)
+        self.inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
         self.inventory.quantity_on_hand = 20
         self.inventory.save()
 
@@ -222,7 +233,7 @@ class CartClearTestCase(TestCase):
             price_cents=1000,
         )
 
-        self.inventory = Inventory.objects.get(sku=self.sku)
+        self.inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
         self.inventory.quantity_on_hand = 50
         self.inventory.save()
 
@@ -291,7 +302,7 @@ class CheckoutFlowTestCase(TestCase):
             price_cents=1000,
         )
 
-        self.inventory = Inventory.objects.get(sku=self.sku)
+        self.inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
         self.inventory.quantity_on_hand = 100
         self.inventory.save()
 
@@ -375,7 +386,7 @@ class ConcurrentReservationTestCase(TestCase):
             price_cents=1000,
         )
 
-        self.inventory = Inventory.objects.get(sku=self.sku)
+        self.inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
         self.inventory.quantity_on_hand = 10  # Limited stock
         self.inventory.save()
 
@@ -417,3 +428,523 @@ class ConcurrentReservationTestCase(TestCase):
         self.inventory.refresh_from_db()
         self.assertEqual(self.inventory.quantity_available, 4)
         self.assertEqual(self.inventory.quantity_reserved, 6)
+
+
+@skipUnless(connection.vendor == 'postgresql', "Needs row locks (Postgres)")
+class LockedLeaseReadTestCase(TransactionTestCase):
+    """Test that stock checks read leases renewed while they waited for the row lock."""
+
+    def setUp(self):
+        """Create a SKU whose whole stock sits in a lapsed lease."""
+        product = Product.objects.create(
+            name="Test Card",
+            brand="Test TCG",
+            set_name="Test Set",
+            rarity=Product.Rarity.RARE,
+        )
+        self.sku = SKU.objects.create(product=product, price_cents=1000)
+        Inventory.objects.filter(sku=self.sku).update(quantity_on_hand=5, quantity_reserved=5)
+        self.inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
+
+        self.lease = CartItem.objects.create(
+            cart=Cart.objects.create(session_id="holder"),
+            sku=self.sku,
+            quantity=5,
+            reserved_until=timezone.now() - timedelta(minutes=1),
+        )
+        self.buyer = Cart.objects.create(session_id="buyer")
+
+    def _renew_during(self, action):
+        """
+        Run `action` while another connection holds the inventory row lock
+        and renews the lapsed lease, committing shortly after.
+        """
+        locked = threading.Event()
+
+        def renew():
+            try:
+                with transaction.atomic():
+                    Inventory.objects.select_for_update().get(id=self.inventory.id)
+                    CartItem.objects.filter(id=self.lease.id).update(
+                        reserved_until=timezone.now() + timedelta(minutes=15)
+                    )
+                    locked.set()
+                    time.sleep(0.5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=renew)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(5))
+            return action()
+        finally:
+            thread.join()
+
+    def test_reserve_sees_lease_renewed_while_waiting(self):
+        """Test that Inventory.reserve does not hand out a just renewed lease."""
+        with self.assertRaises(InsufficientStockError):
+            self._renew_during(lambda: self.inventory.reserve(3))
+
+        self.assertEqual(Inventory.objects.get(id=self.inventory.id).quantity_reserved, 5)
+
+    def test_reserve_for_cart_sees_lease_renewed_while_waiting(self):
+        """Test that the cart reservation does not count a just renewed lease as free."""
+        reserved = self._renew_during(
+            lambda: Inventory.objects.reserve_for_cart(self.sku.id, self.buyer.id, 3)
+        )
+
+        self.assertFalse(reserved)
+        self.assertEqual(Inventory.objects.get(id=self.inventory.id).quantity_reserved, 5)
+
+    def test_checkout_sees_lease_renewed_while_waiting(self):
+        """Test that checkout does not re-take a lapsed line whose stock was just renewed by another cart."""
+        from apps.orders.services import _reacquire_lapsed_lines
+
+        Inventory.objects.filter(id=self.inventory.id).update(quantity_reserved=10)
+        line = CartItem.objects.create(
+            cart=self.buyer,
+            sku=self.sku,
+            quantity=5,
+            reserved_until=timezone.now() - timedelta(minutes=1),
+        )
+
+        def checkout():
+            with transaction.atomic():
+                _reacquire_lapsed_lines(self.buyer, [line])
+
+        with self.assertRaises(InsufficientStockError):
+            self._renew_during(checkout)
+
+
+class ReleaseDueReservationsTestCase(TestCase):
+    """Test the delayed-queue reservation consumer."""
+
+    def setUp(self):
+        """Create a cart item whose reservation is due."""
+        self.product = Product.objects.create(
+            name="Test Card",
+            brand="Test TCG",
+            set_name="Test Set",
+            rarity=Product.Rarity.RARE,
+        )
+
+        self.sku = SKU.objects.create(
+            product=self.product,
+            condition=Product.Condition.NEAR_MINT,
+            language=Product.Language.EN,
+            is_foil=False,
+            price_cents=1000,
+        )
+
+        self.inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
+        self.inventory.quantity_on_hand = 10
+        self.inventory.save()
+
+        self.cart = Cart.objects.create(
+            session_id="test-session",
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+
+        self.inventory.reserve(3)
+        self.cart_item = CartItem.objects.create(
+            cart=self.cart,
+            sku=self.sku,
+            quantity=3,
+            reserved_until=timezone.now() - timedelta(minutes=1),
+        )
+
+    def test_releases_claimed_due_reservation(self):
+        """Test that due reservations claimed from the queue are released."""
+        from unittest import mock
+        from apps.cart import tasks
+
+        with mock.patch.object(
+            tasks.reservation_queue, 'claim_due', return_value=[str(self.cart_item.id)]
+        ):
+            count = tasks.release_due_reservations()
+
+        self.assertEqual(count, 1)
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity_reserved, 0)
+        self.assertFalse(CartItem.objects.filter(id=self.cart_item.id).exists())
+
+    def test_renewed_reservation_is_rescheduled_not_released(self):
+        """Test that a reservation renewed after scheduling is left alone."""
+        from unittest import mock
+        from apps.cart import tasks
+
+        self.cart_item.reserved_until = timezone.now() + timedelta(minutes=10)
+        self.cart_item.save()
+
+        with mock.patch.object(
+            tasks.reservation_queue, 'claim_due', return_value=[str(self.cart_item.id)]
+        ), mock.patch.object(tasks.reservation_queue, 'schedule') as schedule:
+            count = tasks.release_due_reservations()
+
+        self.assertEqual(count, 0)
+        schedule.assert_called_once()
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity_reserved, 3)
+
+
+class LeaseReservationTestCase(TestCase):
+    """Test implicit lease expiry and lapsed lease collection."""
+
+    def setUp(self):
+        """Create a SKU with a lapsed lease in an active cart."""
+        self.product = Product.objects.create(
+            name="Test Card",
+            brand="Test TCG",
+            set_name="Test Set",
+            rarity=Product.Rarity.RARE,
+        )
+
+        self.sku = SKU.objects.create(
+            product=self.product,
+            condition=Product.Condition.NEAR_MINT,
+            language=Product.Language.EN,
+            is_foil=False,
+            price_cents=1000,
+        )
+
+        self.inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
+        self.inventory.quantity_on_hand = 10
+        self.inventory.save()
+
+        self.cart = Cart.objects.create(session_id="test-session")
+
+        self.inventory.reserve(6)
+        self.cart_item = CartItem.objects.create(
+            cart=self.cart,
+            sku=self.sku,
+            quantity=6,
+            reserved_until=timezone.now() - timedelta(minutes=1),
+        )
+
+    def test_lapsed_lease_is_available_on_read(self):
+        """Test that lapsed leases no longer block other buyers."""
+        self.inventory.refresh_from_db()
+
+        self.assertEqual(self.inventory.quantity_reserved, 6)
+        self.assertEqual(self.inventory.quantity_available, 10)
+
+        # Another buyer can take the lapsed units
+        self.inventory.reserve(8)
+
+    def test_collection_renews_active_cart_without_inventory_write(self):
+        """Test that GC renews leases in active carts with a timestamp update."""
+        from apps.cart.tasks import cleanup_expired_reservations
+
+        updated_at = Inventory.objects.with_lapsed_reservations().get(id=self.inventory.id).updated_at
+
+        cleanup_expired_reservations()
+
+        self.inventory.refresh_from_db()
+        self.cart_item.refresh_from_db()
+        self.assertEqual(self.inventory.quantity_reserved, 6)
+        self.assertEqual(self.inventory.updated_at, updated_at)
+        self.assertFalse(self.cart_item.is_reservation_expired)
+
+    def test_collection_drops_lease_taken_by_another_buyer(self):
+        """Test that GC removes leases whose units were handed out."""
+        from apps.cart.tasks import cleanup_expired_reservations
+
+        self.inventory.reserve(8)
+
+        cleanup_expired_reservations()
+
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity_reserved, 8)
+        self.assertFalse(CartItem.objects.filter(id=self.cart_item.id).exists())
+
+    def test_renewing_lapsed_lease_rechecks_stock(self):
+        """Test that a lapsed lease cannot be renewed once its units are gone."""
+        self.inventory.reserve(8)
+
+        with self.assertRaises(InsufficientStockError):
+            self.cart_item.renew_reservation()
+
+
+class CartResolutionTestCase(TestCase):
+    """Test session cart resolution and coalesced expiry extension."""
+
+    def test_resolve_creates_then_reuses_cart(self):
+        """Test that resolving twice returns the same cart."""
+        first = Cart.objects.resolve_for_session("session-abc")
+        second = Cart.objects.resolve_for_session("session-abc", extend=True)
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(Cart.objects.filter(session_id="session-abc").count(), 1)
+
+    def test_extend_expiry_skips_small_moves(self):
+        """Test that extend_expiry() only writes beyond the slack."""
+        cart = Cart.objects.create(session_id="session-abc")
+
+        self.assertFalse(cart.extend_expiry())
+
+        cart.expires_at = timezone.now() + timedelta(days=1)
+        cart.save()
+        self.assertTrue(cart.extend_expiry())
+
+    def test_resolve_with_extend_refreshes_stale_expiry(self):
+        """Test that the upsert path extends an expiry that is due."""
+        cart = Cart.objects.create(
+            session_id="session-abc",
+            expires_at=timezone.now() + timedelta(days=1),
+        )
+
+        resolved = Cart.objects.resolve_for_session("session-abc", extend=True)
+
+        self.assertEqual(resolved.id, cart.id)
+        self.assertGreater(resolved.expires_at, timezone.now() + timedelta(days=2))
+
+    def test_resolve_replaces_expired_cart(self):
+        """Test that an expired cart is cleared and replaced."""
+        cart = Cart.objects.create(
+            session_id="session-abc",
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+
+        resolved = Cart.objects.resolve_for_session("session-abc")
+
+        self.assertNotEqual(resolved.id, cart.id)
+        self.assertFalse(resolved.is_expired)
+
+
+class AddToCartTestCase(TestCase):
+    """Test the upsert-based add-to-cart path."""
+
+    def setUp(self):
+        """Create a SKU with limited stock and a cart."""
+        self.product = Product.objects.create(
+            name="Test Card",
+            brand="Test TCG",
+            set_name="Test Set",
+            rarity=Product.Rarity.RARE,
+        )
+
+        self.sku = SKU.objects.create(
+            product=self.product,
+            condition=Product.Condition.NEAR_MINT,
+            language=Product.Language.EN,
+            is_foil=False,
+            price_cents=1000,
+        )
+
+        self.inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
+        self.inventory.quantity_on_hand = 5
+        self.inventory.save()
+
+        self.cart = Cart.objects.create(session_id="test-session")
+
+    def test_add_sums_quantity_on_existing_line(self):
+        """Test that adding the same SKU twice sums into one line."""
+        CartItem.objects.add(self.cart, self.sku, 2)
+        item = CartItem.objects.add(self.cart, self.sku, 3)
+
+        self.assertEqual(item.quantity, 5)
+        self.assertEqual(item.unit_price_cents, 1000)
+        self.assertEqual(self.cart.items.count(), 1)
+
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity_reserved, 5)
+
+    def test_add_rejects_quantity_over_stock(self):
+        """Test that the guarded update refuses to oversell."""
+        CartItem.objects.add(self.cart, self.sku, 4)
+
+        with self.assertRaises(InsufficientStockError):
+            CartItem.objects.add(self.cart, self.sku, 2)
+
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity_reserved, 4)
+        self.assertEqual(self.cart.items.get().quantity, 4)
+
+    def test_add_reacquires_own_lapsed_lease(self):
+        """Test that a lapsed line must fit again when it is topped up."""
+        CartItem.objects.add(self.cart, self.sku, 3)
+        CartItem.objects.filter(cart=self.cart).update(
+            reserved_until=timezone.now() - timedelta(minutes=1)
+        )
+
+        # Another buyer takes units freed by the lapsed lease
+        self.inventory.reserve(2)
+
+        with self.assertRaises(InsufficientStockError):
+            CartItem.objects.add(self.cart, self.sku, 1)
+
+    def test_add_item_endpoint(self):
+        """Test POST /api/v1/cart/add_item/ end to end."""
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        response = client.post(
+            "/api/v1/cart/add_item/",
+            {"sku_id": str(self.sku.id), "quantity": 2},
+            format="json",
+            HTTP_X_SESSION_ID="test-session",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["data"]["total_items"], 2)
+
+
+class CartMergeTestCase(TestCase):
+    """Test merging a session cart into a user's cart."""
+
+    def setUp(self):
+        """Create two SKUs, a user cart and a session cart."""
+        self.product = Product.objects.create(
+            name="Test Card",
+            brand="Test TCG",
+            set_name="Test Set",
+            rarity=Product.Rarity.RARE,
+        )
+
+        self.sku_a = SKU.objects.create(product=self.product, price_cents=1000)
+        self.sku_b = SKU.objects.create(product=self.product, is_foil=True, price_cents=3000)
+
+        for sku in (self.sku_a, self.sku_b):
+            Inventory.objects.filter(sku=sku).update(quantity_on_hand=10)
+
+        self.user_cart = Cart.objects.create(session_id="user-session")
+        self.session_cart = Cart.objects.create(session_id="anon-session")
+
+    def test_merge_sums_quantities_without_touching_reservations(self):
+        """Test that active leases are merged with no net reservation change."""
+        CartItem.objects.add(self.user_cart, self.sku_a, 2)
+        CartItem.objects.add(self.session_cart, self.sku_a, 3)
+        CartItem.objects.add(self.session_cart, self.sku_b, 1)
+
+        conflicts = self.user_cart.merge(self.session_cart)
+
+        self.assertEqual(conflicts, [])
+        self.assertFalse(Cart.objects.filter(id=self.session_cart.id).exists())
+        quantities = dict(self.user_cart.items.values_list('sku_id', 'quantity'))
+        self.assertEqual(quantities, {self.sku_a.id: 5, self.sku_b.id: 1})
+        self.assertEqual(Inventory.objects.with_lapsed_reservations().get(sku=self.sku_a).quantity_reserved, 5)
+
+    def test_merge_reports_lapsed_units_taken_by_others(self):
+        """Test that lapsed units that no longer fit are reported."""
+        CartItem.objects.add(self.user_cart, self.sku_a, 2)
+        CartItem.objects.add(self.session_cart, self.sku_a, 6)
+        self.session_cart.items.update(reserved_until=timezone.now() - timedelta(minutes=1))
+
+        # Another buyer takes most of the freed units
+        Inventory.objects.with_lapsed_reservations().get(sku=self.sku_a).reserve(5)
+
+        conflicts = self.user_cart.merge(self.session_cart)
+
+        self.assertEqual(conflicts, [{'sku_id': str(self.sku_a.id), 'requested': 8, 'merged': 5}])
+        self.assertEqual(self.user_cart.items.get().quantity, 5)
+        inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku_a)
+        self.assertEqual(inventory.quantity_reserved, 10)
+        self.assertEqual(inventory.quantity_available, 0)
+
+
+class CartPriceRevalidationTestCase(TestCase):
+    """Test batch revalidation of cart price snapshots."""
+
+    def setUp(self):
+        """Create a cart line priced before a repricing."""
+        self.product = Product.objects.create(name="Test Card")
+        self.sku = SKU.objects.create(product=self.product, price_cents=1000)
+        Inventory.objects.filter(sku=self.sku).update(quantity_on_hand=10)
+
+        self.cart = Cart.objects.create(session_id="test-session")
+        self.item = CartItem.objects.add(self.cart, self.sku, 2)
+
+        self.sku.sale_price_cents = 800
+        self.sku.save()
+
+    def test_apply_updates_stale_snapshots(self):
+        """Test that stale lines are reported and updated."""
+        changes = self.cart.revalidate_prices(apply=True)
+
+        self.assertEqual(changes, [{
+            'item_id': str(self.item.id),
+            'sku_id': str(self.sku.id),
+            'old_unit_price_cents': 1000,
+            'new_unit_price_cents': 800,
+        }])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.unit_price_cents, 800)
+        self.assertEqual(self.cart.revalidate_prices(apply=True), [])
+
+    def test_flag_only_reports(self):
+        """Test that flag mode leaves snapshots untouched."""
+        changes = self.cart.revalidate_prices(apply=False)
+
+        self.assertEqual(len(changes), 1)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.unit_price_cents, 1000)
+
+    def test_zero_sale_price_means_regular_price(self):
+        """Test that a 0 sale price is treated like SKU.effective_price_cents."""
+        self.sku.sale_price_cents = 0
+        self.sku.save()
+
+        self.assertEqual(self.cart.revalidate_prices(apply=False), [])
+
+    def test_cart_response_exposes_price_changes(self):
+        """Test GET /api/v1/cart/ returns the applied diff."""
+        from rest_framework.test import APIClient
+
+        response = APIClient().get("/api/v1/cart/", HTTP_X_SESSION_ID="test-session")
+
+        data = response.json()["data"]
+        self.assertEqual(len(data["price_changes"]), 1)
+        self.assertEqual(data["items"][0]["unit_price_cents"], 800)
+        self.assertEqual(data["subtotal_cents"], 1600)
+
+
+class CartDeltaResponseTestCase(TestCase):
+    """Test minimal (delta) responses for cart mutations."""
+
+    def setUp(self):
+        """Create a SKU with stock."""
+        from rest_framework.test import APIClient
+
+        self.product = Product.objects.create(name="Test Card")
+        self.sku = SKU.objects.create(product=self.product, price_cents=1000)
+        Inventory.objects.filter(sku=self.sku).update(quantity_on_hand=10)
+
+        self.client = APIClient()
+
+    def _add(self, quantity, **extra):
+        return self.client.post(
+            "/api/v1/cart/add_item/",
+            {"sku_id": str(self.sku.id), "quantity": quantity},
+            format="json",
+            HTTP_X_SESSION_ID="test-session",
+            **extra
+        )
+
+    def test_delta_returns_changed_line_and_totals(self):
+        """Test that Prefer: return=minimal returns only the changed line."""
+        self._add(1)
+        response = self._add(2, HTTP_PREFER="return=minimal")
+
+        data = response.json()["data"]
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("items", data)
+        self.assertEqual(data["item"]["quantity"], 3)
+        self.assertEqual(data["item"]["sku"]["quantity_available"], 7)
+        self.assertEqual(data["total_items"], 3)
+        self.assertEqual(data["subtotal_cents"], 3000)
+        self.assertEqual(data["version"], 2)
+
+    def test_delta_reports_removed_line(self):
+        """Test that removing a line via ?delta=1 reports its id."""
+        item_id = self._add(1).json()["data"]["items"][0]["id"]
+
+        response = self.client.delete(
+            f"/api/v1/cart/items/{item_id}/?delta=1",
+            HTTP_X_SESSION_ID="test-session",
+        )
+
+        data = response.json()["data"]
+        self.assertEqual(data["removed_item_ids"], [item_id])
+        self.assertIsNone(data["item"])
+        self.assertEqual(data["total_items"], 0)
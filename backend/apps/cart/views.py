@@ -1,13 +1,18 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from apps.core.exceptions import InsufficientStockError, CartExpiredError, api_response
 from apps.products.models import SKU
+from apps.inventory.models import Inventory
 from .models import Cart, CartItem
 from .serializers import (
     CartSerializer,
+    CartDeltaSerializer,
     CartItemSerializer,
     AddToCartSerializer,
     UpdateCartItemSerializer
@@ -21,20 +26,59 @@ class CartViewSet(viewsets.ViewSet):
     Uses session_id for cart identification.
     """
 
-    def _get_or_create_cart(self, session_id):
+    def _get_or_create_cart(self, session_id, extend=False):
         """Get or create cart for session."""
-        cart, created = Cart.objects.get_or_create(
-            session_id=session_id,
-            defaults={'session_id': session_id}
+        return Cart.objects.resolve_for_session(session_id, extend=extend)
+
+    def _prefetch_lines(self, cart):
+        """Load lines with their SKU, product and inventory in three queries."""
+        prefetch_related_objects(
+            [cart],
+            Prefetch('items', queryset=CartItem.objects.select_related('sku__product')),
+            Prefetch('items__sku__inventory', queryset=Inventory.objects.with_lapsed_reservations()),
         )
+        return cart
 
-        if not created and cart.is_expired:
-            # Clean up expired cart and create new one
-            cart.clear()
-            cart.delete()
-            cart = Cart.objects.create(session_id=session_id)
+    def _load_item(self, item):
+        """Reload a changed line with its SKU, product and current inventory."""
+        return CartItem.objects.select_related('sku__product').prefetch_related(
+            Prefetch('sku__inventory', queryset=Inventory.objects.with_lapsed_reservations())
+        ).get(id=item.id)
 
-        return cart
+    def _wants_delta(self, request):
+        """
+        Clients opt into minimal mutation responses with
+        `Prefer: return=minimal` or `?delta=1`.
+        """
+        prefer = request.headers.get('Prefer', '')
+        return 'return=minimal' in prefer or request.query_params.get('delta') in ('1', 'true')
+
+    def _mutation_response(self, request, cart, message, status_code=status.HTTP_200_OK,
+                           item=None, removed_item_ids=()):
+        """Render a mutation as the full cart or, if requested, as a delta."""
+        if self._wants_delta(request):
+            if item is not None:
+                item = self._load_item(item)
+            totals = cart.totals()
+            serializer = CartDeltaSerializer({
+                'cart_id': cart.id,
+                'version': totals['version'],
+                'item': item,
+                'removed_item_ids': list(removed_item_ids),
+                'total_items': totals['items_quantity'],
+                'subtotal_cents': totals['items_subtotal_cents'],
+            })
+        else:
+            # Refresh cart data
+            cart.refresh_from_db()
+            self._prefetch_lines(cart)
+            serializer = CartSerializer(cart)
+
+        return api_response(
+            data=serializer.data,
+            message=message,
+            status_code=status_code
+        )
 
     def _get_session_id(self, request):
         """Extract session ID from request header or create new one."""
@@ -51,7 +95,10 @@ class CartViewSet(viewsets.ViewSet):
         session_id = self._get_session_id(request)
         cart = self._get_or_create_cart(session_id)
 
-        serializer = CartSerializer(cart)
+        price_changes = cart.revalidate_prices()
+        self._prefetch_lines(cart)
+
+        serializer = CartSerializer(cart, context={'price_changes': price_changes})
         return api_response(
             data=serializer.data,
             message="Cart retrieved successfully"
@@ -68,12 +115,17 @@ class CartViewSet(viewsets.ViewSet):
         serializer.is_valid(raise_exception=True)
 
         session_id = self._get_session_id(request)
-        cart = self._get_or_create_cart(session_id)
+        # Extends the cart expiration as part of resolving it
+        cart = self._get_or_create_cart(session_id, extend=True)
 
         sku_id = serializer.validated_data['sku_id']
         quantity = serializer.validated_data['quantity']
 
-        sku = get_object_or_404(SKU, id=sku_id, is_active=True)
+        sku = get_object_or_404(
+            SKU.objects.select_related('inventory'),
+            id=sku_id,
+            is_active=True
+        )
 
         if not hasattr(sku, 'inventory'):
             return api_response(
@@ -84,24 +136,10 @@ class CartViewSet(viewsets.ViewSet):
             )
 
         try:
+            # Locked reservation + upsert of the cart line
             with transaction.atomic():
-                # Check if item already exists in cart
-                cart_item, created = CartItem.objects.get_or_create(
-                    cart=cart,
-                    sku=sku,
-                    defaults={'quantity': quantity}
-                )
-
-                if created:
-                    # Reserve inventory for new item
-                    sku.inventory.reserve(quantity)
-                else:
-                    # Update existing item quantity
-                    cart_item.update_quantity(cart_item.quantity + quantity)
-
-                # Extend cart expiration
-                cart.extend_expiry()
-
+                cart_item = CartItem.objects.add(cart, sku, quantity)
+                cart.bump_version()
         except InsufficientStockError as e:
             return api_response(
                 data=None,
@@ -110,14 +148,12 @@ class CartViewSet(viewsets.ViewSet):
                 status_code=status.HTTP_400_BAD_REQUEST
             )
 
-        # Refresh cart data
-        cart.refresh_from_db()
-        serializer = CartSerializer(cart)
-
-        return api_response(
-            data=serializer.data,
+        return self._mutation_response(
+            request,
+            cart,
             message="Item added to cart successfully",
-            status_code=status.HTTP_201_CREATED
+            status_code=status.HTTP_201_CREATED,
+            item=cart_item
         )
 
     @action(detail=False, methods=['patch'], url_path='items/(?P<item_id>[^/.]+)')
@@ -144,6 +180,7 @@ class CartViewSet(viewsets.ViewSet):
                 else:
                     # Update quantity
                     cart_item.update_quantity(new_quantity)
+                cart.bump_version()
 
         except (InsufficientStockError, CartExpiredError) as e:
             return api_response(
@@ -153,13 +190,19 @@ class CartViewSet(viewsets.ViewSet):
                 status_code=status.HTTP_400_BAD_REQUEST
             )
 
-        # Refresh cart data
-        cart.refresh_from_db()
-        serializer = CartSerializer(cart)
+        if new_quantity == 0:
+            return self._mutation_response(
+                request,
+                cart,
+                message="Cart updated successfully",
+                removed_item_ids=[item_id]
+            )
 
-        return api_response(
-            data=serializer.data,
-            message="Cart updated successfully"
+        return self._mutation_response(
+            request,
+            cart,
+            message="Cart updated successfully",
+            item=cart_item
         )
 
     @action(detail=False, methods=['delete'], url_path='items/(?P<item_id>[^/.]+)')
@@ -176,14 +219,13 @@ class CartViewSet(viewsets.ViewSet):
         with transaction.atomic():
             # User-initiated removal, must release reservation
             cart_item.release_and_delete()
+            cart.bump_version()
 
-        # Refresh cart data
-        cart.refresh_from_db()
-        serializer = CartSerializer(cart)
-
-        return api_response(
-            data=serializer.data,
-            message="Item removed from cart"
+        return self._mutation_response(
+            request,
+            cart,
+            message="Item removed from cart",
+            removed_item_ids=[item_id]
         )
 
     @action(detail=False, methods=['post'])
@@ -195,12 +237,51 @@ class CartViewSet(viewsets.ViewSet):
         session_id = self._get_session_id(request)
         cart = self._get_or_create_cart(session_id)
 
+        item_ids = list(cart.items.values_list('id', flat=True))
+
         with transaction.atomic():
             cart.clear()
+            cart.bump_version()
 
+        return self._mutation_response(
+            request,
+            cart,
+            message="Cart cleared successfully",
+            removed_item_ids=item_ids
+        )
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def merge(self, request):
+        """
+        Merge the session cart into the authenticated user's cart (on login).
+        POST /api/v1/cart/merge/
+        """
+        session_id = self._get_session_id(request)
+        session_cart = self._get_or_create_cart(session_id)
+
+        user_cart = Cart.objects.filter(
+            user=request.user,
+            expires_at__gt=timezone.now()
+        ).exclude(id=session_cart.id).order_by('-updated_at').first()
+
+        conflicts = []
+        if user_cart is None:
+            # Nothing to merge with: the session cart becomes the user's cart
+            Cart.objects.filter(id=session_cart.id).update(user=request.user)
+            cart = session_cart
+        else:
+            conflicts = user_cart.merge(session_cart)
+            cart = user_cart
+
+        cart.bump_version()
+        cart.refresh_from_db()
+        self._prefetch_lines(cart)
         serializer = CartSerializer(cart)
 
         return api_response(
-            data=serializer.data,
-            message="Cart cleared successfully"
+            data={
+                'cart': serializer.data,
+                'conflicts': conflicts,
+            },
+            message="Cart merged with conflicts" if conflicts else "Cart merged successfully"
         )
@@ -0,0 +1,119 @@
+"""
+Database helpers for statements the ORM cannot express in one round-trip.
+"""
+
+from django.db import connections, router
+
+
+def _upsert_sql(connection, model, instances, conflict_fields, update_fields):
+    """
+    Build `INSERT ... VALUES (...), ... ON CONFLICT ... DO UPDATE` for
+    `instances` (`DO NOTHING` when update_fields is None).
+    Returns (sql, params, quoted column list).
+    """
+    meta = model._meta
+    qn = connection.ops.quote_name
+    table = qn(meta.db_table)
+
+    fields = meta.concrete_fields
+    columns = ', '.join(qn(field.column) for field in fields)
+    placeholders = f"({', '.join(['%s'] * len(fields))})"
+
+    params = []
+    for instance in instances:
+        params.extend(
+            field.get_db_prep_save(field.pre_save(instance, add=True), connection)
+            for field in fields
+        )
+
+    conflict_columns = ', '.join(qn(meta.get_field(name).column) for name in conflict_fields)
+    sql = (
+        f"INSERT INTO {table} ({columns}) VALUES {', '.join([placeholders] * len(instances))} "
+        f"ON CONFLICT ({conflict_columns}) "
+    )
+
+    if update_fields is None:
+        return sql + "DO NOTHING", params, columns
+
+    if not isinstance(update_fields, dict):
+        update_fields = {
+            name: f"EXCLUDED.{qn(meta.get_field(name).column)}"
+            for name in update_fields
+        }
+
+    assignments = ', '.join(
+        f"{qn(meta.get_field(name).column)} = {expression.format(table=table)}"
+        for name, expression in update_fields.items()
+    )
+    sql += f"DO UPDATE SET {assignments}"
+
+    return sql, params, columns
+
+
+def upsert_returning(instance, conflict_fields, update_fields):
+    """
+    INSERT `instance`, or update the row it conflicts with, in a single
+    `INSERT ... ON CONFLICT ... DO UPDATE ... RETURNING` statement.
+
+    Args:
+        instance: Unsaved model instance with the values to insert
+        conflict_fields: Field names of the unique constraint to upsert on
+        update_fields: Field names to overwrite with the incoming values,
+                       or a dict of field name -> SQL expression. Expressions
+                       may reference the existing row as `{table}` and the
+                       incoming row as `EXCLUDED`.
+
+    Returns:
+        Model instance for the stored row (inserted or updated)
+    """
+    model = type(instance)
+    connection = connections[router.db_for_write(model)]
+
+    sql, params, columns = _upsert_sql(connection, model, [instance], conflict_fields, update_fields)
+
+    return next(iter(model.objects.using(connection.alias).raw(f"{sql} RETURNING {columns}", params)))
+
+
+def upsert_many(instances, conflict_fields, update_fields, batch_size=500):
+    """
+    Upsert several instances of one model with multi-row
+    `INSERT ... ON CONFLICT ... DO UPDATE` statements.
+
+    Arguments are as for `upsert_returning`. Instances must not conflict
+    with each other within a batch.
+
+    Returns:
+        Number of rows inserted or updated
+    """
+    if not instances:
+        return 0
+
+    model = type(instances[0])
+    connection = connections[router.db_for_write(model)]
+
+    count = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(instances), batch_size):
+            batch = instances[start:start + batch_size]
+            sql, params, _ = _upsert_sql(connection, model, batch, conflict_fields, update_fields)
+            cursor.execute(sql, params)
+            count += cursor.rowcount
+
+    return count
+
+
+def insert_ignore(instance, conflict_fields):
+    """
+    INSERT `instance` unless it conflicts with an existing row, in a single
+    `INSERT ... ON CONFLICT ... DO NOTHING` statement.
+
+    Returns:
+        True if the row was inserted
+    """
+    model = type(instance)
+    connection = connections[router.db_for_write(model)]
+
+    sql, params, _ = _upsert_sql(connection, model, [instance], conflict_fields, None)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount == 1
@@ -18,6 +18,16 @@ class PaymentProviderError(Exception):
     pass
 
 
+class CheckoutError(Exception):
+    """Raised when a cart cannot be turned into an order."""
+    pass
+
+
+class InvalidCouponError(Exception):
+    """Raised when a coupon code is unknown, inactive or expired."""
+    pass
+
+
 def custom_exception_handler(exc, context):
     """
     Custom exception handler that returns consistent error format.
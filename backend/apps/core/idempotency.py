@@ -0,0 +1,202 @@
+"""
+Idempotency layer for unsafe API requests.
+
+A request carrying an `Idempotency-Key` header is recorded in Redis together
+with a fingerprint of its body. Keys are scoped to their owner (the
+authenticated user, or the guest's X-Session-ID), so two clients picking the
+same key never see each other's responses:
+
+- while it runs, duplicates get 409 instead of repeating the work;
+- once it succeeds, duplicates get the stored response replayed
+  (failed requests release the key so they can be retried);
+- reusing a key for a different body gets 422.
+
+Records are best effort: if Redis is unavailable the request simply runs,
+and the database-level idempotency (e.g. the payment idempotency key) still
+applies.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import uuid
+from django.conf import settings
+from redis.exceptions import RedisError
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from .exceptions import api_response
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+IN_FLIGHT = 'in_flight'
+COMPLETED = 'completed'
+
+# Delete the key only if it still holds our claim: once an in-flight record
+# expires, a retry may have claimed the key and must keep it
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def header_key(request):
+    """Idempotency key sent by the client, if any."""
+    return request.headers.get(IDEMPOTENCY_HEADER)
+
+
+def body_key(request):
+    """Key requests by their body, for callers that resend identical payloads."""
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def request_owner(request):
+    """
+    Who the idempotency key belongs to: the authenticated user, otherwise
+    the guest session (hashed, as session ids are bearer tokens), or None
+    when the request has neither.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+
+    session_id = request.headers.get('X-Session-ID')
+    if not session_id:
+        session = getattr(request, 'session', None)
+        session_id = session.session_key if session is not None else None
+    if session_id:
+        return f"session:{hashlib.sha256(session_id.encode()).hexdigest()}"
+    return None
+
+
+def request_fingerprint(request, owner):
+    """Fingerprint of who sent the request and what it asks for: method, path and body."""
+    digest = hashlib.sha256()
+    digest.update(owner.encode())
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def idempotent(scope, key_func=header_key):
+    """
+    Make a DRF view method idempotent per key.
+
+    Args:
+        scope: Namespace for the keys (e.g. 'checkout')
+        key_func: Callable returning the idempotency key for a request,
+                  or None to skip idempotency for it
+
+    Requests without an owner (see request_owner) skip idempotency too.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = key_func(request)
+            owner = request_owner(request) if key else None
+            if not owner:
+                # Without an owner the key could collide with another client's
+                return view_method(self, request, *args, **kwargs)
+
+            redis_key = f"{settings.IDEMPOTENCY_KEY_PREFIX}:{scope}:{owner}:{key}"
+            fingerprint = request_fingerprint(request, owner)
+
+            claim = json.dumps({'state': IN_FLIGHT, 'fingerprint': fingerprint, 'token': uuid.uuid4().hex})
+            try:
+                client = get_redis_client()
+                acquired = client.set(
+                    redis_key,
+                    claim,
+                    nx=True,
+                    ex=settings.IDEMPOTENCY_IN_FLIGHT_TTL_SECONDS
+                )
+                record = None if acquired else client.get(redis_key)
+            except RedisError as e:
+                logger.warning(f"Idempotency store unavailable, running {scope} request: {str(e)}")
+                return view_method(self, request, *args, **kwargs)
+
+            if not acquired:
+                if record is None:
+                    # Record expired between SET and GET; just run the request
+                    return view_method(self, request, *args, **kwargs)
+                return _duplicate_response(json.loads(record), fingerprint)
+
+            try:
+                response = view_method(self, request, *args, **kwargs)
+            except Exception:
+                _forget(client, redis_key, claim)
+                raise
+
+            if status.is_success(response.status_code):
+                _remember(client, redis_key, fingerprint, response)
+            else:
+                # Failed requests may be retried with the same key
+                _forget(client, redis_key, claim)
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _duplicate_response(record, fingerprint):
+    """Response for a request whose key is already recorded."""
+    if record['fingerprint'] != fingerprint:
+        return api_response(
+            data=None,
+            message=f"{IDEMPOTENCY_HEADER} was already used for a different request",
+            success=False,
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    if record['state'] == IN_FLIGHT:
+        return api_response(
+            data=None,
+            message="A request with this idempotency key is already in progress",
+            success=False,
+            status_code=status.HTTP_409_CONFLICT
+        )
+
+    return Response(
+        record['body'],
+        status=record['status'],
+        headers={REPLAYED_HEADER: 'true'}
+    )
+
+
+def _remember(client, redis_key, fingerprint, response):
+    """Store the completed response for replays."""
+    record = {
+        'state': COMPLETED,
+        'fingerprint': fingerprint,
+        'status': response.status_code,
+        'body': response.data,
+    }
+    try:
+        client.set(
+            redis_key,
+            json.dumps(record, cls=JSONEncoder),
+            ex=settings.IDEMPOTENCY_TTL_SECONDS
+        )
+    except RedisError as e:
+        logger.warning(f"Could not store idempotent response for {redis_key}: {str(e)}")
+
+
+def _forget(client, redis_key, claim):
+    """
+    Drop our in-flight record so the request can be retried, unless the
+    key was claimed by another request after ours expired.
+    """
+    try:
+        client.eval(RELEASE_SCRIPT, 1, redis_key, claim)
+    except RedisError as e:
+        logger.warning(f"Could not release idempotency key {redis_key}: {str(e)}")
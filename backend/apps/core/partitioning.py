@@ -0,0 +1,397 @@
+"""
+Monthly range partitioning by `created_at` (Postgres only).
+
+`partition_table` converts an existing table into a partitioned one in
+place (used by migrations); `ensure_partitions` creates upcoming monthly
+partitions and `detach_partitions_before` archives old ones by detaching
+them, which keeps their rows as standalone tables outside the hot indexes.
+
+Postgres requires primary keys and unique constraints on a partitioned
+table to include the partition key, so they become (column, created_at),
+which only guarantees uniqueness within a month. `enforce_unique` restores
+global uniqueness: a trigger records every value in a small unpartitioned
+key table (`core_partition_unique_key`) in the same transaction, and its
+primary key rejects duplicates. Keys of detached partitions stay reserved.
+
+Foreign keys cannot point at a partitioned table without its partition
+key, so they are db_constraint=False in Django. `enforce_reference`
+compensates with deferred constraint triggers: the child row's parent must
+exist at commit (locked FOR KEY SHARE), and a parent cannot be deleted
+while child rows still point at it.
+
+Each table also gets a DEFAULT partition, so inserts keep working if
+`maintain_partitions` falls behind; rows landing there are moved into
+their month's partition when it is created.
+
+Every function is a no-op on other databases or unpartitioned tables.
+"""
+
+import logging
+import re
+from datetime import datetime, timezone as dt_timezone
+from django.apps import apps
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+
+logger = logging.getLogger(__name__)
+
+PARTITION_KEY = 'created_at'
+UNIQUE_KEY_TABLE = 'core_partition_unique_key'
+
+UNIQUE_KEY_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION {UNIQUE_KEY_TABLE}() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    old_value text;
+    new_value text;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        old_value := to_jsonb(OLD) ->> TG_ARGV[1];
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        new_value := to_jsonb(NEW) ->> TG_ARGV[1];
+    END IF;
+    IF old_value IS NOT DISTINCT FROM new_value THEN
+        RETURN NULL;
+    END IF;
+    IF old_value IS NOT NULL THEN
+        DELETE FROM {UNIQUE_KEY_TABLE} WHERE scope = TG_ARGV[0] AND value = old_value;
+    END IF;
+    IF new_value IS NOT NULL THEN
+        INSERT INTO {UNIQUE_KEY_TABLE} (scope, value) VALUES (TG_ARGV[0], new_value);
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def _month_start(year, month):
+    """Aware UTC datetime for the first day of a month (month may overflow)."""
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=dt_timezone.utc)
+
+
+def partitioned_tables():
+    """Tables of settings.PARTITIONED_MODELS."""
+    return [apps.get_model(label)._meta.db_table for label in settings.PARTITIONED_MODELS]
+
+
+def retention_cutoff(now=None):
+    """
+    Start of the oldest month kept attached under
+    settings.PARTITION_RETENTION_MONTHS, or None to keep everything.
+    """
+    if not settings.PARTITION_RETENTION_MONTHS:
+        return None
+    now = now or datetime.now(dt_timezone.utc)
+    return _month_start(now.year, now.month - settings.PARTITION_RETENTION_MONTHS)
+
+
+def partition_name(table, month_start):
+    """Name of the partition of `table` holding `month_start`'s month."""
+    return f"{table}_p{month_start:%Y%m}"
+
+
+def is_partitioned(table, connection=default_connection):
+    """Whether `table` is a partitioned Postgres table."""
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [table]
+        )
+        return cursor.fetchone() is not None
+
+
+def default_partition_name(table):
+    """Name of the DEFAULT partition of `table`."""
+    return f"{table}_pdefault"
+
+
+def _exists(cursor, name):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    return cursor.fetchone()[0]
+
+
+def _create_partition(cursor, connection, table, month_start):
+    """
+    Create the monthly partition starting at `month_start` if missing.
+
+    Rows of that month already in the DEFAULT partition are moved into the
+    new partition: the default is detached, the rows are moved into a
+    standalone table that is then attached, and the default is re-attached
+    (no row triggers fire, so unique keys are untouched).
+    """
+    qn = connection.ops.quote_name
+    name = partition_name(table, month_start)
+    month_end = _month_start(month_start.year, month_start.month + 1)
+    if _exists(cursor, name):
+        return
+
+    default = default_partition_name(table)
+    if _exists(cursor, default):
+        cursor.execute(
+            f"SELECT 1 FROM {qn(default)} WHERE {qn(PARTITION_KEY)} >= %s AND {qn(PARTITION_KEY)} < %s LIMIT 1",
+            [month_start, month_end]
+        )
+        if cursor.fetchone():
+            cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(default)}")
+            cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {qn(default)} WHERE {qn(PARTITION_KEY)} >= %s "
+                f"AND {qn(PARTITION_KEY)} < %s RETURNING *) INSERT INTO {qn(name)} SELECT * FROM moved",
+                [month_start, month_end]
+            )
+            cursor.execute(
+                f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)",
+                [month_start, month_end]
+            )
+            cursor.execute(f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(default)} DEFAULT")
+            logger.warning(f"Moved rows of {name} out of {default}")
+            return
+
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {qn(name)} "
+        f"PARTITION OF {qn(table)} FOR VALUES FROM (%s) TO (%s)",
+        [month_start, month_end]
+    )
+
+
+def create_default_partition(table, connection=default_connection):
+    """Create the DEFAULT partition of `table` if missing."""
+    if not is_partitioned(table, connection):
+        return
+
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {qn(default_partition_name(table))} PARTITION OF {qn(table)} DEFAULT"
+        )
+
+
+def enforce_unique(table, column, connection=default_connection):
+    """
+    Enforce global uniqueness of `column` on partitioned `table` through
+    the unique key table. Existing values are recorded first.
+
+    Raises:
+        ValueError: If `table` already holds duplicate values
+    """
+    if not is_partitioned(table, connection):
+        return
+
+    qn = connection.ops.quote_name
+    scope = f"{table}.{column}"
+    trigger = f"{table}_{column}_unique"
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {qn(UNIQUE_KEY_TABLE)} "
+            f"(scope varchar(128) NOT NULL, value text NOT NULL, PRIMARY KEY (scope, value))"
+        )
+        cursor.execute(UNIQUE_KEY_FUNCTION)
+
+        cursor.execute(
+            f"SELECT {qn(column)} FROM {qn(table)} WHERE {qn(column)} IS NOT NULL "
+            f"GROUP BY {qn(column)} HAVING count(*) > 1 LIMIT 1"
+        )
+        duplicate = cursor.fetchone()
+        if duplicate:
+            raise ValueError(f"{scope} has duplicate value {duplicate[0]!r}")
+
+        cursor.execute(
+            f"INSERT INTO {qn(UNIQUE_KEY_TABLE)} (scope, value) "
+            f"SELECT %s, {qn(column)}::text FROM {qn(table)} WHERE {qn(column)} IS NOT NULL "
+            f"ON CONFLICT DO NOTHING",
+            [scope]
+        )
+        cursor.execute(f"DROP TRIGGER IF EXISTS {qn(trigger)} ON {qn(table)}")
+        cursor.execute(
+            f"CREATE TRIGGER {qn(trigger)} AFTER INSERT OR UPDATE OF {qn(column)} OR DELETE ON {qn(table)} "
+            f"FOR EACH ROW EXECUTE FUNCTION {UNIQUE_KEY_TABLE}('{scope}', '{column}')"
+        )
+
+
+def enforce_reference(table, column, parent, connection=default_connection):
+    """
+    Emulate the foreign key `table`.`column` -> `parent`.id with deferred
+    constraint triggers (checked at commit, like Django's foreign keys).
+    """
+    if not (is_partitioned(table, connection) or is_partitioned(parent, connection)):
+        return
+
+    qn = connection.ops.quote_name
+    name = f"{table}_{column}_ref"
+    parent_name = f"{parent}_{table}_{column}_ref"
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE OR REPLACE FUNCTION {qn(name)}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF NEW.{qn(column)} IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM {qn(parent)} WHERE id = NEW.{qn(column)} FOR KEY SHARE
+                ) THEN
+                    RAISE foreign_key_violation USING MESSAGE = format(
+                        '{table}.{column}=%s has no matching {parent} row', NEW.{qn(column)}
+                    );
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """)
+        cursor.execute(f"""
+            CREATE OR REPLACE FUNCTION {qn(parent_name)}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                -- Moving a row to another partition also fires AFTER DELETE
+                IF EXISTS (SELECT 1 FROM {qn(table)} WHERE {qn(column)} = OLD.id)
+                        AND NOT EXISTS (SELECT 1 FROM {qn(parent)} WHERE id = OLD.id) THEN
+                    RAISE foreign_key_violation USING MESSAGE = format(
+                        '{parent} row %s is still referenced from {table}.{column}', OLD.id
+                    );
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """)
+        cursor.execute(f"DROP TRIGGER IF EXISTS {qn(name)} ON {qn(table)}")
+        cursor.execute(
+            f"CREATE CONSTRAINT TRIGGER {qn(name)} AFTER INSERT OR UPDATE OF {qn(column)} ON {qn(table)} "
+            f"DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION {qn(name)}()"
+        )
+        cursor.execute(f"DROP TRIGGER IF EXISTS {qn(parent_name)} ON {qn(parent)}")
+        cursor.execute(
+            f"CREATE CONSTRAINT TRIGGER {qn(parent_name)} AFTER DELETE ON {qn(parent)} "
+            f"DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION {qn(parent_name)}()"
+        )
+
+
+def partition_table(table, months_ahead, connection=default_connection):
+    """
+    Convert `table` into a table partitioned by month on created_at,
+    copying its rows, with a DEFAULT partition and global uniqueness of its
+    single-column unique constraints. Runs inside the caller's transaction.
+
+    Foreign keys referencing `table` must have been dropped first (see
+    enforce_reference).
+    """
+    if connection.vendor != 'postgresql' or is_partitioned(table, connection):
+        return
+
+    qn = connection.ops.quote_name
+    legacy = f"{table}_unpartitioned"
+
+    with connection.cursor() as cursor:
+        # Primary key, unique and foreign key constraints
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f')",
+            [table]
+        )
+        constraints = cursor.fetchall()
+
+        # Plain indexes (constraint-backed ones are recreated with their constraint)
+        cursor.execute(
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = %s::regclass "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)",
+            [table]
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(f"SELECT min({qn(PARTITION_KEY)}) FROM {qn(table)}")
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({qn(PARTITION_KEY)})"
+        )
+
+        now = datetime.now(dt_timezone.utc)
+        month = _month_start((oldest or now).year, (oldest or now).month)
+        last = _month_start(now.year, now.month + months_ahead)
+        while month <= last:
+            _create_partition(cursor, connection, table, month)
+            month = _month_start(month.year, month.month + 1)
+
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}")
+        cursor.execute(f"DROP TABLE {qn(legacy)}")
+
+        unique_columns = []
+        for name, kind, definition in constraints:
+            if kind in ('p', 'u'):
+                # Uniqueness on a partitioned table must include the partition key
+                single = re.match(r"UNIQUE \((\w+)\)$", definition)
+                if single:
+                    unique_columns.append(single.group(1))
+                definition = re.sub(r"\)$", f", {qn(PARTITION_KEY)})", definition, count=1)
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+
+        for definition in indexes:
+            if definition.startswith('CREATE UNIQUE'):
+                raise ValueError(f"Unique index on {table} must include {PARTITION_KEY}: {definition}")
+            cursor.execute(definition)
+
+    create_default_partition(table, connection)
+    # The (column, created_at) constraints only hold per month
+    for column in unique_columns:
+        enforce_unique(table, column, connection)
+
+    logger.info(f"Partitioned {table} by month on {PARTITION_KEY}")
+
+
+def ensure_partitions(table, months_ahead, connection=default_connection):
+    """
+    Create the partitions for the current month and the next
+    `months_ahead` months. Returns the number of months checked.
+    """
+    if not is_partitioned(table, connection):
+        return 0
+
+    now = datetime.now(dt_timezone.utc)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            _create_partition(cursor, connection, table, _month_start(now.year, now.month + offset))
+
+    return months_ahead + 1
+
+
+def detach_partitions_before(table, cutoff, connection=default_connection):
+    """
+    Detach the monthly partitions of `table` that end on or before
+    `cutoff`. Detached partitions keep their rows as standalone tables,
+    ready to be dumped and dropped.
+
+    Returns:
+        Names of the detached partitions
+    """
+    if not is_partitioned(table, connection):
+        return []
+
+    qn = connection.ops.quote_name
+    pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})(\d{{2}})$")
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass ORDER BY c.relname",
+            [table]
+        )
+        partitions = [row[0] for row in cursor.fetchall()]
+
+        detached = []
+        for name in partitions:
+            match = pattern.match(name)
+            if not match:
+                continue
+            year, month = int(match.group(1)), int(match.group(2))
+            if _month_start(year, month + 1) > cutoff:
+                continue
+            cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+            detached.append(name)
+
+    for name in detached:
+        logger.info(f"Detached partition {name} from {table}")
+    return detached
@@ -0,0 +1,70 @@
+"""
+Per-process caches of small, read-mostly tables (shipping rates,
+promotion rules, ...) compiled into in-memory structures.
+
+Lookups only touch process memory. Every PROCESS_CACHE_CHECK_SECONDS a
+cache compares its version with a counter in Redis and rebuilds if another
+process invalidated it; when Redis is unavailable it simply rebuilds at
+that interval.
+"""
+
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import transaction
+from redis.exceptions import RedisError
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessCache:
+    """
+    Value built by `loader()` and kept in process memory until invalidated.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self._value = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version_key(self):
+        return f"process_cache:{self.name}:version"
+
+    def get(self):
+        """Return the cached value, rebuilding it if stale."""
+        now = time.monotonic()
+        if self._value is not None and now - self._checked_at < settings.PROCESS_CACHE_CHECK_SECONDS:
+            return self._value
+
+        with self._lock:
+            version = self._remote_version()
+            if self._value is None or version is None or version != self._version:
+                self._value = self.loader()
+                self._version = version
+            self._checked_at = now
+
+        return self._value
+
+    def invalidate(self):
+        """Drop the value here and tell other processes to rebuild theirs."""
+        self._value = None
+        try:
+            get_redis_client().incr(self.version_key)
+        except RedisError as e:
+            logger.warning(f"Could not publish invalidation of {self.name}: {str(e)}")
+
+    def invalidate_on_commit(self, *args, **kwargs):
+        """Signal receiver: invalidate once the change is committed."""
+        transaction.on_commit(self.invalidate)
+
+    def _remote_version(self):
+        try:
+            return get_redis_client().get(self.version_key)
+        except RedisError:
+            return None
@@ -0,0 +1,28 @@
+"""
+Shared Redis connection for short-lived coordination state
+(reservation schedules, idempotency records, etc.).
+"""
+
+import redis
+from django.conf import settings
+
+_client = None
+
+
+def get_redis_client():
+    """
+    Return a process-wide Redis client.
+
+    The client holds its own connection pool, so it is safe to share
+    between threads and cheap to call on every request.
+    """
+    global _client
+
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        )
+
+    return _client
@@ -1,5 +1,12 @@
-from django.test import TestCase
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from unittest import skipUnless
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
 from rest_framework.test import APIClient
+from apps.core import partitioning
+from apps.orders.models import Order, OrderItem
+from apps.products.models import Product, SKU
 
 
 class ApiRootTests(TestCase):
@@ -27,3 +34,117 @@ class ApiRootTests(TestCase):
         self.assertTrue(endpoints["cart"].endswith("/api/v1/cart/"))
         self.assertIn("orders", endpoints)
         self.assertIn("payments_webhook", endpoints)
+
+
+class PartitioningTests(TestCase):
+    def test_month_arithmetic_wraps_years(self):
+        self.assertEqual(partitioning._month_start(2025, 13), datetime(2026, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(partitioning._month_start(2025, 0), datetime(2024, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(
+            partitioning.partition_name("orders_order", datetime(2025, 3, 1, tzinfo=dt_timezone.utc)),
+            "orders_order_p202503"
+        )
+
+    @override_settings(PARTITION_RETENTION_MONTHS=12)
+    def test_retention_cutoff(self):
+        now = datetime(2025, 3, 15, tzinfo=dt_timezone.utc)
+        self.assertEqual(partitioning.retention_cutoff(now), datetime(2024, 3, 1, tzinfo=dt_timezone.utc))
+
+    def test_unpartitioned_tables_are_left_alone(self):
+        # A plain table created inside the test transaction (DDL rolls back)
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE core_plain_table (id integer PRIMARY KEY, created_at timestamp with time zone)")
+
+        self.assertFalse(partitioning.is_partitioned("core_plain_table"))
+        self.assertEqual(partitioning.ensure_partitions("core_plain_table", 3), 0)
+        self.assertEqual(partitioning.detach_partitions_before("core_plain_table", datetime.now(dt_timezone.utc)), [])
+
+
+@skipUnless(connection.vendor == 'postgresql', "Partitioning is Postgres only")
+class PartitionGuardTests(TestCase):
+    """Partition orders_order inside the test transaction (DDL rolls back)."""
+
+    def setUp(self):
+        partitioning.partition_table("orders_order", 1)
+        partitioning.enforce_reference("orders_orderitem", "order_id", "orders_order")
+
+    def _order(self, order_number, created_at=None):
+        order = Order.objects.create(
+            order_number=order_number,
+            customer_email="buyer@example.com",
+            customer_name="Buyer",
+            customer_cpf="123.456.789-09",
+            customer_phone="11999999999",
+            shipping_street="Rua A",
+            shipping_number="10",
+            shipping_neighborhood="Centro",
+            shipping_city="Sao Paulo",
+            shipping_state="SP",
+            shipping_cep="01001-000",
+            subtotal_cents=1000,
+            total_cents=1000,
+        )
+        if created_at:
+            Order.objects.filter(id=order.id).update(created_at=created_at)
+        return order
+
+    def test_duplicate_order_number_across_partitions_is_rejected(self):
+        """Test that order_number stays unique across monthly partitions."""
+        self._order("ORD-1", created_at=datetime(2030, 1, 15, tzinfo=dt_timezone.utc))
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self._order("ORD-1")
+
+        # Renumbering frees the old key
+        Order.objects.filter(order_number="ORD-1").update(order_number="ORD-2")
+        self._order("ORD-1")
+
+    def test_default_partition_rows_move_to_new_partition(self):
+        """Test that rows without a partition land in the default one and move on creation."""
+        month = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+        order = self._order("ORD-1", created_at=datetime(2030, 1, 15, tzinfo=dt_timezone.utc))
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM orders_order_pdefault")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+            partitioning._create_partition(cursor, connection, "orders_order", month)
+
+            cursor.execute("SELECT id FROM orders_order_p203001")
+            self.assertEqual(cursor.fetchall(), [(order.id,)])
+            cursor.execute("SELECT count(*) FROM orders_order_pdefault")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+        # The moved row keeps its unique key
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self._order("ORD-1")
+
+    def test_items_must_reference_an_existing_order(self):
+        """Test that the emulated foreign keys are checked at commit."""
+        order = self._order("ORD-1")
+        product = Product.objects.create(
+            name="Test Card",
+            brand="Test TCG",
+            set_name="Test Set",
+            rarity=Product.Rarity.RARE,
+        )
+        sku = SKU.objects.create(product=product, price_cents=1000)
+
+        def add_item(order_id):
+            OrderItem.objects.create(order_id=order_id, sku=sku, quantity=1, unit_price_cents=1000, line_total_cents=1000)
+            with connection.cursor() as cursor:
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            add_item(uuid.uuid4())
+
+        add_item(order.id)
+
+        # Moving the order to another partition keeps its items valid
+        Order.objects.filter(id=order.id).update(created_at=datetime(2030, 1, 15, tzinfo=dt_timezone.utc))
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        with self.assertRaises(IntegrityError), transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("DELETE FROM orders_order WHERE id = %s", [order.id])
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
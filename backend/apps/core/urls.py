@@ -7,4 +7,5 @@ urlpatterns = [
     path('cart/', include('apps.cart.urls')),
     path('orders/', include('apps.orders.urls')),
     path('payments/', include('apps.payments.urls')),
+    path('shipping/', include('apps.shipping.urls')),
 ]
@@ -20,6 +20,7 @@ def api_root(request):
                 "skus": request.build_absolute_uri("/api/v1/products/skus/"),
                 "cart": request.build_absolute_uri("/api/v1/cart/"),
                 "orders": request.build_absolute_uri("/api/v1/orders/"),
+                "shipping_quote": request.build_absolute_uri("/api/v1/shipping/quote/"),
                 "payments_webhook": request.build_absolute_uri(
                     "/api/v1/payments/webhook/"
                 ),
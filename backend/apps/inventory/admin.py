@@ -38,6 +38,10 @@ class InventoryAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Lapsed leases in the same query as the rows (quantity_available)
+        return super().get_queryset(request).select_related('sku').with_lapsed_reservations()
+
     def available_display(self, obj):
         return obj.quantity_available
     available_display.short_description = 'Available'
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="inventory",
+            name="quantity_reserved",
+            field=models.IntegerField(
+                default=0,
+                help_text="Stock leased to carts (including lapsed leases not yet collected)",
+            ),
+        ),
+    ]
@@ -1,13 +1,170 @@
 from django.db import models, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Now
 from django.core.exceptions import ValidationError
 from apps.core.models import TimeStampedModel
 from apps.core.exceptions import InsufficientStockError
 from apps.products.models import SKU
 
 
+def lapsed_reservations_subquery(sku_ref=OuterRef('sku')):
+    """
+    Total quantity of cart leases on a SKU whose `reserved_until` has passed.
+    Uses the (sku, reserved_until) index on cart items.
+    """
+    from apps.cart.models import CartItem
+
+    lapsed = CartItem.objects.filter(
+        sku=sku_ref,
+        reserved_until__lte=Now()
+    ).order_by().values('sku').annotate(total=Sum('quantity')).values('total')
+
+    return Coalesce(Subquery(lapsed), 0)
+
+
+class InventoryQuerySet(models.QuerySet):
+    def with_lapsed_reservations(self):
+        """
+        Annotate lapsed lease quantity so quantity_available
+        needs no extra query per row.
+        """
+        return self.annotate(lapsed_reserved_quantity=lapsed_reservations_subquery())
+
+    def lock_with_lapsed_reservations(self):
+        """
+        Lock the matching rows (in id order), then read their lapsed lease
+        quantity in a separate statement.
+
+        Under READ COMMITTED, a statement that waits for a row lock still
+        evaluates its subqueries against the snapshot taken when it started,
+        so leases the lock holder just renewed, consumed or deleted would
+        still count as lapsed. Reading them after the lock avoids that.
+
+        Returns:
+            List of locked rows, annotated like with_lapsed_reservations()
+        """
+        rows = list(self.select_for_update().order_by('id'))
+        if rows:
+            lapsed = dict(
+                self.model.objects.filter(id__in=[row.id for row in rows]).with_lapsed_reservations().values_list(
+                    'id', 'lapsed_reserved_quantity'
+                )
+            )
+            for row in rows:
+                row.lapsed_reserved_quantity = lapsed[row.id]
+        return rows
+
+    def reserve_for_cart(self, sku_id, cart_id, quantity):
+        """
+        Reserve `quantity` more units of a SKU for a cart.
+
+        The row is locked first and the leases are read in a separate
+        statement (see lock_with_lapsed_reservations), then the counter is
+        moved with one UPDATE.
+
+        If the cart already holds a lapsed lease on the SKU, those units are
+        free in quantity_available and must fit again as well.
+
+        Returns True if the reservation was made.
+        """
+        from django.utils import timezone
+        from apps.cart.models import CartItem
+
+        with transaction.atomic(using=self.db):
+            stock = self.select_for_update().filter(sku_id=sku_id).values_list(
+                'id', 'quantity_on_hand', 'quantity_reserved'
+            ).first()
+            if stock is None:
+                return False
+            inventory_id, on_hand, reserved = stock
+
+            leases = CartItem.objects.filter(sku_id=sku_id, reserved_until__lte=Now()).aggregate(
+                lapsed=Coalesce(Sum('quantity'), 0),
+                own_lapsed=Coalesce(Sum('quantity', filter=Q(cart_id=cart_id)), 0)
+            )
+            if on_hand - reserved + leases['lapsed'] - leases['own_lapsed'] < quantity:
+                return False
+
+            self.filter(id=inventory_id).update(
+                quantity_reserved=F('quantity_reserved') + quantity,
+                updated_at=timezone.now()
+            )
+
+        return True
+
+    def consume_many(self, quantities):
+        """
+        Consume reserved stock for several SKUs in a single guarded UPDATE.
+
+        Args:
+            quantities: Mapping of sku_id -> units to consume
+
+        Raises:
+            ValidationError: If any SKU has fewer units reserved or on hand;
+                             nothing is consumed in that case when called
+                             inside a transaction
+        """
+        from django.utils import timezone
+
+        if not quantities:
+            return 0
+
+        requested = Case(
+            *[When(sku_id=sku_id, then=Value(quantity)) for sku_id, quantity in quantities.items()],
+            default=Value(0)
+        )
+
+        updated = self.filter(
+            sku_id__in=quantities,
+            quantity_reserved__gte=requested,
+            quantity_on_hand__gte=requested
+        ).update(
+            quantity_on_hand=F('quantity_on_hand') - requested,
+            quantity_reserved=F('quantity_reserved') - requested,
+            updated_at=timezone.now()
+        )
+
+        if updated != len(quantities):
+            shortfalls = [
+                f"{sku_id} (requested {quantities[sku_id]}, {reserved} reserved, {on_hand} on hand)"
+                for sku_id, reserved, on_hand in self.filter(sku_id__in=quantities).values_list(
+                    'sku_id', 'quantity_reserved', 'quantity_on_hand'
+                )
+                if quantities[sku_id] > min(reserved, on_hand)
+            ]
+            raise ValidationError(f"Cannot consume stock for SKUs: {', '.join(shortfalls) or 'missing inventory'}")
+
+        return updated
+
+    def return_stock(self, quantities):
+        """
+        Put consumed units back on hand (e.g. cancelled unpaid orders) in a
+        single UPDATE for all SKUs.
+
+        Args:
+            quantities: Mapping of sku_id -> units to return
+        """
+        from django.utils import timezone
+
+        if not quantities:
+            return 0
+
+        return self.filter(sku_id__in=quantities).update(
+            quantity_on_hand=F('quantity_on_hand') + Case(
+                *[When(sku_id=sku_id, then=Value(quantity)) for sku_id, quantity in quantities.items()],
+                default=Value(0)
+            ),
+            updated_at=timezone.now()
+        )
+
+
 class Inventory(TimeStampedModel):
     """
     Tracks stock levels for each SKU with reservation support.
+
+    Reservations are leases: `quantity_reserved` counts every cart lease
+    until it is garbage collected, but leases past their `reserved_until`
+    no longer block other buyers, so expiry is implicit on read.
     """
     sku = models.OneToOneField(
         SKU,
@@ -23,7 +180,7 @@ class Inventory(TimeStampedModel):
 
     quantity_reserved = models.IntegerField(
         default=0,
-        help_text="Stock reserved in active carts"
+        help_text="Stock leased to carts (including lapsed leases not yet collected)"
     )
 
     warehouse_location = models.CharField(
@@ -43,16 +200,43 @@ class Inventory(TimeStampedModel):
         help_text="Alert when stock falls below this number"
     )
 
+    objects = InventoryQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = 'Inventory'
 
     def __str__(self):
-        return f"{self.sku.sku_code} - Available: {self.quantity_available}"
+        return f"{self.sku.sku_code} - On hand: {self.quantity_on_hand}, Reserved: {self.quantity_reserved}"
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        self.__dict__.pop('lapsed_reserved_quantity', None)
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None:
+            self.lapsed_reserved_quantity = Inventory.objects.filter(
+                id=self.id
+            ).with_lapsed_reservations().values_list('lapsed_reserved_quantity', flat=True).get()
+
+    @property
+    def quantity_lapsed(self):
+        """
+        Reserved stock whose cart lease has lapsed (free for new reservations).
+
+        Raises:
+            LookupError: If the row was loaded without with_lapsed_reservations()
+        """
+        if 'lapsed_reserved_quantity' not in self.__dict__:
+            if self._state.adding:
+                return 0
+            raise LookupError(
+                "Inventory was loaded without with_lapsed_reservations(); "
+                "annotate the queryset to read quantity_available"
+            )
+        return self.lapsed_reserved_quantity
 
     @property
     def quantity_available(self):
         """Returns stock available for new reservations."""
-        return max(0, self.quantity_on_hand - self.quantity_reserved)
+        return max(0, self.quantity_on_hand - self.quantity_reserved + self.quantity_lapsed)
 
     @property
     def is_low_stock(self):
@@ -78,7 +262,7 @@ class Inventory(TimeStampedModel):
         Raises InsufficientStockError if not enough stock available.
         """
         # Lock the row for update to prevent race conditions
-        inventory = Inventory.objects.select_for_update().get(id=self.id)
+        [inventory] = Inventory.objects.filter(id=self.id).lock_with_lapsed_reservations()
 
         if quantity > inventory.quantity_available:
             raise InsufficientStockError(
@@ -91,6 +275,29 @@ class Inventory(TimeStampedModel):
 
         return True
 
+    @transaction.atomic
+    def reacquire(self, held_quantity, quantity):
+        """
+        Re-acquire a lapsed cart lease, optionally changing its quantity.
+
+        The lapsed units are still counted in quantity_reserved but are
+        already free in quantity_available, so the whole new quantity must
+        fit and only the difference moves the counter.
+        """
+        [inventory] = Inventory.objects.filter(id=self.id).lock_with_lapsed_reservations()
+
+        if quantity > inventory.quantity_available:
+            raise InsufficientStockError(
+                f"Insufficient stock for {self.sku.sku_code}. "
+                f"Available: {inventory.quantity_available}, Requested: {quantity}"
+            )
+
+        if quantity != held_quantity:
+            inventory.quantity_reserved += quantity - held_quantity
+            inventory.save(update_fields=['quantity_reserved', 'updated_at'])
+
+        return True
+
     @transaction.atomic
     def release(self, quantity):
         """
@@ -1,6 +1,21 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.html import format_html
+from .exports import streaming_response
+from .fulfillment import FULFILLMENT_STATUSES, FulfillmentRow, bulk_transition, parse_tracking_file
 from .models import Order, OrderItem
+from .picklist import pick_list_response
+
+
+class TrackingImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV with order_number, tracking_code and optional status columns")
+    status = forms.ChoiceField(
+        choices=[(status.value, status.label) for status in FULFILLMENT_STATUSES],
+        help_text="Status for rows without a status column"
+    )
 
 
 class OrderItemInline(admin.TabularInline):
@@ -43,6 +58,8 @@ class OrderAdmin(admin.ModelAdmin):
         'full_address'
     ]
     inlines = [OrderItemInline]
+    actions = ['mark_shipped', 'mark_delivered', 'pick_list_csv', 'export_csv', 'export_ndjson']
+    change_list_template = 'admin/orders/order/change_list.html'
 
     fieldsets = (
         ('Order Information', {
@@ -74,6 +91,7 @@ class OrderAdmin(admin.ModelAdmin):
                 'subtotal_cents',
                 'shipping_cents',
                 'discount_cents',
+                'coupon_code',
                 'total_cents',
                 'currency'
             )
@@ -87,6 +105,87 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
 
+    def save_model(self, request, obj, form, change):
+        if change and 'status' in form.changed_data:
+            # Route status edits through set_status so listeners see the transition
+            new_status = obj.status
+            obj.status = form.initial['status']
+            super().save_model(request, obj, form, change)
+            obj.set_status(new_status)
+        else:
+            super().save_model(request, obj, form, change)
+
+    def get_urls(self):
+        return [
+            path(
+                'import-tracking/',
+                self.admin_site.admin_view(self.import_tracking_view),
+                name='orders_order_import_tracking'
+            ),
+        ] + super().get_urls()
+
+    def import_tracking_view(self, request):
+        """Upload a tracking code file and mark its orders in bulk."""
+        form = TrackingImportForm(request.POST or None, request.FILES or None)
+
+        if request.method == 'POST' and form.is_valid():
+            try:
+                rows = parse_tracking_file(form.cleaned_data['file'], form.cleaned_data['status'])
+                result = bulk_transition(rows)
+            except ValueError as e:
+                self.message_user(request, str(e), messages.ERROR)
+            else:
+                self._report(request, result)
+                return redirect('admin:orders_order_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import tracking codes',
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/orders/order/import_tracking.html', context)
+
+    @admin.action(description='Mark selected orders as shipped')
+    def mark_shipped(self, request, queryset):
+        self._bulk_mark(request, queryset, Order.Status.SHIPPED)
+
+    @admin.action(description='Mark selected orders as delivered')
+    def mark_delivered(self, request, queryset):
+        self._bulk_mark(request, queryset, Order.Status.DELIVERED)
+
+    def _bulk_mark(self, request, queryset, status):
+        result = bulk_transition(
+            FulfillmentRow(order_number=order_number, status=status, tracking_code='')
+            for order_number in queryset.values_list('order_number', flat=True)
+        )
+        self._report(request, result)
+
+    def _report(self, request, result):
+        self.message_user(request, f"{len(result.updated)} orders updated.")
+        if result.skipped:
+            self.message_user(
+                request,
+                f"Skipped {len(result.skipped)}: " + ", ".join(
+                    f"{entry['order_number']} ({entry['status']})" for entry in result.skipped
+                ),
+                messages.WARNING
+            )
+        if result.missing:
+            self.message_user(request, f"Not found: {', '.join(result.missing)}", messages.WARNING)
+
+    @admin.action(description='Pick list for selected confirmed orders (CSV)')
+    def pick_list_csv(self, request, queryset):
+        return pick_list_response(queryset)
+
+    @admin.action(description='Export selected orders with items (CSV)')
+    def export_csv(self, request, queryset):
+        return streaming_response(queryset, 'csv')
+
+    @admin.action(description='Export selected orders with items (NDJSON)')
+    def export_ndjson(self, request, queryset):
+        return streaming_response(queryset, 'ndjson')
+
     def status_display(self, obj):
         color_map = {
             'PENDING': 'orange',
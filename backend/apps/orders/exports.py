@@ -0,0 +1,141 @@
+"""
+Streaming exports of orders and their items.
+
+Rows are read with `.iterator()` (a server-side cursor on Postgres) and
+written out as they arrive, so memory use stays constant whatever the
+date range.
+
+- CSV: one row per order item, with the order columns repeated.
+- NDJSON: one JSON object per order, with its items nested.
+"""
+
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .models import Order, OrderItem
+
+EXPORT_CHUNK_SIZE = 2000
+
+ORDER_COLUMNS = (
+    'order_number',
+    'created_at',
+    'status',
+    'customer_name',
+    'customer_email',
+    'customer_cpf',
+    'shipping_city',
+    'shipping_state',
+    'shipping_cep',
+    'subtotal_cents',
+    'shipping_cents',
+    'discount_cents',
+    'total_cents',
+    'currency',
+)
+
+ITEM_COLUMNS = (
+    'sku_code',
+    'product_name',
+    'quantity',
+    'unit_price_cents',
+    'line_total_cents',
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def orders_in_range(start=None, end=None):
+    """Orders created in [start, end)."""
+    orders = Order.objects.all()
+    if start is not None:
+        orders = orders.filter(created_at__gte=start)
+    if end is not None:
+        orders = orders.filter(created_at__lt=end)
+    return orders
+
+
+def _item_rows(orders):
+    """
+    Yield (order_values, item_values) per order item, ordered so the items
+    of an order are consecutive.
+    """
+    rows = OrderItem.objects.filter(order__in=orders).order_by(
+        'order__created_at', 'order_id', 'created_at'
+    ).values_list(
+        *[f'order__{column}' for column in ORDER_COLUMNS],
+        'sku__sku_code',
+        'product_snapshot',
+        'quantity',
+        'unit_price_cents',
+        'line_total_cents',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    order_count = len(ORDER_COLUMNS)
+    for row in rows:
+        order_values = list(row[:order_count])
+        # created_at in local time, as shown in the admin
+        order_values[1] = timezone.localtime(order_values[1]).isoformat()
+
+        sku_code, snapshot, quantity, unit_price_cents, line_total_cents = row[order_count:]
+        item_values = (
+            sku_code,
+            (snapshot or {}).get('product_name', ''),
+            quantity,
+            unit_price_cents,
+            line_total_cents,
+        )
+        yield order_values, item_values
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(orders):
+    """Yield CSV lines: a header, then one line per order item."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(ORDER_COLUMNS + ITEM_COLUMNS)
+    for order_values, item_values in _item_rows(orders):
+        yield writer.writerow(list(order_values) + list(item_values))
+
+
+def iter_ndjson(orders):
+    """Yield one JSON line per order with its items nested."""
+    current_number, current = None, None
+
+    for order_values, item_values in _item_rows(orders):
+        if order_values[0] != current_number:
+            if current is not None:
+                yield json.dumps(current, cls=DjangoJSONEncoder) + '\n'
+            current_number = order_values[0]
+            current = dict(zip(ORDER_COLUMNS, order_values))
+            current['items'] = []
+        current['items'].append(dict(zip(ITEM_COLUMNS, item_values)))
+
+    if current is not None:
+        yield json.dumps(current, cls=DjangoJSONEncoder) + '\n'
+
+
+EXPORTERS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+}
+
+
+def streaming_response(orders, export_format):
+    """Stream an export of `orders` as a file download."""
+    filename = f"orders-{timezone.localtime():%Y%m%d-%H%M}.{export_format}"
+    response = StreamingHttpResponse(
+        EXPORTERS[export_format](orders),
+        content_type=CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,143 @@
+"""
+Bulk fulfillment: move many orders to SHIPPED or DELIVERED and record
+their tracking codes.
+
+The orders are locked and loaded in one query, checked against
+Order.TRANSITIONS and written with one UPDATE per target status (tracking
+codes are set in the same statement). `order_status_changed` is still sent
+for every order that moved, so listeners see the same events as with
+`Order.set_status`.
+"""
+
+import csv
+import io
+from collections import defaultdict, namedtuple
+from dataclasses import dataclass, field
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from .models import Order
+from .signals import order_status_changed
+
+FULFILLMENT_STATUSES = (Order.Status.SHIPPED, Order.Status.DELIVERED)
+
+FulfillmentRow = namedtuple('FulfillmentRow', ['order_number', 'status', 'tracking_code'])
+
+
+@dataclass
+class FulfillmentResult:
+    """
+    Outcome of a bulk transition.
+    """
+    updated: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    missing: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            'updated': self.updated,
+            'skipped': self.skipped,
+            'missing': self.missing,
+        }
+
+
+def parse_tracking_file(file, default_status=Order.Status.SHIPPED):
+    """
+    Read fulfillment rows from a CSV upload.
+
+    The header must have an `order_number` column; `tracking_code` and
+    `status` are optional (rows without a status use `default_status`).
+
+    Raises:
+        ValueError: If the file has no order_number column
+    """
+    content = file.read()
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    reader = csv.DictReader(io.StringIO(content))
+    if 'order_number' not in (reader.fieldnames or []):
+        raise ValueError("The file must have an order_number column")
+
+    return [
+        FulfillmentRow(
+            order_number=row['order_number'].strip(),
+            status=(row.get('status') or default_status).strip().upper(),
+            tracking_code=(row.get('tracking_code') or '').strip(),
+        )
+        for row in reader
+        if (row.get('order_number') or '').strip()
+    ]
+
+
+def bulk_transition(rows):
+    """
+    Apply fulfillment rows in one transaction.
+
+    An order already in the target status only has its tracking code
+    updated (no event). Orders whose current status does not allow the
+    transition are skipped.
+
+    Args:
+        rows: Iterable of FulfillmentRow (the last row wins for repeated orders)
+
+    Returns:
+        FulfillmentResult
+
+    Raises:
+        ValueError: If a row targets a status other than SHIPPED or DELIVERED
+    """
+    rows_by_number = {}
+    for row in rows:
+        if row.status not in FULFILLMENT_STATUSES:
+            raise ValueError(f"Invalid fulfillment status for {row.order_number}: {row.status}")
+        rows_by_number[row.order_number] = row
+
+    result = FulfillmentResult()
+    now = timezone.now()
+
+    with transaction.atomic():
+        orders = Order.objects.select_for_update().filter(order_number__in=rows_by_number)
+        orders = {order.order_number: order for order in orders}
+
+        groups = defaultdict(list)
+        for order_number, row in rows_by_number.items():
+            order = orders.get(order_number)
+            if order is None:
+                result.missing.append(order_number)
+            elif order.status == row.status and row.tracking_code:
+                groups[row.status].append((order, row.tracking_code))
+            elif Order.can_transition(order.status, row.status):
+                groups[row.status].append((order, row.tracking_code))
+            else:
+                result.skipped.append({
+                    'order_number': order_number,
+                    'status': order.status,
+                    'reason': f"Cannot change from {order.status} to {row.status}",
+                })
+
+        for status, entries in groups.items():
+            fields = {'status': status, 'updated_at': now}
+            tracking = [When(id=order.id, then=Value(code)) for order, code in entries if code]
+            if tracking:
+                fields['tracking_code'] = Case(*tracking, default=F('tracking_code'))
+
+            Order.objects.filter(id__in=[order.id for order, _ in entries]).update(**fields)
+
+        for status, entries in groups.items():
+            for order, code in entries:
+                old_status = order.status
+                order.status = status
+                order.tracking_code = code or order.tracking_code
+                order.updated_at = now
+                result.updated.append(order.order_number)
+
+                if old_status != status:
+                    order_status_changed.send(
+                        sender=Order,
+                        order=order,
+                        old_status=old_status,
+                        new_status=status
+                    )
+
+    return result
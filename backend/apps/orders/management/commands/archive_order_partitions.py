@@ -0,0 +1,34 @@
+from datetime import date, datetime, timezone
+from django.core.management.base import BaseCommand, CommandError
+from apps.core import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Detach monthly partitions of the order tables older than a month. "
+        "Detached partitions stay in the database as plain tables until dumped and dropped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            required=True,
+            help="Detach months ending on or before this month (YYYY-MM, exclusive)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            month = date.fromisoformat(f"{options['before']}-01")
+        except ValueError:
+            raise CommandError("--before must be a month in YYYY-MM format")
+
+        cutoff = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+
+        detached = []
+        for table in partitioning.partitioned_tables():
+            detached += partitioning.detach_partitions_before(table, cutoff)
+
+        if not detached:
+            self.stdout.write("No partitions to detach")
+        for name in detached:
+            self.stdout.write(self.style.SUCCESS(f"Detached {name}"))
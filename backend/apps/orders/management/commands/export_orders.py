@@ -0,0 +1,38 @@
+from datetime import date, datetime, time, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.orders.exports import EXPORTERS, orders_in_range
+
+
+class Command(BaseCommand):
+    help = "Stream orders with their items as CSV or NDJSON, with constant memory use."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day to export (YYYY-MM-DD)")
+        parser.add_argument('--end', help="Last day to export, inclusive (YYYY-MM-DD)")
+        parser.add_argument('--format', choices=sorted(EXPORTERS), default='csv')
+        parser.add_argument('--output', help="File to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        start = self._day_start(options['start'])
+        end = self._day_start(options['end'], days_after=1)
+        orders = orders_in_range(start, end)
+
+        exporter = EXPORTERS[options['format']]
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(exporter(orders))
+        else:
+            for chunk in exporter(orders):
+                self.stdout.write(chunk, ending='')
+
+    def _day_start(self, value, days_after=0):
+        """Aware local midnight of a YYYY-MM-DD day (plus days_after)."""
+        if not value:
+            return None
+        try:
+            day = date.fromisoformat(value)
+        except ValueError:
+            raise CommandError("Dates must be in YYYY-MM-DD format")
+        return timezone.make_aware(datetime.combine(day, time.min)) + timedelta(days=days_after)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from apps.orders.picklist import iter_pick_list_csv
+
+
+class Command(BaseCommand):
+    help = "Write the warehouse pick list (CSV) of all confirmed orders, in route order."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="File to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(iter_pick_list_csv())
+        else:
+            for chunk in iter_pick_list_csv():
+                self.stdout.write(chunk, ending='')
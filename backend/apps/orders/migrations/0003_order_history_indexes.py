@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0002_order_number_counter"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="order",
+            name="orders_orde_custome_ca0107_idx",
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["customer_email", "-created_at"],
+                name="orders_orde_custome_77baef_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "-created_at"], name="orders_orde_user_id_0ae59f_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.db import migrations
+from apps.core.partitioning import partition_table
+
+
+def partition_order_tables(apps, schema_editor):
+    """Partition orders and order items by month (Postgres only)."""
+    for model_name in ('Order', 'OrderItem'):
+        model = apps.get_model('orders', model_name)
+        partition_table(
+            model._meta.db_table,
+            settings.PARTITION_MONTHS_AHEAD,
+            connection=schema_editor.connection
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0004_orderitem_order_db_constraint"),
+        # Drops the payments -> orders FK that would block the swap
+        ("payments", "0002_paymenttransaction_order_db_constraint"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_order_tables),
+    ]
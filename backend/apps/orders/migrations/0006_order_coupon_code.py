@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0005_partition_orders_by_created_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="coupon_code",
+            field=models.CharField(
+                blank=True, help_text="Coupon applied at checkout", max_length=50
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+from apps.core.partitioning import create_default_partition, enforce_reference, enforce_unique
+
+
+def guard_order_partitions(apps, schema_editor):
+    """
+    Add DEFAULT partitions, global order_number uniqueness and the
+    order item -> order reference check (Postgres only).
+    """
+    connection = schema_editor.connection
+    order_table = apps.get_model('orders', 'Order')._meta.db_table
+    item_table = apps.get_model('orders', 'OrderItem')._meta.db_table
+
+    for table in (order_table, item_table):
+        create_default_partition(table, connection=connection)
+    enforce_unique(order_table, 'order_number', connection=connection)
+    enforce_reference(item_table, 'order_id', order_table, connection=connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0006_order_coupon_code"),
+    ]
+
+    operations = [
+        migrations.RunPython(guard_order_partitions),
+    ]
@@ -2,8 +2,8 @@ from django.db import models
 from django.conf import settings
 from apps.core.models import TimeStampedModel
 from apps.products.models import SKU
-import random
-import string
+from .numbering import next_order_number
+from .signals import order_status_changed
 
 
 class Order(TimeStampedModel):
@@ -19,6 +19,15 @@ class Order(TimeStampedModel):
         CANCELLED = 'CANCELLED', 'Cancelled'
         REFUNDED = 'REFUNDED', 'Refunded'
 
+    # Allowed status transitions (enforced by bulk fulfillment)
+    TRANSITIONS = {
+        Status.PENDING: {Status.CONFIRMED, Status.CANCELLED},
+        Status.CONFIRMED: {Status.PROCESSING, Status.SHIPPED, Status.CANCELLED, Status.REFUNDED},
+        Status.PROCESSING: {Status.SHIPPED, Status.CANCELLED, Status.REFUNDED},
+        Status.SHIPPED: {Status.DELIVERED, Status.REFUNDED},
+        Status.DELIVERED: {Status.REFUNDED},
+    }
+
     order_number = models.CharField(
         max_length=20,
         unique=True,
@@ -69,6 +78,7 @@ class Order(TimeStampedModel):
     subtotal_cents = models.IntegerField(help_text="Items subtotal in cents")
     shipping_cents = models.IntegerField(default=0, help_text="Shipping cost in cents")
     discount_cents = models.IntegerField(default=0, help_text="Total discount in cents")
+    coupon_code = models.CharField(max_length=50, blank=True, help_text="Coupon applied at checkout")
     total_cents = models.IntegerField(help_text="Final total in cents")
     currency = models.CharField(max_length=3, default='BRL')
 
@@ -80,7 +90,8 @@ class Order(TimeStampedModel):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['order_number']),
-            models.Index(fields=['customer_email']),
+            models.Index(fields=['customer_email', '-created_at']),
+            models.Index(fields=['user', '-created_at']),
             models.Index(fields=['status', 'created_at']),
         ]
 
@@ -92,26 +103,42 @@ class Order(TimeStampedModel):
             self.order_number = self.generate_order_number()
         super().save(*args, **kwargs)
 
-    @staticmethod
-    def generate_order_number():
+    @classmethod
+    def can_transition(cls, old_status, new_status):
+        """Whether the fulfillment state machine allows old -> new."""
+        return new_status in cls.TRANSITIONS.get(old_status, ())
+
+    def set_status(self, status):
         """
-        Generate unique order number.
-        Format: NCH-YYYYMMDD-XXXXX
+        Change the order status and send `order_status_changed`.
+        Call inside a transaction with the order row locked so the
+        transition (old -> new) is reliable.
+
+        Returns:
+            True if the status changed
         """
-        from django.utils import timezone
-        import random
-        import string
+        old_status = self.status
+        if old_status == status:
+            return False
 
-        date_part = timezone.now().strftime('%Y%m%d')
-        random_part = ''.join(random.choices(string.digits, k=5))
-        order_number = f"NCH-{date_part}-{random_part}"
+        self.status = status
+        self.save(update_fields=['status', 'updated_at'])
 
-        # Ensure uniqueness
-        while Order.objects.filter(order_number=order_number).exists():
-            random_part = ''.join(random.choices(string.digits, k=5))
-            order_number = f"NCH-{date_part}-{random_part}"
+        order_status_changed.send(
+            sender=Order,
+            order=self,
+            old_status=old_status,
+            new_status=status
+        )
+        return True
 
-        return order_number
+    @staticmethod
+    def generate_order_number():
+        """
+        Generate unique order number.
+        Format: NCH-YYYYMMDD-XXXXXX (see apps.orders.numbering)
+        """
+        return next_order_number()
 
     @property
     def total_items(self):
@@ -149,10 +176,12 @@ class OrderItem(TimeStampedModel):
     Individual line item in an order.
     Captures product snapshot at time of purchase.
     """
+    # No database FK: orders_order is partitioned (see apps.core.partitioning)
     order = models.ForeignKey(
         Order,
         on_delete=models.CASCADE,
-        related_name='items'
+        related_name='items',
+        db_constraint=False
     )
 
     sku = models.ForeignKey(
@@ -191,18 +220,26 @@ class OrderItem(TimeStampedModel):
 
         # Capture product snapshot
         if not self.product_snapshot:
-            self.product_snapshot = {
-                'product_name': self.sku.product.name,
-                'sku_code': self.sku.sku_code,
-                'condition': self.sku.condition,
-                'language': self.sku.language,
-                'is_foil': self.sku.is_foil,
-                'set_name': self.sku.product.set_name,
-                'rarity': self.sku.product.rarity,
-            }
+            self.product_snapshot = self.build_snapshot(self.sku)
 
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def build_snapshot(sku):
+        """
+        Product details to store with the line item.
+        Load the SKU with select_related('product') to avoid a query per line.
+        """
+        return {
+            'product_name': sku.product.name,
+            'sku_code': sku.sku_code,
+            'condition': sku.condition,
+            'language': sku.language,
+            'is_foil': sku.is_foil,
+            'set_name': sku.product.set_name,
+            'rarity': sku.product.rarity,
+        }
+
     @property
     def unit_price_brl(self):
         """Unit price in BRL."""
@@ -212,3 +249,11 @@ class OrderItem(TimeStampedModel):
     def line_total_brl(self):
         """Line total in BRL."""
         return self.line_total_cents / 100
+
+
+class OrderNumberCounter(models.Model):
+    """
+    Order number counter for databases without sequences (e.g. SQLite).
+    Postgres uses the orders_order_number_seq sequence instead.
+    """
+    id = models.BigAutoField(primary_key=True)
@@ -0,0 +1,77 @@
+"""
+Order number generation.
+
+Order numbers come from a database sequence, so they never collide and
+need no existence check. The counter is scrambled with a keyed Feistel
+permutation over 0..999999 so consecutive orders do not get consecutive,
+guessable numbers.
+
+Format: NCH-YYYYMMDD-XXXXXX. Numbers repeat only if more than a million
+orders are placed on the same day.
+"""
+
+import hashlib
+import hmac
+from django.conf import settings
+from django.db import connections, router
+from django.utils import timezone
+
+SEQUENCE_NAME = 'orders_order_number_seq'
+
+# The permuted value is split into two base-1000 halves (6 digits total)
+HALF_MODULUS = 1000
+FEISTEL_ROUNDS = 4
+
+
+def _round_value(round_number, value):
+    """Keyed round function of the Feistel network."""
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(),
+        f"order-number:{round_number}:{value}".encode(),
+        hashlib.sha256
+    ).digest()
+    return int.from_bytes(digest[:4], 'big') % HALF_MODULUS
+
+
+def permute(counter):
+    """
+    Map a counter onto 0..999999 bijectively, so distinct counters
+    (modulo one million) always give distinct numbers.
+    """
+    left, right = divmod(counter % (HALF_MODULUS * HALF_MODULUS), HALF_MODULUS)
+    for round_number in range(FEISTEL_ROUNDS):
+        left, right = right, (left + _round_value(round_number, right)) % HALF_MODULUS
+    return left * HALF_MODULUS + right
+
+
+def next_counter():
+    """
+    Next value of the order number counter.
+    Uses a Postgres sequence, or a counter table on other databases.
+    """
+    from .models import Order, OrderNumberCounter
+
+    connection = connections[router.db_for_write(Order)]
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT nextval(%s)", [SEQUENCE_NAME])
+            return cursor.fetchone()[0]
+
+    return OrderNumberCounter.objects.create().id
+
+
+def next_order_number():
+    """Generate a unique order number: NCH-YYYYMMDD-XXXXXX."""
+    date_part = timezone.now().strftime('%Y%m%d')
+    return f"NCH-{date_part}-{permute(next_counter()):06d}"
+
+
+def create_sequence(using):
+    """Create the order number sequence if the database supports it."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {connection.ops.quote_name(SEQUENCE_NAME)}")
@@ -60,6 +60,7 @@ class OrderSerializer(serializers.ModelSerializer):
             'subtotal_brl',
             'shipping_cents',
             'discount_cents',
+            'coupon_code',
             'total_cents',
             'total_brl',
             'currency',
@@ -83,6 +84,32 @@ class OrderSerializer(serializers.ModelSerializer):
         return obj.total_brl
 
 
+class OrderListSerializer(serializers.ModelSerializer):
+    """
+    Compact serializer for order history lists (no line items).
+    Expects `item_quantity` to be annotated on the queryset.
+    """
+    total_brl = serializers.SerializerMethodField()
+    total_items = serializers.IntegerField(source='item_quantity', read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id',
+            'order_number',
+            'status',
+            'total_cents',
+            'total_brl',
+            'currency',
+            'total_items',
+            'tracking_code',
+            'created_at',
+        ]
+
+    def get_total_brl(self, obj):
+        return obj.total_brl
+
+
 class CheckoutSerializer(serializers.Serializer):
     """
     Serializer for checkout request.
@@ -108,6 +135,7 @@ class CheckoutSerializer(serializers.Serializer):
     )
 
     # Optional
+    coupon_code = serializers.CharField(max_length=50, required=False, allow_blank=True)
     notes = serializers.CharField(required=False, allow_blank=True)
 
     def validate_shipping_state(self, value):
@@ -130,3 +158,27 @@ class CheckoutSerializer(serializers.Serializer):
             raise serializers.ValidationError("CPF must have 11 digits")
 
         return value
+
+
+class FulfillmentOrderSerializer(serializers.Serializer):
+    """
+    One order of a bulk fulfillment request.
+    """
+    order_number = serializers.CharField(max_length=20)
+    tracking_code = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    status = serializers.ChoiceField(choices=['SHIPPED', 'DELIVERED'], required=False)
+
+
+class FulfillmentSerializer(serializers.Serializer):
+    """
+    Serializer for bulk fulfillment: a list of orders (JSON) or a CSV
+    `file` with order_number, tracking_code and optional status columns.
+    """
+    status = serializers.ChoiceField(choices=['SHIPPED', 'DELIVERED'], default='SHIPPED')
+    orders = FulfillmentOrderSerializer(many=True, required=False)
+    file = serializers.FileField(required=False)
+
+    def validate(self, data):
+        if not data.get('orders') and not data.get('file'):
+            raise serializers.ValidationError("Send either orders or a file")
+        return data
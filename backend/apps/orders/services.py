@@ -0,0 +1,329 @@
+"""
+Checkout workflow.
+
+Checkout runs in two phases so inventory rows are never locked while a
+payment provider is being called:
+
+1. `place_order`: short transaction that creates the order in PENDING
+   (pending payment), consumes the reserved stock, records a PENDING
+   PaymentTransaction under the idempotency key and clears the cart.
+2. `request_payment`: calls the provider outside any transaction and
+   stores its response. If the provider fails, `cancel_unpaid_order`
+   compensates by returning the stock and cancelling the order.
+
+`checkout` runs both phases for a cart and is shared by the synchronous
+endpoint and the `process_checkout` Celery task.
+"""
+
+import logging
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from apps.core.exceptions import (
+    CartExpiredError,
+    CheckoutError,
+    InsufficientStockError,
+    InvalidCouponError,
+    PaymentProviderError,
+)
+from apps.cart.models import Cart
+from apps.inventory.models import Inventory
+from apps.payments.models import PaymentTransaction
+from apps.payments.providers.registry import UnknownProviderError, providers as payment_providers
+from apps.payments.providers.base import PaymentRequest
+from apps.promotions import engine as promotions
+from apps.shipping import quotes as shipping_quotes
+from .models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+
+def checkout_idempotency_key(cart_id, payment_method):
+    """
+    Deterministic key for a cart/payment submission.
+
+    Includes the cart id so a session can place several orders, while
+    duplicate submissions of the same cart map to the same payment.
+    """
+    return f"cart_{cart_id}_{payment_method}"
+
+
+def checkout(cart_id, customer_data):
+    """
+    Turn a cart into an order and request its payment.
+
+    Args:
+        cart_id: ID of the cart being checked out
+        customer_data: Validated CheckoutSerializer data
+
+    Returns:
+        Tuple of (order, payment_transaction, created). `created` is False
+        when the same cart/payment was already submitted.
+
+    Raises:
+        CheckoutError: If the order could not be placed or paid
+    """
+    idempotency_key = checkout_idempotency_key(cart_id, customer_data['payment_method'])
+
+    existing_payment = _find_payment(idempotency_key)
+    if existing_payment:
+        return existing_payment.order, existing_payment, False
+
+    cart = Cart.objects.filter(id=cart_id).first()
+    if cart is None:
+        raise CheckoutError("Cart was already checked out")
+
+    # Phase 1: short transaction holding the inventory locks
+    try:
+        order, payment = place_order(
+            cart,
+            customer_data,
+            customer_data['payment_method'],
+            idempotency_key
+        )
+    except Exception as e:
+        # A concurrent duplicate submit may have won the race on the cart
+        existing_payment = _find_payment(idempotency_key)
+        if existing_payment:
+            return existing_payment.order, existing_payment, False
+        raise CheckoutError(str(e)) from e
+
+    # Phase 2: provider call with no locks held (compensates on failure)
+    try:
+        request_payment(order, payment)
+    except PaymentProviderError as e:
+        raise CheckoutError(str(e)) from e
+
+    return order, payment, True
+
+
+def _find_payment(idempotency_key):
+    return PaymentTransaction.objects.filter(
+        idempotency_key=idempotency_key
+    ).select_related('order').first()
+
+
+def place_order(cart, customer_data, payment_method, idempotency_key):
+    """
+    Phase 1: create the order and take the stock, then commit.
+
+    Args:
+        cart: Cart being checked out
+        customer_data: Validated CheckoutSerializer data
+        payment_method: PIX, BOLETO, CREDIT_CARD or DEBIT_CARD
+        idempotency_key: Key identifying this cart/payment submission
+
+    Returns:
+        Tuple of (order, payment_transaction)
+
+    Raises:
+        CartExpiredError: If the cart was already checked out concurrently
+        CheckoutError: If the payment method has no provider, the cart is
+                       empty, the coupon is invalid or the shipping CEP is
+                       not served
+        InsufficientStockError: If a lapsed line's stock went to another cart
+    """
+    # Fail before taking any stock if the method has no usable provider
+    provider_name = payment_providers.name_for_method(payment_method)
+    try:
+        payment_providers.get(provider_name)
+    except UnknownProviderError as e:
+        raise CheckoutError(f"Payment method {payment_method} is not available") from e
+
+    with transaction.atomic():
+        # Serialize concurrent submits of the same cart
+        if not Cart.objects.select_for_update().filter(id=cart.id).exists():
+            raise CartExpiredError("Cart was already checked out")
+
+        # All lines with their SKU and product in one query
+        cart_items = list(cart.items.select_related('sku__product'))
+        if not cart_items:
+            raise CheckoutError("Cart is empty")
+
+        _reacquire_lapsed_lines(cart, cart_items)
+
+        coupon_code = promotions.normalize_code(customer_data.get('coupon_code'))
+        try:
+            promotion = promotions.evaluate(cart_items, coupon_code)
+        except InvalidCouponError as e:
+            raise CheckoutError(str(e)) from e
+        subtotal_cents = promotion.subtotal_cents
+        discount_cents = promotion.discount_cents
+
+        shipping = shipping_quotes.quote(
+            customer_data['shipping_cep'],
+            sum(item.quantity for item in cart_items),
+            subtotal_cents - discount_cents
+        )
+        if shipping is None:
+            raise CheckoutError("Shipping is not available for this CEP")
+
+        order = Order.objects.create(
+            status=Order.Status.PENDING,
+            user_id=cart.user_id,
+            customer_email=customer_data['customer_email'],
+            customer_name=customer_data['customer_name'],
+            customer_cpf=customer_data['customer_cpf'],
+            customer_phone=customer_data['customer_phone'],
+            shipping_street=customer_data['shipping_street'],
+            shipping_number=customer_data['shipping_number'],
+            shipping_complement=customer_data.get('shipping_complement', ''),
+            shipping_neighborhood=customer_data['shipping_neighborhood'],
+            shipping_city=customer_data['shipping_city'],
+            shipping_state=customer_data['shipping_state'],
+            shipping_cep=customer_data['shipping_cep'],
+            notes=customer_data.get('notes', ''),
+            subtotal_cents=subtotal_cents,
+            shipping_cents=shipping.price_cents,
+            discount_cents=discount_cents,
+            coupon_code=coupon_code,
+            total_cents=subtotal_cents - discount_cents + shipping.price_cents,
+        )
+
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                sku=cart_item.sku,
+                quantity=cart_item.quantity,
+                unit_price_cents=cart_item.unit_price_cents,
+                line_total_cents=cart_item.line_total_cents,
+                product_snapshot=OrderItem.build_snapshot(cart_item.sku),
+            )
+            for cart_item in cart_items
+        ])
+
+        # Consume reserved inventory for every line in one statement
+        Inventory.objects.consume_many({
+            cart_item.sku_id: cart_item.quantity for cart_item in cart_items
+        })
+
+        payment = PaymentTransaction.objects.create(
+            order=order,
+            idempotency_key=idempotency_key,
+            provider=provider_name,
+            method=payment_method,
+            status=PaymentTransaction.Status.PENDING,
+            amount_cents=order.total_cents,
+        )
+
+        # Clear cart after successful checkout
+        # Use release_reservations=False because consume() already handled it
+        cart.clear(release_reservations=False)
+        cart.delete()
+
+    return order, payment
+
+
+def _reacquire_lapsed_lines(cart, cart_items):
+    """
+    Re-take the stock of lines whose lease lapsed before checkout.
+
+    Lapsed units are already free in quantity_available and may have been
+    reserved by another cart, yet they still count in quantity_reserved,
+    so consume_many alone would take them. The inventory rows of lapsed
+    lines are locked first (in id order), then the leases are read in
+    separate statements, so leases renewed by another cart while we waited
+    are not counted as free. Each lapsed line must fit in the free stock.
+
+    Raises:
+        InsufficientStockError: If a lapsed line no longer fits
+    """
+    now = timezone.now()
+    lapsed = {cart_item.sku_id: cart_item for cart_item in cart_items if cart_item.reserved_until <= now}
+    if not lapsed:
+        return
+
+    inventories = Inventory.objects.filter(sku_id__in=lapsed).lock_with_lapsed_reservations()
+    own_lapsed = dict(
+        cart.items.filter(sku_id__in=lapsed, reserved_until__lte=now).values_list('sku_id', 'quantity')
+    )
+
+    free = {
+        inventory.sku_id: (
+            inventory.quantity_on_hand - inventory.quantity_reserved
+            + inventory.quantity_lapsed - own_lapsed.get(inventory.sku_id, 0)
+        )
+        for inventory in inventories
+    }
+    for sku_id, cart_item in lapsed.items():
+        if free.get(sku_id, -1) < 0:
+            raise InsufficientStockError(
+                f"Reservation for {cart_item.sku.sku_code} expired and the stock "
+                f"is no longer available"
+            )
+
+
+def request_payment(order, payment):
+    """
+    Phase 2: create the payment with the provider, outside any transaction.
+
+    On failure the order is cancelled and its stock returned before the
+    error is re-raised.
+
+    Raises:
+        PaymentProviderError: If the provider call fails
+    """
+    payment_request = PaymentRequest(
+        idempotency_key=payment.idempotency_key,
+        order_id=str(order.id),
+        order_number=order.order_number,
+        amount_cents=order.total_cents,
+        method=payment.method,
+        customer_email=order.customer_email,
+        customer_name=order.customer_name,
+        customer_cpf=order.customer_cpf,
+        customer_phone=order.customer_phone,
+    )
+
+    try:
+        provider = payment_providers.get(payment.provider)
+        payment_response = provider.create_payment(payment_request)
+
+        if not payment_response.success:
+            raise PaymentProviderError(payment_response.error_message or "Payment creation failed")
+    except Exception as e:
+        logger.warning(f"Payment creation failed for order {order.order_number}: {str(e)}")
+        cancel_unpaid_order(order, payment, reason=str(e))
+        if isinstance(e, PaymentProviderError):
+            raise
+        raise PaymentProviderError(str(e)) from e
+
+    payment.provider_transaction_id = payment_response.provider_transaction_id
+    payment.status = payment_response.status
+    payment.fees_cents = payment_response.fees_cents
+    payment.pix_qr_code = payment_response.pix_qr_code or ''
+    payment.pix_copy_paste = payment_response.pix_copy_paste or ''
+    payment.boleto_url = payment_response.boleto_url or ''
+    payment.boleto_barcode = payment_response.boleto_barcode or ''
+    payment.expires_at = payment_response.expires_at
+    payment.raw_payload = payment_response.raw_payload or {}
+    payment.save()
+
+    return payment
+
+
+def cancel_unpaid_order(order, payment, reason=''):
+    """
+    Compensate a placed order whose payment cannot go ahead: return its
+    stock, cancel the order and fail the payment.
+
+    Safe to call more than once; only a PENDING order is compensated.
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(id=order.id)
+        if order.status != Order.Status.PENDING:
+            return False
+
+        quantities = defaultdict(int)
+        for sku_id, quantity in order.items.values_list('sku_id', 'quantity'):
+            quantities[sku_id] += quantity
+        Inventory.objects.return_stock(quantities)
+
+        order.set_status(Order.Status.CANCELLED)
+
+        payment.status = PaymentTransaction.Status.FAILED
+        payment.raw_payload = {'error': reason}
+        payment.save(update_fields=['status', 'raw_payload', 'updated_at'])
+
+    logger.info(f"Cancelled unpaid order {order.order_number}: {reason}")
+    return True
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_migrate
+from django.dispatch import Signal, receiver
+from .numbering import create_sequence
+
+# Sent by Order.set_status inside the caller's transaction.
+# Arguments: order, old_status, new_status
+order_status_changed = Signal()
+
+
+@receiver(post_migrate)
+def create_order_number_sequence(sender, using, **kwargs):
+    """
+    Create the order number sequence after migrate (and after the test
+    database is created, which skips migrations).
+    """
+    if sender.name == 'apps.orders':
+        create_sequence(using)
@@ -0,0 +1,53 @@
+from celery import shared_task
+from django.conf import settings
+from apps.core import partitioning
+from apps.core.exceptions import CheckoutError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(track_started=True)
+def process_checkout(cart_id, customer_data):
+    """
+    Place the order for a cart and request its payment.
+    Queued by the asynchronous checkout mode; the result is read back by
+    the checkout job status endpoint.
+
+    Returns:
+        Dict with `order_number` and `transaction_id` on success,
+        or `error` with the failure message
+    """
+    from .services import checkout
+
+    try:
+        order, payment, created = checkout(cart_id, customer_data)
+    except CheckoutError as e:
+        logger.warning(f"Async checkout failed for cart {cart_id}: {str(e)}")
+        return {'error': str(e)}
+
+    return {
+        'order_number': order.order_number,
+        'transaction_id': str(payment.id),
+        'created': created,
+    }
+
+
+@shared_task
+def maintain_partitions():
+    """
+    Create upcoming monthly partitions of the order tables and detach the
+    ones past PARTITION_RETENTION_MONTHS. Runs daily via Celery Beat;
+    does nothing unless the tables are partitioned (Postgres).
+    """
+    cutoff = partitioning.retention_cutoff()
+    detached = []
+
+    for table in partitioning.partitioned_tables():
+        partitioning.ensure_partitions(table, settings.PARTITION_MONTHS_AHEAD)
+        if cutoff is not None:
+            detached += partitioning.detach_partitions_before(table, cutoff)
+
+    if detached:
+        logger.info(f"Archived partitions: {', '.join(detached)}")
+    return detached
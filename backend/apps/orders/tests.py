@@ -0,0 +1,752 @@
+"""
+Tests for checkout, order numbers, history and exports.
+"""
+
+import csv
+import json
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from celery.result import AsyncResult
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.core.exceptions import CheckoutError
+from apps.products.models import Product, SKU
+from apps.inventory.models import Inventory
+from apps.cart.models import Cart, CartItem
+from apps.payments.models import PaymentTransaction
+from apps.payments.providers.base import PaymentResponse
+from apps.orders.models import Order, OrderItem
+from apps.orders import exports, numbering, picklist, signals
+from apps.orders.services import checkout, place_order
+from apps.orders.tasks import process_checkout
+from apps.promotions.engine import promotion_rules
+from apps.promotions.models import Promotion
+from apps.shipping.models import ShippingRate, ShippingZone
+from apps.shipping.quotes import rate_tables
+
+User = get_user_model()
+
+CHECKOUT_DATA = {
+    "customer_email": "buyer@example.com",
+    "customer_name": "Buyer",
+    "customer_cpf": "123.456.789-09",
+    "customer_phone": "11999999999",
+    "shipping_street": "Rua A",
+    "shipping_number": "10",
+    "shipping_neighborhood": "Centro",
+    "shipping_city": "Sao Paulo",
+    "shipping_state": "SP",
+    "shipping_cep": "01001-000",
+    "payment_method": "PIX",
+}
+
+
+class FakeRedis:
+    """In-memory stand-in for the few Redis commands the idempotency store uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def eval(self, script, numkeys, key, claim):
+        # Compare-and-delete, as the idempotency release script does
+        if self.data.get(key) != claim:
+            return 0
+        del self.data[key]
+        return 1
+
+
+class CheckoutTestCase(TestCase):
+    """Test the two-phase checkout."""
+
+    def setUp(self):
+        """Create a cart with reserved stock."""
+        self.product = Product.objects.create(
+            name="Test Card",
+            brand="Test TCG",
+            set_name="Test Set",
+            rarity=Product.Rarity.RARE,
+        )
+        self.sku = SKU.objects.create(product=self.product, price_cents=1000)
+        Inventory.objects.filter(sku=self.sku).update(quantity_on_hand=10)
+
+        self.cart = Cart.objects.create(session_id="test-session")
+        CartItem.objects.add(self.cart, self.sku, 3)
+
+        zone = ShippingZone.objects.create(
+            name="Sao Paulo",
+            cep_start="01000000",
+            cep_end="19999999",
+            delivery_days=3,
+        )
+        ShippingRate.objects.create(zone=zone, max_weight_grams=1000, price_cents=1500)
+        rate_tables.invalidate()
+        rate_tables.get()
+        promotion_rules.invalidate()
+        promotion_rules.get()
+
+        self.client = APIClient()
+
+    def _checkout(self, **extra):
+        return self.client.post(
+            "/api/v1/orders/checkout/",
+            CHECKOUT_DATA,
+            format="json",
+            HTTP_X_SESSION_ID="test-session",
+            **extra
+        )
+
+    def test_checkout_creates_order_and_payment(self):
+        """Test that checkout consumes stock and stores provider data."""
+        response = self._checkout()
+
+        self.assertEqual(response.status_code, 201)
+        payment = PaymentTransaction.objects.get()
+        self.assertEqual(payment.order.status, Order.Status.PENDING)
+        self.assertEqual(payment.order.shipping_cents, 1500)
+        self.assertEqual(payment.order.total_cents, 4500)
+        self.assertTrue(payment.provider_transaction_id)
+        self.assertTrue(payment.pix_copy_paste)
+
+        inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
+        self.assertEqual(inventory.quantity_on_hand, 7)
+        self.assertEqual(inventory.quantity_reserved, 0)
+        self.assertFalse(Cart.objects.filter(id=self.cart.id).exists())
+
+    def test_provider_failure_cancels_order_and_returns_stock(self):
+        """Test the compensation path when the provider call fails."""
+        failed = PaymentResponse(
+            success=False,
+            provider_transaction_id='',
+            status='FAILED',
+            error_message="Provider unavailable",
+        )
+
+        with mock.patch(
+            'apps.payments.providers.stub.StubPaymentProvider.create_payment',
+            return_value=failed
+        ):
+            response = self._checkout()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Provider unavailable", response.json()["message"])
+
+        order = Order.objects.get()
+        self.assertEqual(order.status, Order.Status.CANCELLED)
+        self.assertEqual(order.payment_transactions.get().status, PaymentTransaction.Status.FAILED)
+
+        inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
+        self.assertEqual(inventory.quantity_on_hand, 10)
+        self.assertEqual(inventory.quantity_reserved, 0)
+
+    def test_checkout_rejects_unserved_cep(self):
+        """Test that checkout fails fast when shipping is not available."""
+        response = self.client.post(
+            "/api/v1/orders/checkout/",
+            {**CHECKOUT_DATA, "shipping_cep": "69900-000"},
+            format="json",
+            HTTP_X_SESSION_ID="test-session",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Shipping", response.json()["message"])
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_applies_coupon(self):
+        """Test that a coupon discounts the order and the payment."""
+        Promotion.objects.create(name="Drop day", code="DROP10", kind=Promotion.Kind.PERCENTAGE, percent_off=10)
+        promotion_rules.invalidate()
+
+        response = self.client.post(
+            "/api/v1/orders/checkout/",
+            {**CHECKOUT_DATA, "coupon_code": "NOPE"},
+            format="json",
+            HTTP_X_SESSION_ID="test-session",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+        response = self.client.post(
+            "/api/v1/orders/checkout/",
+            {**CHECKOUT_DATA, "coupon_code": "drop10"},
+            format="json",
+            HTTP_X_SESSION_ID="test-session",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        payment = PaymentTransaction.objects.get()
+        self.assertEqual(payment.order.discount_cents, 300)
+        self.assertEqual(payment.order.coupon_code, "DROP10")
+        self.assertEqual(payment.order.total_cents, 3000 - 300 + 1500)
+        self.assertEqual(payment.amount_cents, payment.order.total_cents)
+
+    def test_idempotency_key_replays_completed_checkout(self):
+        """Test that a retried checkout replays the stored response."""
+        with mock.patch('apps.core.idempotency.get_redis_client', return_value=FakeRedis()):
+            first = self._checkout(HTTP_IDEMPOTENCY_KEY="pay-1")
+            replay = self._checkout(HTTP_IDEMPOTENCY_KEY="pay-1")
+            mismatch = self.client.post(
+                "/api/v1/orders/checkout/",
+                {**CHECKOUT_DATA, "payment_method": "BOLETO"},
+                format="json",
+                HTTP_X_SESSION_ID="test-session",
+                HTTP_IDEMPOTENCY_KEY="pay-1",
+            )
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(mismatch.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_idempotency_keys_are_scoped_per_user(self):
+        """Test that two users sending the same key get their own checkouts."""
+        other_cart = Cart.objects.create(session_id="other-session")
+        CartItem.objects.add(other_cart, self.sku, 1)
+        alice = User.objects.create_user(username="alice", password="secret")
+        bob = User.objects.create_user(username="bob", password="secret")
+        redis = FakeRedis()
+
+        with mock.patch('apps.core.idempotency.get_redis_client', return_value=redis):
+            self.client.force_authenticate(alice)
+            first = self._checkout(HTTP_IDEMPOTENCY_KEY="shared")
+            self.client.force_authenticate(bob)
+            second = self.client.post(
+                "/api/v1/orders/checkout/",
+                CHECKOUT_DATA,
+                format="json",
+                HTTP_X_SESSION_ID="other-session",
+                HTTP_IDEMPOTENCY_KEY="shared",
+            )
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", second)
+        self.assertNotEqual(second.json()["data"], first.json()["data"])
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(len(redis.data), 2)
+
+    def test_failed_request_keeps_claim_of_a_later_retry(self):
+        """Test that a request whose claim expired does not release a retry's claim."""
+        redis = FakeRedis()
+        retry_claim = json.dumps({"state": "in_flight", "fingerprint": "retry", "token": "retry"})
+
+        def expire_and_fail(*args, **kwargs):
+            # Our in-flight record expired and a retry claimed the key
+            [key] = redis.data
+            redis.data[key] = retry_claim
+            raise CheckoutError("Provider unavailable")
+
+        with mock.patch('apps.core.idempotency.get_redis_client', return_value=redis), \
+                mock.patch('apps.orders.services.place_order', side_effect=expire_and_fail):
+            response = self._checkout(HTTP_IDEMPOTENCY_KEY="pay-3")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(redis.data.values()), [retry_claim])
+
+    def test_idempotency_key_blocks_concurrent_duplicate(self):
+        """Test that a duplicate of an in-flight checkout gets 409."""
+        redis = FakeRedis()
+
+        def duplicate_submit(*args, **kwargs):
+            duplicate = self._checkout(HTTP_IDEMPOTENCY_KEY="pay-2")
+            self.assertEqual(duplicate.status_code, 409)
+            return place_order(*args, **kwargs)
+
+        with mock.patch('apps.core.idempotency.get_redis_client', return_value=redis), \
+                mock.patch('apps.orders.services.place_order', side_effect=duplicate_submit):
+            response = self._checkout(HTTP_IDEMPOTENCY_KEY="pay-2")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_async_checkout_queues_job(self):
+        """Test that async checkout returns 202 and places the order in the task."""
+        with mock.patch('apps.orders.views.process_checkout.apply_async') as apply_async:
+            apply_async.return_value.id = "job-1"
+            response = self.client.post(
+                "/api/v1/orders/checkout/",
+                CHECKOUT_DATA,
+                format="json",
+                HTTP_X_SESSION_ID="test-session",
+                HTTP_PREFER="respond-async",
+            )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["data"]["job_id"], "job-1")
+        self.assertFalse(Order.objects.exists())
+
+        # Run the queued job inline
+        args = apply_async.call_args.kwargs["args"]
+        result = process_checkout(*args)
+
+        payment = PaymentTransaction.objects.get()
+        self.assertEqual(result["transaction_id"], str(payment.id))
+        self.assertEqual(result["order_number"], payment.order.order_number)
+        self.assertFalse(Cart.objects.filter(id=self.cart.id).exists())
+
+        # A duplicate job resolves to the same order
+        self.assertEqual(process_checkout(*args)["transaction_id"], str(payment.id))
+
+    def test_async_checkout_retry_gets_a_new_job(self):
+        """Test that resubmitting a cart after a failed job does not reuse its job id."""
+        def enqueue(args, task_id=None, **kwargs):
+            # Celery generates an id unless one is given
+            return AsyncResult(task_id or str(uuid.uuid4()))
+
+        with mock.patch('apps.orders.views.process_checkout.apply_async', side_effect=enqueue):
+            first = self._checkout(HTTP_PREFER="respond-async")
+            retry = self._checkout(HTTP_PREFER="respond-async")
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(retry.status_code, 202)
+        self.assertNotEqual(retry.json()["data"]["job_id"], first.json()["data"]["job_id"])
+
+    def test_checkout_query_count_does_not_grow_with_lines(self):
+        """Test that order items and stock consumption are written in bulk."""
+        def checkout_queries(cart, key):
+            with CaptureQueriesContext(connection) as queries:
+                place_order(cart, CHECKOUT_DATA, "PIX", key)
+            return len(queries)
+
+        single_line = checkout_queries(self.cart, "single")
+
+        cart = Cart.objects.create(session_id="big-session")
+        for index in range(5):
+            sku = SKU.objects.create(product=self.product, price_cents=500, sku_code=f"BULK-{index}")
+            Inventory.objects.filter(sku=sku).update(quantity_on_hand=5)
+            CartItem.objects.add(cart, sku, 2)
+
+        self.assertEqual(checkout_queries(cart, "bulk"), single_line)
+
+        order = Order.objects.get(payment_transactions__idempotency_key="bulk")
+        self.assertEqual(order.items.count(), 5)
+        self.assertEqual(order.subtotal_cents, 5000)
+        item = order.items.first()
+        self.assertEqual(item.line_total_cents, 1000)
+        self.assertEqual(item.product_snapshot["product_name"], "Test Card")
+        self.assertEqual(
+            list(Inventory.objects.filter(sku__sku_code__startswith="BULK-").values_list("quantity_on_hand", flat=True)),
+            [3] * 5
+        )
+
+    def test_consume_many_is_all_or_nothing(self):
+        """Test that one short SKU aborts the whole consumption."""
+        other = SKU.objects.create(product=self.product, price_cents=500, sku_code="SHORT")
+        Inventory.objects.filter(sku=other).update(quantity_on_hand=1, quantity_reserved=1)
+
+        with self.assertRaises(ValidationError):
+            with transaction.atomic():
+                Inventory.objects.consume_many({self.sku.id: 3, other.id: 2})
+
+        inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
+        self.assertEqual(inventory.quantity_on_hand, 10)
+        self.assertEqual(inventory.quantity_reserved, 3)
+
+
+    def test_lapsed_line_taken_by_another_cart_is_rejected(self):
+        """Test that a lapsed lease cannot consume stock another cart now holds."""
+        Inventory.objects.filter(sku=self.sku).update(quantity_on_hand=11)
+        self.cart.items.update(reserved_until=timezone.now() - timedelta(minutes=1))
+        other = Cart.objects.create(session_id="other-session")
+        CartItem.objects.add(other, self.sku, 10)
+
+        with self.assertRaises(CheckoutError):
+            checkout(self.cart.id, CHECKOUT_DATA)
+
+        self.assertFalse(Order.objects.exists())
+        inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
+        self.assertEqual(inventory.quantity_on_hand, 11)
+        self.assertEqual(inventory.quantity_reserved, 13)
+
+        place_order(other, CHECKOUT_DATA, "PIX", "other")
+        inventory.refresh_from_db()
+        self.assertEqual(inventory.quantity_on_hand, 1)
+
+    def test_lapsed_line_with_free_stock_is_retaken(self):
+        """Test that a lapsed lease still checks out while its stock is free."""
+        self.cart.items.update(reserved_until=timezone.now() - timedelta(minutes=1))
+
+        place_order(self.cart, CHECKOUT_DATA, "PIX", "lapsed")
+
+        inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
+        self.assertEqual(inventory.quantity_on_hand, 7)
+        self.assertEqual(inventory.quantity_reserved, 0)
+
+    @override_settings(PAYMENT_ALLOW_TEST_PROVIDERS=False)
+    def test_disabled_provider_fails_before_taking_stock(self):
+        """Test that a method without a usable provider is rejected before the order is placed."""
+        with self.assertRaises(CheckoutError):
+            place_order(self.cart, CHECKOUT_DATA, "PIX", "disabled")
+
+        self.assertFalse(Order.objects.exists())
+        inventory = Inventory.objects.with_lapsed_reservations().get(sku=self.sku)
+        self.assertEqual(inventory.quantity_on_hand, 10)
+
+    def test_empty_cart_is_rejected(self):
+        """Test that a cart without lines cannot be checked out."""
+        cart = Cart.objects.create(session_id="empty-session")
+
+        with self.assertRaises(CheckoutError):
+            place_order(cart, CHECKOUT_DATA, "PIX", "empty")
+
+        self.assertFalse(Order.objects.exists())
+
+
+class OrderNumberTestCase(TestCase):
+    """Test sequence-backed order numbers."""
+
+    def test_permutation_is_collision_free(self):
+        """Test that distinct counters never map to the same number."""
+        values = {numbering.permute(counter) for counter in range(20000)}
+        self.assertEqual(len(values), 20000)
+        self.assertTrue(all(0 <= value < 1000000 for value in values))
+        self.assertEqual(numbering.permute(5), numbering.permute(1000005))
+
+    def test_order_numbers_are_unique_without_lookups(self):
+        """Test that generating a number never queries the orders table."""
+        with CaptureQueriesContext(connection) as queries:
+            order_numbers = {Order.generate_order_number() for _ in range(50)}
+
+        self.assertEqual(len(order_numbers), 50)
+        self.assertFalse(any('"orders_order"' in query['sql'] for query in queries))
+        self.assertRegex(order_numbers.pop(), r'^NCH-\d{8}-\d{6}$')
+
+
+class OrderHistoryTestCase(TestCase):
+    """Test the customer order history endpoint."""
+
+    def setUp(self):
+        """Create orders for two customers."""
+        self.product = Product.objects.create(
+            name="Test Card",
+            brand="Test TCG",
+            set_name="Test Set",
+            rarity=Product.Rarity.RARE,
+        )
+        self.sku = SKU.objects.create(product=self.product, price_cents=1000)
+
+        self.user = User.objects.create_user(username="buyer", password="secret")
+        self.other = User.objects.create_user(username="other", password="secret")
+
+        for index in range(3):
+            self._create_order(self.user, quantity=index + 1)
+        self._create_order(self.other, quantity=1)
+
+        self.client = APIClient()
+
+    def _create_order(self, user, quantity):
+        order = Order.objects.create(
+            user=user,
+            customer_email=f"{user.username}@example.com",
+            customer_name=user.username,
+            customer_cpf="123.456.789-09",
+            customer_phone="11999999999",
+            shipping_street="Rua A",
+            shipping_number="10",
+            shipping_neighborhood="Centro",
+            shipping_city="Sao Paulo",
+            shipping_state="SP",
+            shipping_cep="01001-000",
+            subtotal_cents=1000 * quantity,
+            total_cents=1000 * quantity,
+        )
+        OrderItem.objects.create(order=order, sku=self.sku, quantity=quantity, unit_price_cents=1000)
+        return order
+
+    def test_history_requires_authentication(self):
+        """Test that anonymous users cannot list order history."""
+        response = self.client.get("/api/v1/orders/history/")
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_history_lists_own_orders_with_totals(self):
+        """Test that customers see only their orders, newest first, with annotated totals."""
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get("/api/v1/orders/history/")
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["data"]["results"]
+        self.assertEqual([order["total_items"] for order in results], [3, 2, 1])
+        self.assertNotIn("items", results[0])
+
+    def test_staff_can_filter_by_customer_email(self):
+        """Test that staff can look up another customer's history."""
+        staff = User.objects.create_user(username="staff", password="secret", is_staff=True)
+        self.client.force_authenticate(staff)
+
+        response = self.client.get("/api/v1/orders/history/", {"customer_email": "other@example.com"})
+
+        results = response.json()["data"]["results"]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["total_items"], 1)
+
+
+class OrderExportTestCase(TestCase):
+    """Test streaming order exports."""
+
+    def setUp(self):
+        """Create two orders, one of them outside the exported range."""
+        self.product = Product.objects.create(
+            name="Test Card",
+            brand="Test TCG",
+            set_name="Test Set",
+            rarity=Product.Rarity.RARE,
+        )
+        self.sku = SKU.objects.create(product=self.product, price_cents=1000)
+
+        self.order = self._create_order(quantities=[2, 1])
+        old_order = self._create_order(quantities=[1])
+        Order.objects.filter(id=old_order.id).update(created_at=timezone.now() - timedelta(days=60))
+
+    def _create_order(self, quantities):
+        order = Order.objects.create(
+            customer_email="buyer@example.com",
+            customer_name="Buyer",
+            customer_cpf="123.456.789-09",
+            customer_phone="11999999999",
+            shipping_street="Rua A",
+            shipping_number="10",
+            shipping_neighborhood="Centro",
+            shipping_city="Sao Paulo",
+            shipping_state="SP",
+            shipping_cep="01001-000",
+            subtotal_cents=1000 * sum(quantities),
+            total_cents=1000 * sum(quantities),
+        )
+        for quantity in quantities:
+            OrderItem.objects.create(order=order, sku=self.sku, quantity=quantity, unit_price_cents=1000)
+        return order
+
+    def test_csv_export_has_one_row_per_item(self):
+        """Test that the CSV export flattens orders into item rows."""
+        rows = list(csv.DictReader(exports.iter_csv(Order.objects.filter(id=self.order.id))))
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({row["order_number"] for row in rows}, {self.order.order_number})
+        self.assertEqual(sorted(row["quantity"] for row in rows), ["1", "2"])
+        self.assertEqual(rows[0]["product_name"], "Test Card")
+
+    def test_ndjson_export_command_filters_by_date(self):
+        """Test that the command streams one JSON line per order in range."""
+        output = StringIO()
+        today = timezone.localdate().isoformat()
+
+        call_command("export_orders", "--format", "ndjson", "--start", today, "--end", today, stdout=output)
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        order = json.loads(lines[0])
+        self.assertEqual(order["order_number"], self.order.order_number)
+        self.assertEqual(len(order["items"]), 2)
+
+    def test_admin_action_streams_response(self):
+        """Test that the admin export returns a streaming download."""
+        response = exports.streaming_response(Order.objects.all(), "csv")
+
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment", response["Content-Disposition"])
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 4)
+
+
+class FulfillmentTestCase(TestCase):
+    """Test bulk status transitions and tracking code import."""
+
+    def setUp(self):
+        """Create confirmed orders, a pending one and a staff user."""
+        self.confirmed = [self._order(Order.Status.CONFIRMED) for _ in range(3)]
+        self.pending = self._order(Order.Status.PENDING)
+
+        self.staff = User.objects.create_user(username="staff", password="secret", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def _order(self, status):
+        return Order.objects.create(
+            status=status,
+            customer_email="buyer@example.com",
+            customer_name="Buyer",
+            customer_cpf="123.456.789-09",
+            customer_phone="11999999999",
+            shipping_street="Rua A",
+            shipping_number="10",
+            shipping_neighborhood="Centro",
+            shipping_city="Sao Paulo",
+            shipping_state="SP",
+            shipping_cep="01001-000",
+            subtotal_cents=1000,
+            total_cents=1000,
+        )
+
+    def test_bulk_ship_with_one_update(self):
+        """Test that eligible orders move in one statement and the rest are reported."""
+        events = []
+
+        def receiver(sender, order, old_status, new_status, **kwargs):
+            events.append((order.order_number, old_status, new_status))
+
+        signals.order_status_changed.connect(receiver)
+        self.addCleanup(signals.order_status_changed.disconnect, receiver)
+
+        orders = [
+            {"order_number": order.order_number, "tracking_code": f"BR{index}"}
+            for index, order in enumerate(self.confirmed)
+        ]
+        orders += [{"order_number": self.pending.order_number}, {"order_number": "NCH-MISSING"}]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/api/v1/orders/fulfillment/", {"status": "SHIPPED", "orders": orders}, format="json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(len(data["updated"]), 3)
+        self.assertEqual(data["skipped"][0]["order_number"], self.pending.order_number)
+        self.assertEqual(data["missing"], ["NCH-MISSING"])
+        self.assertEqual(sum(query["sql"].startswith("UPDATE") for query in queries), 1)
+
+        self.assertEqual(
+            sorted(Order.objects.filter(status=Order.Status.SHIPPED).values_list("tracking_code", flat=True)),
+            ["BR0", "BR1", "BR2"]
+        )
+        self.assertEqual(Order.objects.get(id=self.pending.id).status, Order.Status.PENDING)
+        self.assertEqual(len(events), 3)
+        self.assertTrue(all(event[1:] == ("CONFIRMED", "SHIPPED") for event in events))
+
+    def test_tracking_file_upload(self):
+        """Test a CSV upload mixing shipped and delivered rows."""
+        first, second, third = self.confirmed
+        Order.objects.filter(id=third.id).update(status=Order.Status.SHIPPED)
+        upload = StringIO(
+            "order_number,tracking_code,status\n"
+            f"{first.order_number},BR1,\n"
+            f"{second.order_number},,DELIVERED\n"
+            f"{third.order_number},,delivered\n"
+        )
+        upload.name = "tracking.csv"
+
+        response = self.client.post("/api/v1/orders/fulfillment/", {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.get(id=first.id).tracking_code, "BR1")
+        self.assertEqual(Order.objects.get(id=first.id).status, Order.Status.SHIPPED)
+        # CONFIRMED cannot skip straight to DELIVERED
+        self.assertEqual(Order.objects.get(id=second.id).status, Order.Status.CONFIRMED)
+        self.assertEqual(response.json()["data"]["skipped"][0]["order_number"], second.order_number)
+        self.assertEqual(Order.objects.get(id=third.id).status, Order.Status.DELIVERED)
+
+    def test_requires_staff(self):
+        """Test that customers cannot run bulk fulfillment."""
+        customer = User.objects.create_user(username="customer", password="secret")
+        self.client.force_authenticate(customer)
+
+        response = self.client.post(
+            "/api/v1/orders/fulfillment/",
+            {"orders": [{"order_number": self.confirmed[0].order_number}]},
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_admin_actions(self):
+        """Test the admin mark-as-shipped action and tracking import page."""
+        self.client.force_login(self.staff)
+        self.staff.is_superuser = True
+        self.staff.save()
+
+        response = self.client.post("/admin/orders/order/", {
+            "action": "mark_shipped",
+            "_selected_action": [str(order.id) for order in self.confirmed[:2]],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Order.objects.filter(status=Order.Status.SHIPPED).count(), 2)
+
+        self.assertContains(self.client.get("/admin/orders/order/"), "Import tracking codes")
+        self.assertEqual(self.client.get("/admin/orders/order/import-tracking/").status_code, 200)
+
+        upload = StringIO(f"order_number,tracking_code\n{self.confirmed[2].order_number},BR9\n")
+        upload.name = "tracking.csv"
+        response = self.client.post(
+            "/admin/orders/order/import-tracking/", {"file": upload, "status": "SHIPPED"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Order.objects.get(id=self.confirmed[2].id).tracking_code, "BR9")
+
+
+class PickListTestCase(TestCase):
+    """Test pick list aggregation and route order."""
+
+    def setUp(self):
+        """Create SKUs on different shelves and a batch of orders."""
+        product = Product.objects.create(name="Test Card", set_name="Test Set", rarity=Product.Rarity.RARE)
+        self.skus = {}
+        for code, location in (("FAR", "SHELF-A-10"), ("NEAR", "SHELF-A-2"), ("NOWHERE", "")):
+            sku = SKU.objects.create(product=product, price_cents=1000, sku_code=code)
+            Inventory.objects.filter(sku=sku).update(warehouse_location=location)
+            self.skus[code] = sku
+
+        self._order(Order.Status.CONFIRMED, FAR=2, NEAR=1)
+        self._order(Order.Status.CONFIRMED, FAR=3, NOWHERE=1)
+        self._order(Order.Status.PENDING, NEAR=5)
+
+    def _order(self, status, **quantities):
+        order = Order.objects.create(
+            status=status,
+            customer_email="buyer@example.com",
+            customer_name="Buyer",
+            customer_cpf="123.456.789-09",
+            customer_phone="11999999999",
+            shipping_street="Rua A",
+            shipping_number="10",
+            shipping_neighborhood="Centro",
+            shipping_city="Sao Paulo",
+            shipping_state="SP",
+            shipping_cep="01001-000",
+            subtotal_cents=1000,
+            total_cents=1000,
+        )
+        for code, quantity in quantities.items():
+            OrderItem.objects.create(order=order, sku=self.skus[code], quantity=quantity, unit_price_cents=1000)
+
+    def test_pick_list_in_one_query(self):
+        """Test that confirmed quantities are aggregated per SKU in route order."""
+        with self.assertNumQueries(1):
+            lines = picklist.pick_list()
+
+        self.assertEqual(
+            [(line["warehouse_location"], line["sku_code"], line["quantity"], line["orders"]) for line in lines],
+            [("SHELF-A-2", "NEAR", 1, 1), ("SHELF-A-10", "FAR", 5, 2), ("", "NOWHERE", 1, 1)]
+        )
+
+    def test_pick_list_csv(self):
+        """Test the staff CSV download."""
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="staff", password="secret", is_staff=True))
+
+        response = client.get("/api/v1/orders/pick-list/")
+
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(tuple(rows[0]), picklist.PICK_LIST_COLUMNS)
+        self.assertEqual([row[1] for row in rows[1:]], ["NEAR", "FAR", "NOWHERE"])
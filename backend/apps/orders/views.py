@@ -1,20 +1,39 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from django.db import transaction
+from rest_framework.reverse import reverse
+from celery.result import AsyncResult
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
-from apps.core.exceptions import api_response, CartExpiredError
+from apps.core.exceptions import api_response, CheckoutError, InvalidCouponError
+from apps.core.idempotency import idempotent
 from apps.cart.models import Cart
 from apps.payments.models import PaymentTransaction
-from apps.payments.providers.stub import get_payment_provider
-from apps.payments.providers.base import PaymentRequest
+from apps.promotions import engine as promotions
+from apps.shipping import quotes as shipping_quotes
 from .models import Order, OrderItem
-from .serializers import OrderSerializer, CheckoutSerializer
+from .serializers import OrderSerializer, OrderListSerializer, CheckoutSerializer, FulfillmentSerializer
+from . import fulfillment, services
+from .picklist import pick_list_response
+from .tasks import process_checkout
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class OrderHistoryPagination(CursorPagination):
+    """
+    Keyset pagination over newest orders first, served by the
+    (user, -created_at) and (customer_email, -created_at) indexes.
+    """
+    ordering = '-created_at'
+    page_size = 24
+
+
 class OrderViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoints for orders.
@@ -23,11 +42,115 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = OrderSerializer
     lookup_field = 'order_number'
 
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        pagination_class=OrderHistoryPagination,
+        filter_backends=[]
+    )
+    def history(self, request):
+        """
+        Order history of the authenticated customer, newest first.
+        GET /api/v1/orders/history/
+
+        Staff may pass `?customer_email=` to see another customer's orders.
+        """
+        customer_email = request.query_params.get('customer_email')
+
+        if customer_email and request.user.is_staff:
+            orders = Order.objects.filter(customer_email=customer_email)
+        else:
+            orders = Order.objects.filter(user=request.user)
+
+        # Correlated sum so only the rows of the page are aggregated
+        item_quantity = OrderItem.objects.filter(
+            order=OuterRef('pk')
+        ).values('order').annotate(total=Sum('quantity')).values('total')
+
+        orders = orders.annotate(
+            item_quantity=Coalesce(Subquery(item_quantity), 0)
+        ).only(
+            'id', 'order_number', 'status', 'total_cents',
+            'currency', 'tracking_code', 'created_at'
+        )
+
+        page = self.paginate_queryset(orders)
+        serializer = OrderListSerializer(page, many=True)
+
+        return api_response(data={
+            'next': self.paginator.get_next_link(),
+            'previous': self.paginator.get_previous_link(),
+            'results': serializer.data,
+        })
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAdminUser],
+        parser_classes=[JSONParser, MultiPartParser]
+    )
+    def fulfillment(self, request):
+        """
+        Mark many orders as SHIPPED or DELIVERED and set their tracking codes.
+        POST /api/v1/orders/fulfillment/
+
+        Body: {"status": "SHIPPED", "orders": [{"order_number", "tracking_code"}]}
+        or a multipart CSV `file` with order_number, tracking_code and
+        optional status columns.
+        """
+        serializer = FulfillmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        default_status = serializer.validated_data['status']
+
+        try:
+            if serializer.validated_data.get('file'):
+                rows = fulfillment.parse_tracking_file(serializer.validated_data['file'], default_status)
+            else:
+                rows = [
+                    fulfillment.FulfillmentRow(
+                        order_number=entry['order_number'],
+                        status=entry.get('status', default_status),
+                        tracking_code=entry['tracking_code'],
+                    )
+                    for entry in serializer.validated_data['orders']
+                ]
+            result = fulfillment.bulk_transition(rows)
+        except ValueError as e:
+            return api_response(
+                data=None,
+                message=str(e),
+                success=False,
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        return api_response(
+            data=result.as_dict(),
+            message=f"{len(result.updated)} orders updated"
+        )
+
+    @action(detail=False, methods=['get'], url_path='pick-list', permission_classes=[IsAdminUser])
+    def pick_list(self, request):
+        """
+        Pick list (CSV) of every CONFIRMED order, aggregated per SKU in
+        warehouse route order.
+        GET /api/v1/orders/pick-list/
+        """
+        return pick_list_response()
+
     @action(detail=False, methods=['post'])
+    @idempotent('checkout')
     def checkout(self, request):
         """
         Process checkout: create order and payment transaction.
         POST /api/v1/orders/checkout/
+
+        With `Prefer: respond-async` (or `?async=1`) the cart is validated,
+        the order is placed by a worker and 202 is returned with a job id
+        to poll at `checkout/jobs/{job_id}/`.
+
+        Send an `Idempotency-Key` header to make retries safe: duplicates
+        get the original response replayed (or 409 while it is running).
         """
         serializer = CheckoutSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -77,147 +200,140 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
                 status_code=status.HTTP_400_BAD_REQUEST
             )
 
-        # Create deterministic idempotency key before creating order
-        # Key includes cart.id to ensure different carts generate different keys
-        # This allows users to make multiple orders in the same session
-        # while still preventing duplicate submissions of the same cart
-        payment_method = serializer.validated_data['payment_method']
-        idempotency_key = f"cart_{cart.id}_{payment_method}"
+        # Never charge stale price snapshots
+        price_changes = cart.revalidate_prices(apply=True)
+        if price_changes:
+            return api_response(
+                data={'price_changes': price_changes},
+                message="Some prices in your cart have changed. Please review your cart and try again.",
+                success=False,
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
 
-        # Check if payment already exists for this specific cart (idempotency)
-        existing_payment = PaymentTransaction.objects.filter(
-            idempotency_key=idempotency_key
-        ).select_related('order').first()
+        # Fail fast (before queueing) on an invalid coupon or an unserved CEP
+        if serializer.validated_data.get('coupon_code'):
+            try:
+                promotions.find_coupon(serializer.validated_data['coupon_code'])
+            except InvalidCouponError as e:
+                return api_response(
+                    data=None,
+                    message=str(e),
+                    success=False,
+                    status_code=status.HTTP_400_BAD_REQUEST
+                )
 
-        if existing_payment:
+        totals = cart.totals()
+        if shipping_quotes.quote(
+            serializer.validated_data['shipping_cep'],
+            totals['items_quantity'],
+            totals['items_subtotal_cents']
+        ) is None:
+            return api_response(
+                data=None,
+                message="Shipping is not available for this CEP",
+                success=False,
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        if _wants_async(request):
+            # Hand the order/payment work to the worker pool. Each attempt gets
+            # a fresh job id, so a retry after a failed job never reports the
+            # old result; duplicate jobs still resolve to the same order via
+            # the payment idempotency key.
+            job = process_checkout.apply_async(args=[str(cart.id), dict(serializer.validated_data)])
+            return api_response(
+                data={
+                    'job_id': job.id,
+                    'status_url': reverse('api:order-checkout-job', kwargs={'job_id': job.id}, request=request),
+                },
+                message="Checkout queued",
+                status_code=status.HTTP_202_ACCEPTED
+            )
+
+        try:
+            order, payment_transaction, created = services.checkout(cart.id, serializer.validated_data)
+        except CheckoutError as e:
+            return api_response(
+                data=None,
+                message=f"Checkout failed: {str(e)}",
+                success=False,
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not created:
             # Return existing order instead of creating duplicate
             # This only happens if the same cart/payment is submitted multiple times
-            order = existing_payment.order
-            order_serializer = OrderSerializer(order)
-            response_data = {
-                'order': order_serializer.data,
-                'payment': {
-                    'transaction_id': str(existing_payment.id),
-                    'method': existing_payment.method,
-                    'status': existing_payment.status,
-                    'amount_brl': existing_payment.amount_brl,
-                    'pix_qr_code': existing_payment.pix_qr_code,
-                    'pix_copy_paste': existing_payment.pix_copy_paste,
-                    'boleto_url': existing_payment.boleto_url,
-                    'boleto_barcode': existing_payment.boleto_barcode,
-                    'expires_at': existing_payment.expires_at,
-                }
-            }
             return api_response(
-                data=response_data,
+                data=_checkout_response_data(order, payment_transaction),
                 message="Order already exists (idempotent request)",
                 status_code=status.HTTP_200_OK
             )
 
-        try:
-            with transaction.atomic():
-                # Create order
-                order = Order.objects.create(
-                    customer_email=serializer.validated_data['customer_email'],
-                    customer_name=serializer.validated_data['customer_name'],
-                    customer_cpf=serializer.validated_data['customer_cpf'],
-                    customer_phone=serializer.validated_data['customer_phone'],
-                    shipping_street=serializer.validated_data['shipping_street'],
-                    shipping_number=serializer.validated_data['shipping_number'],
-                    shipping_complement=serializer.validated_data.get('shipping_complement', ''),
-                    shipping_neighborhood=serializer.validated_data['shipping_neighborhood'],
-                    shipping_city=serializer.validated_data['shipping_city'],
-                    shipping_state=serializer.validated_data['shipping_state'],
-                    shipping_cep=serializer.validated_data['shipping_cep'],
-                    notes=serializer.validated_data.get('notes', ''),
-                    subtotal_cents=cart.subtotal_cents,
-                    shipping_cents=0,  # Calculate shipping here if needed
-                    discount_cents=0,  # Apply coupons here if needed
-                    total_cents=cart.subtotal_cents,  # Adjust with shipping/discount
-                )
-
-                # Create order items and consume inventory
-                for cart_item in cart.items.all():
-                    OrderItem.objects.create(
-                        order=order,
-                        sku=cart_item.sku,
-                        quantity=cart_item.quantity,
-                        unit_price_cents=cart_item.unit_price_cents,
-                    )
+        return api_response(
+            data=_checkout_response_data(order, payment_transaction),
+            message="Order created successfully",
+            status_code=status.HTTP_201_CREATED
+        )
 
-                    # Consume reserved inventory
-                    cart_item.sku.inventory.consume(cart_item.quantity)
-
-                # Get payment provider (using stub for now)
-                provider = get_payment_provider('stub')
-
-                payment_request = PaymentRequest(
-                    idempotency_key=idempotency_key,
-                    order_id=str(order.id),
-                    order_number=order.order_number,
-                    amount_cents=order.total_cents,
-                    method=payment_method,
-                    customer_email=order.customer_email,
-                    customer_name=order.customer_name,
-                    customer_cpf=order.customer_cpf,
-                    customer_phone=order.customer_phone,
-                )
+    @action(detail=False, methods=['get'], url_path=r'checkout/jobs/(?P<job_id>[^/]+)', url_name='checkout-job')
+    def checkout_job(self, request, job_id=None):
+        """
+        Status of an asynchronous checkout.
+        GET /api/v1/orders/checkout/jobs/{job_id}/
+        """
+        result = AsyncResult(job_id)
 
-                payment_response = provider.create_payment(payment_request)
-
-                if not payment_response.success:
-                    raise Exception(payment_response.error_message or "Payment creation failed")
-
-                # Save payment transaction
-                payment_transaction = PaymentTransaction.objects.create(
-                    order=order,
-                    idempotency_key=idempotency_key,
-                    provider='stub',
-                    provider_transaction_id=payment_response.provider_transaction_id,
-                    method=payment_method,
-                    status=payment_response.status,
-                    amount_cents=order.total_cents,
-                    fees_cents=payment_response.fees_cents,
-                    pix_qr_code=payment_response.pix_qr_code or '',
-                    pix_copy_paste=payment_response.pix_copy_paste or '',
-                    boleto_url=payment_response.boleto_url or '',
-                    boleto_barcode=payment_response.boleto_barcode or '',
-                    expires_at=payment_response.expires_at,
-                    raw_payload=payment_response.raw_payload or {},
-                )
+        if not result.ready():
+            return api_response(
+                data={'job_id': job_id, 'status': result.status},
+                message="Checkout in progress",
+                status_code=status.HTTP_202_ACCEPTED
+            )
 
-                # Clear cart after successful checkout
-                # Use release_reservations=False because consume() already handled it
-                cart.clear(release_reservations=False)
-                cart.delete()
+        outcome = result.result if result.successful() else {'error': str(result.result)}
 
-        except Exception as e:
+        if 'error' in outcome:
             return api_response(
-                data=None,
-                message=f"Checkout failed: {str(e)}",
+                data={'job_id': job_id, 'status': result.status},
+                message=f"Checkout failed: {outcome['error']}",
                 success=False,
                 status_code=status.HTTP_400_BAD_REQUEST
             )
 
-        # Prepare response data
-        order_serializer = OrderSerializer(order)
-        response_data = {
-            'order': order_serializer.data,
-            'payment': {
-                'transaction_id': str(payment_transaction.id),
-                'method': payment_transaction.method,
-                'status': payment_transaction.status,
-                'amount_brl': payment_transaction.amount_brl,
-                'pix_qr_code': payment_transaction.pix_qr_code,
-                'pix_copy_paste': payment_transaction.pix_copy_paste,
-                'boleto_url': payment_transaction.boleto_url,
-                'boleto_barcode': payment_transaction.boleto_barcode,
-                'expires_at': payment_transaction.expires_at,
-            }
-        }
-
+        payment = get_object_or_404(
+            PaymentTransaction.objects.select_related('order'),
+            id=outcome['transaction_id']
+        )
         return api_response(
-            data=response_data,
-            message="Order created successfully",
-            status_code=status.HTTP_201_CREATED
+            data=_checkout_response_data(payment.order, payment),
+            message="Order created successfully"
         )
+
+
+def _wants_async(request):
+    """
+    Whether the client asked for asynchronous checkout, via
+    `Prefer: respond-async` or `?async=1`.
+    """
+    if 'respond-async' in request.headers.get('Prefer', ''):
+        return True
+    return request.query_params.get('async', '').lower() in ('1', 'true')
+
+
+def _checkout_response_data(order, payment):
+    """Order and payment instructions returned by checkout."""
+    order_serializer = OrderSerializer(order)
+    return {
+        'order': order_serializer.data,
+        'payment': {
+            'transaction_id': str(payment.id),
+            'method': payment.method,
+            'status': payment.status,
+            'amount_brl': payment.amount_brl,
+            'pix_qr_code': payment.pix_qr_code,
+            'pix_copy_paste': payment.pix_copy_paste,
+            'boleto_url': payment.boleto_url,
+            'boleto_barcode': payment.boleto_barcode,
+            'expires_at': payment.expires_at,
+        }
+    }
@@ -1,6 +1,7 @@
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import PaymentTransaction
+from .models import PaymentTransaction, WebhookEvent
 
 
 @admin.register(PaymentTransaction)
@@ -14,7 +15,7 @@ class PaymentTransactionAdmin(admin.ModelAdmin):
         'provider',
         'created_at'
     ]
-    list_filter = ['status', 'method', 'provider', 'created_at']
+    list_filter = ['status', 'needs_review', 'method', 'provider', 'created_at']
     search_fields = [
         'order__order_number',
         'provider_transaction_id',
@@ -36,7 +37,8 @@ class PaymentTransactionAdmin(admin.ModelAdmin):
                 'id',
                 'order',
                 'idempotency_key',
-                'status'
+                'status',
+                'needs_review'
             )
         }),
         ('Provider', {
@@ -101,3 +103,49 @@ class PaymentTransactionAdmin(admin.ModelAdmin):
     def amount_display(self, obj):
         return f"R$ {obj.amount_brl:.2f}"
     amount_display.short_description = 'Amount'
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = [
+        'event_id',
+        'provider',
+        'provider_transaction_id',
+        'new_status',
+        'status',
+        'attempts',
+        'created_at',
+        'processed_at'
+    ]
+    list_filter = ['status', 'provider', 'new_status']
+    search_fields = ['event_id', 'provider_transaction_id']
+    readonly_fields = [
+        'id',
+        'provider',
+        'event_id',
+        'provider_transaction_id',
+        'new_status',
+        'paid_at',
+        'body',
+        'status',
+        'attempts',
+        'available_at',
+        'error',
+        'processed_at',
+        'created_at',
+        'updated_at'
+    ]
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected events')
+    def retry(self, request, queryset):
+        count = queryset.exclude(status=WebhookEvent.Status.PROCESSED).update(
+            status=WebhookEvent.Status.PENDING,
+            attempts=0,
+            available_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+        self.message_user(request, f"{count} events queued for processing.")
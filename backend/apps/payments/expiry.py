@@ -0,0 +1,120 @@
+"""
+Expiry of unpaid Pix/Boleto payments.
+
+Checkout consumes stock when the order is placed, so an abandoned Pix or
+Boleto keeps its units off sale until something gives them back.
+`expire_payments` sweeps PENDING payments past their `expires_at` (plus
+PAYMENT_EXPIRY_GRACE_MINUTES, for late confirmations) in bounded batches,
+using the (status, expires_at) index. Each batch runs in one transaction:
+
+- the payments are claimed with SELECT ... FOR UPDATE SKIP LOCKED and
+  cancelled in one UPDATE;
+- their orders still PENDING are cancelled in one UPDATE (sending
+  `order_status_changed` for each);
+- the items of those orders are summed per SKU in one query and returned
+  to stock in one UPDATE.
+"""
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from apps.inventory.models import Inventory
+from apps.orders.models import Order, OrderItem
+from apps.orders.signals import order_status_changed
+from .models import PaymentTransaction
+
+logger = logging.getLogger(__name__)
+
+
+def cancel_pending_orders(order_ids, now):
+    """
+    Cancel the orders of `order_ids` still PENDING and return their stock:
+    one UPDATE for the orders, one query summing their items per SKU and
+    one UPDATE for the stock. Sends `order_status_changed` for each.
+    Runs inside the caller's transaction.
+
+    Returns:
+        The cancelled orders
+    """
+    orders = list(
+        Order.objects.select_for_update().filter(
+            id__in=order_ids,
+            status=Order.Status.PENDING
+        ).order_by('id').only('id', 'order_number', 'status')
+    )
+    cancelled_ids = [order.id for order in orders]
+
+    quantities = dict(
+        OrderItem.objects.filter(order_id__in=cancelled_ids).values('sku_id').annotate(
+            units=Sum('quantity')
+        ).order_by().values_list('sku_id', 'units')
+    )
+    Inventory.objects.return_stock(quantities)
+
+    Order.objects.filter(id__in=cancelled_ids).update(
+        status=Order.Status.CANCELLED,
+        updated_at=now
+    )
+
+    for order in orders:
+        order.status = Order.Status.CANCELLED
+        order_status_changed.send(
+            sender=Order,
+            order=order,
+            old_status=Order.Status.PENDING,
+            new_status=Order.Status.CANCELLED
+        )
+    return orders
+
+
+def expire_batch(now=None, batch_size=None):
+    """
+    Cancel one batch of expired pending payments and their orders.
+
+    Returns:
+        Tuple of (payments expired, orders cancelled)
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.PAYMENT_EXPIRY_BATCH_SIZE
+    cutoff = now - timedelta(minutes=settings.PAYMENT_EXPIRY_GRACE_MINUTES)
+
+    with transaction.atomic():
+        payments = list(
+            PaymentTransaction.objects.select_for_update(skip_locked=True).filter(
+                status=PaymentTransaction.Status.PENDING,
+                expires_at__lt=cutoff
+            ).order_by('expires_at').only('id', 'order_id')[:batch_size]
+        )
+        if not payments:
+            return 0, 0
+
+        PaymentTransaction.objects.filter(id__in=[payment.id for payment in payments]).update(
+            status=PaymentTransaction.Status.CANCELLED,
+            updated_at=now
+        )
+
+        orders = cancel_pending_orders({payment.order_id for payment in payments}, now)
+
+    for order in orders:
+        logger.info(f"Cancelled order {order.order_number}: payment expired")
+    return len(payments), len(orders)
+
+
+def expire_payments(now=None):
+    """
+    Expire batches until none are left or PAYMENT_EXPIRY_MAX_BATCHES ran.
+
+    Returns:
+        Tuple of (payments expired, orders cancelled)
+    """
+    expired = cancelled = 0
+    for _ in range(settings.PAYMENT_EXPIRY_MAX_BATCHES):
+        payments, orders = expire_batch(now)
+        expired += payments
+        cancelled += orders
+        if payments < settings.PAYMENT_EXPIRY_BATCH_SIZE:
+            break
+    return expired, cancelled
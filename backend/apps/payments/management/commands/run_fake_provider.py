@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from apps.payments.providers.fake_server import FakeProviderServer
+
+
+class Command(BaseCommand):
+    help = "Run the local fake payment provider API (for development and load tests)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=int, default=0, help="Delay added to every response")
+        parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of requests answered with 503")
+
+    def handle(self, *args, **options):
+        server = FakeProviderServer(
+            options['host'],
+            options['port'],
+            latency=options['latency_ms'] / 1000,
+            failure_rate=options['failure_rate']
+        )
+        self.stdout.write(f"Fake payment provider listening on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0004_orderitem_order_db_constraint"),
+        ("payments", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="paymenttransaction",
+            name="order",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="payment_transactions",
+                to="orders.order",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db import migrations
+from apps.core.partitioning import partition_table
+
+
+def partition_payment_table(apps, schema_editor):
+    """Partition payment transactions by month (Postgres only)."""
+    model = apps.get_model('payments', 'PaymentTransaction')
+    partition_table(
+        model._meta.db_table,
+        settings.PARTITION_MONTHS_AHEAD,
+        connection=schema_editor.connection
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payments", "0002_paymenttransaction_order_db_constraint"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_payment_table),
+    ]
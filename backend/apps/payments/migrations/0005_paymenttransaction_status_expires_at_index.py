@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0006_order_coupon_code"),
+        ("payments", "0004_webhookevent"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="paymenttransaction",
+            index=models.Index(
+                fields=["status", "expires_at"], name="payments_pa_status_ace706_idx"
+            ),
+        ),
+    ]
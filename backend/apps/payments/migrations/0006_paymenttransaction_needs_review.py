@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payments", "0005_paymenttransaction_status_expires_at_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paymenttransaction",
+            name="needs_review",
+            field=models.BooleanField(
+                default=False,
+                help_text="Captured after its order was cancelled (refund pending or failed)",
+            ),
+        ),
+    ]
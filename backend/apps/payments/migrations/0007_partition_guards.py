@@ -0,0 +1,27 @@
+from django.db import migrations
+from apps.core.partitioning import create_default_partition, enforce_reference, enforce_unique
+
+
+def guard_payment_partitions(apps, schema_editor):
+    """
+    Add the DEFAULT partition, global idempotency_key uniqueness and the
+    payment -> order reference check (Postgres only).
+    """
+    connection = schema_editor.connection
+    payment_table = apps.get_model('payments', 'PaymentTransaction')._meta.db_table
+    order_table = apps.get_model('orders', 'Order')._meta.db_table
+
+    create_default_partition(payment_table, connection=connection)
+    enforce_unique(payment_table, 'idempotency_key', connection=connection)
+    enforce_reference(payment_table, 'order_id', order_table, connection=connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payments", "0006_paymenttransaction_needs_review"),
+        ("orders", "0007_partition_guards"),
+    ]
+
+    operations = [
+        migrations.RunPython(guard_payment_partitions),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from apps.core.models import TimeStampedModel
 from apps.orders.models import Order
 
@@ -21,10 +22,23 @@ class PaymentTransaction(TimeStampedModel):
         CANCELLED = 'CANCELLED', 'Cancelled'
         REFUNDED = 'REFUNDED', 'Refunded'
 
+    # Allowed status transitions (enforced when applying webhooks). A capture
+    # reported after the payment failed or was cancelled is still recorded,
+    # but flagged for refund instead of confirming the order.
+    TRANSITIONS = {
+        Status.PENDING: {Status.PROCESSING, Status.COMPLETED, Status.FAILED, Status.CANCELLED},
+        Status.PROCESSING: {Status.COMPLETED, Status.FAILED, Status.CANCELLED},
+        Status.COMPLETED: {Status.REFUNDED},
+        Status.FAILED: {Status.COMPLETED},
+        Status.CANCELLED: {Status.COMPLETED},
+    }
+
+    # No database FK: orders_order is partitioned (see apps.core.partitioning)
     order = models.ForeignKey(
         Order,
         on_delete=models.PROTECT,
-        related_name='payment_transactions'
+        related_name='payment_transactions',
+        db_constraint=False
     )
 
     # Idempotency
@@ -106,6 +120,11 @@ class PaymentTransaction(TimeStampedModel):
         help_text="When payment was confirmed"
     )
 
+    needs_review = models.BooleanField(
+        default=False,
+        help_text="Captured after its order was cancelled (refund pending or failed)"
+    )
+
     # Raw provider data
     raw_payload = models.JSONField(
         default=dict,
@@ -119,11 +138,18 @@ class PaymentTransaction(TimeStampedModel):
             models.Index(fields=['order', 'status']),
             models.Index(fields=['provider', 'provider_transaction_id']),
             models.Index(fields=['method', 'status']),
+            # Expiry sweep (apps.payments.expiry)
+            models.Index(fields=['status', 'expires_at']),
         ]
 
     def __str__(self):
         return f"{self.method} payment for order {self.order.order_number} - {self.status}"
 
+    @classmethod
+    def can_transition(cls, old_status, new_status):
+        """Whether a provider update may move a payment from old to new."""
+        return new_status in cls.TRANSITIONS.get(old_status, ())
+
     @property
     def amount_brl(self):
         """Amount in BRL."""
@@ -141,7 +167,6 @@ class PaymentTransaction(TimeStampedModel):
         """Check if payment has expired."""
         if not self.expires_at:
             return False
-        from django.utils import timezone
         return timezone.now() > self.expires_at
 
     @property
@@ -153,3 +178,48 @@ class PaymentTransaction(TimeStampedModel):
     def is_pending(self):
         """Check if payment is pending."""
         return self.status in [self.Status.PENDING, self.Status.PROCESSING]
+
+
+class WebhookEvent(TimeStampedModel):
+    """
+    Raw payment provider webhook, stored on receipt and applied later by
+    `apps.payments.tasks.process_webhook_events`.
+    Redeliveries of the same provider event are stored once.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        PROCESSED = 'PROCESSED', 'Processed'
+        FAILED = 'FAILED', 'Failed'
+
+    provider = models.CharField(max_length=50)
+    event_id = models.CharField(max_length=255, help_text="Event ID from payment provider")
+    provider_transaction_id = models.CharField(max_length=255)
+
+    # Verified payment update
+    new_status = models.CharField(max_length=20, choices=PaymentTransaction.Status.choices)
+    paid_at = models.DateTimeField(null=True, blank=True)
+
+    body = models.TextField(help_text="Raw request body")
+
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Not processed before this time")
+    error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='unique_webhook_event'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['provider_transaction_id', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} event {self.event_id} ({self.status})"
@@ -1,10 +1,15 @@
-from .base import PaymentProvider, PaymentRequest, PaymentResponse, WebhookVerification
+from .base import PaymentProvider, PaymentRequest, PaymentResponse, PaymentStatus, WebhookVerification
+from .registry import ProviderRegistry, UnknownProviderError, providers
 from .stub import StubPaymentProvider
 
 __all__ = [
     'PaymentProvider',
     'PaymentRequest',
     'PaymentResponse',
+    'PaymentStatus',
     'WebhookVerification',
     'StubPaymentProvider',
+    'ProviderRegistry',
+    'UnknownProviderError',
+    'providers',
 ]
@@ -62,18 +62,32 @@ class WebhookVerification:
     Result of webhook signature verification.
     """
     is_valid: bool
+    event_id: Optional[str] = None  # Provider event ID (dedupes redeliveries)
     provider_transaction_id: Optional[str] = None
     new_status: Optional[str] = None
     paid_at: Optional[datetime] = None
     error_message: Optional[str] = None
 
 
+@dataclass
+class PaymentStatus:
+    """
+    Result of polling a payment's status.
+    """
+    status: str  # PENDING, PROCESSING, COMPLETED, FAILED, ...
+    paid_at: Optional[datetime] = None  # When the provider captured it
+
+
 class PaymentProvider(ABC):
     """
     Abstract base class for payment providers.
     All payment integrations must implement this interface.
     """
 
+    # Test providers (no real money, unsigned webhooks) are refused by the
+    # registry unless settings.PAYMENT_ALLOW_TEST_PROVIDERS is set
+    IS_TEST_PROVIDER = False
+
     def __init__(self, config: Dict[str, Any]):
         """
         Initialize provider with configuration.
@@ -154,6 +168,17 @@ class PaymentProvider(ABC):
         """
         pass
 
+    def get_payment_status(self, transaction_id: str) -> PaymentStatus:
+        """
+        Poll payment status and capture time from provider. Providers whose
+        status payload carries the capture time override this; the default
+        reports the status only.
+
+        Raises:
+            PaymentProviderError: If status check fails
+        """
+        return PaymentStatus(status=self.get_status(transaction_id))
+
     @abstractmethod
     def calculate_fee(self, amount_cents: int, method: str) -> int:
         """
@@ -0,0 +1,74 @@
+"""
+Provider for the local fake provider server (see fake_server.py).
+Exercises the real HTTP path (pooling, timeouts, retries) in development
+and load tests without calling an actual payment provider.
+"""
+
+import hashlib
+import json
+from typing import Dict, Optional
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .base import PaymentRequest, PaymentResponse, PaymentStatus, WebhookVerification
+from .http_client import HTTPPaymentProvider
+
+
+class FakeServerProvider(HTTPPaymentProvider):
+    """
+    Talks to FakeProviderServer over HTTP.
+    """
+
+    PROVIDER_NAME = 'fake'
+    IS_TEST_PROVIDER = True
+
+    def create_payment(self, request: PaymentRequest) -> PaymentResponse:
+        data = self.http.post(
+            '/v1/payments',
+            json={
+                'order_number': request.order_number,
+                'amount_cents': request.amount_cents,
+                'method': request.method,
+                'customer_email': request.customer_email,
+            },
+            idempotency_key=request.idempotency_key
+        )
+        return PaymentResponse(
+            success=True,
+            provider_transaction_id=data['id'],
+            status=data['status'],
+            pix_copy_paste=data.get('pix_copy_paste'),
+            fees_cents=self.calculate_fee(request.amount_cents, request.method),
+            raw_payload=data,
+        )
+
+    def verify_webhook(self, headers: Dict[str, str], body: bytes) -> WebhookVerification:
+        """Unsigned JSON body: {event_id, transaction_id, status}."""
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            return WebhookVerification(is_valid=False, error_message=str(e))
+
+        return WebhookVerification(
+            is_valid=True,
+            event_id=payload.get('event_id') or hashlib.sha256(body).hexdigest(),
+            provider_transaction_id=payload.get('transaction_id'),
+            new_status=payload.get('status', 'COMPLETED'),
+            paid_at=timezone.now() if payload.get('status') == 'COMPLETED' else None
+        )
+
+    def refund(self, transaction_id: str, amount_cents: Optional[int] = None) -> bool:
+        self.http.post(f'/v1/payments/{transaction_id}/status', json={'status': 'REFUNDED'})
+        return True
+
+    def get_status(self, transaction_id: str) -> str:
+        return self.get_payment_status(transaction_id).status
+
+    def get_payment_status(self, transaction_id: str) -> PaymentStatus:
+        data = self.http.get(f'/v1/payments/{transaction_id}')
+        return PaymentStatus(
+            status=data['status'],
+            paid_at=parse_datetime(data['paid_at']) if data.get('paid_at') else None
+        )
+
+    def calculate_fee(self, amount_cents: int, method: str) -> int:
+        return amount_cents // 100
@@ -0,0 +1,147 @@
+"""
+Local stand-in for a payment provider API, for tests and load tests.
+
+Speaks a minimal REST API over HTTP/1.1 with keep-alive:
+
+- POST /v1/payments              create a payment (deduped by X-Idempotency-Key)
+- GET  /v1/payments/{id}         read a payment
+- POST /v1/payments/{id}/status  set a payment's status (test helper);
+                                 COMPLETED records `paid_at`
+
+Latency and failures can be injected to exercise timeouts and retries.
+Run it with `python manage.py run_fake_provider`.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeProviderState:
+    """
+    Payments and counters shared by the server threads.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.fail_next = 0
+        self.payments = {}
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def should_fail(self):
+        with self.lock:
+            self.requests += 1
+            if self.fail_next:
+                self.fail_next -= 1
+                return True
+        return random.random() < self.failure_rate
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _handle(self, method):
+        state = self.server.state
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+        if state.latency:
+            time.sleep(state.latency)
+
+        if state.should_fail():
+            return self._send(503, {'error': 'unavailable'}, {'Retry-After': '0'})
+
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+
+        if method == 'POST' and parts == ['v1', 'payments']:
+            return self._create(state, body)
+
+        if parts[:2] == ['v1', 'payments'] and len(parts) >= 3:
+            with state.lock:
+                payment = state.payments.get(parts[2])
+            if payment is None:
+                return self._send(404, {'error': 'not found'})
+            if method == 'POST' and parts[3:] == ['status']:
+                with state.lock:
+                    payment['status'] = body['status']
+                    if body['status'] == 'COMPLETED':
+                        payment['paid_at'] = body.get('paid_at') or datetime.now(timezone.utc).isoformat()
+            return self._send(200, payment)
+
+        return self._send(404, {'error': 'not found'})
+
+    def _create(self, state, body):
+        key = self.headers.get('X-Idempotency-Key') or json.dumps(body, sort_keys=True)
+        payment_id = f"FAKE-{hashlib.sha256(key.encode()).hexdigest()[:20].upper()}"
+
+        with state.lock:
+            payment = state.payments.setdefault(payment_id, {
+                'id': payment_id,
+                'status': 'PENDING',
+                'amount_cents': body.get('amount_cents'),
+                'method': body.get('method'),
+                'pix_copy_paste': f"fake-pix-{payment_id}" if body.get('method') == 'PIX' else None,
+            })
+        return self._send(201, payment)
+
+    def _send(self, status_code, payload, headers=None):
+        content = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    """
+    Threaded fake provider. Use as a context manager to run it in a
+    background thread (port 0 picks a free port):
+
+        with FakeProviderServer() as server:
+            client = ProviderHTTPClient(server.url)
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0):
+        super().__init__((host, port), FakeProviderHandler)
+        self.state = FakeProviderState(latency, failure_rate)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
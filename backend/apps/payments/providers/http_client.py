@@ -0,0 +1,198 @@
+"""
+Shared HTTP client for payment providers.
+
+Providers keep one client for the life of the process, so connections
+(and their TLS sessions) are pooled and kept alive across checkouts
+instead of being opened per call.
+
+Requests are retried on connection errors, timeouts and 429/502/503/504
+answers with exponential backoff and full jitter (honouring Retry-After).
+POSTs are only retried when they carry an idempotency key, so a retry can
+never create a second charge.
+
+`ProviderHTTPClient` is the synchronous client used by Django and Celery;
+`AsyncProviderHTTPClient` has the same interface for asyncio code.
+"""
+
+import asyncio
+import logging
+import random
+import time
+import httpx
+from django.conf import settings
+from apps.core.exceptions import PaymentProviderError
+from .base import PaymentProvider
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+IDEMPOTENCY_HEADER = 'X-Idempotency-Key'
+
+
+class _RetryPolicy:
+    """Client options and the retry/backoff decisions shared by both clients."""
+
+    def __init__(self, base_url, headers=None, timeout=None, max_connections=None,
+                 max_retries=None, backoff=None, transport=None):
+        self.max_retries = settings.PAYMENT_HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = settings.PAYMENT_HTTP_BACKOFF_SECONDS if backoff is None else backoff
+
+        max_connections = max_connections or settings.PAYMENT_HTTP_MAX_CONNECTIONS
+        self.client_options = {
+            'base_url': base_url,
+            'headers': headers or {},
+            'timeout': httpx.Timeout(
+                timeout or settings.PAYMENT_HTTP_TIMEOUT_SECONDS,
+                connect=settings.PAYMENT_HTTP_CONNECT_TIMEOUT_SECONDS
+            ),
+            'limits': httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=settings.PAYMENT_HTTP_KEEPALIVE_SECONDS
+            ),
+        }
+        if transport is not None:
+            self.client_options['transport'] = transport
+
+    @staticmethod
+    def _prepare(method, idempotency_key, kwargs):
+        method = method.upper()
+        if idempotency_key:
+            kwargs['headers'] = {**kwargs.get('headers', {}), IDEMPOTENCY_HEADER: idempotency_key}
+        return method, method in IDEMPOTENT_METHODS or bool(idempotency_key)
+
+    def _should_retry(self, attempt, retryable, response=None):
+        if attempt >= self.max_retries or not retryable:
+            return False
+        return response is None or response.status_code in RETRY_STATUSES
+
+    def _delay(self, attempt, response=None):
+        """Full-jitter exponential backoff, or Retry-After if longer."""
+        delay = random.uniform(0, self.backoff * (2 ** attempt))
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get('Retry-After', 0)))
+            except ValueError:
+                pass
+        return delay
+
+    @staticmethod
+    def _result(method, path, response):
+        """Decoded JSON body, or PaymentProviderError for error answers."""
+        if response.is_error:
+            raise PaymentProviderError(
+                f"{method} {path} failed with {response.status_code}: {response.text[:200]}"
+            )
+        return response.json() if response.content else {}
+
+
+class ProviderHTTPClient(_RetryPolicy):
+    """
+    Pooled, retrying HTTP client for one provider API.
+    """
+
+    def __init__(self, base_url, **options):
+        super().__init__(base_url, **options)
+        self.client = httpx.Client(**self.client_options)
+
+    def request(self, method, path, idempotency_key=None, **kwargs):
+        """
+        Send a request and return its decoded JSON body.
+
+        Args:
+            method: HTTP method
+            path: Path relative to the base URL
+            idempotency_key: Sent as X-Idempotency-Key; makes POSTs retryable
+            **kwargs: Passed to httpx (json, params, headers, ...)
+
+        Raises:
+            PaymentProviderError: On error answers or when retries run out
+        """
+        method, retryable = self._prepare(method, idempotency_key, kwargs)
+
+        attempt = 0
+        while True:
+            try:
+                response = self.client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                if not self._should_retry(attempt, retryable):
+                    raise PaymentProviderError(f"{method} {path} failed: {str(e)}") from e
+                response = None
+                logger.warning(f"Retrying {method} {path} after {type(e).__name__}")
+            else:
+                if not self._should_retry(attempt, retryable, response):
+                    return self._result(method, path, response)
+                logger.warning(f"Retrying {method} {path} after {response.status_code}")
+
+            time.sleep(self._delay(attempt, response))
+            attempt += 1
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def close(self):
+        self.client.close()
+
+
+class AsyncProviderHTTPClient(_RetryPolicy):
+    """
+    asyncio variant of ProviderHTTPClient (same options and retries).
+    """
+
+    def __init__(self, base_url, **options):
+        super().__init__(base_url, **options)
+        self.client = httpx.AsyncClient(**self.client_options)
+
+    async def request(self, method, path, idempotency_key=None, **kwargs):
+        """See ProviderHTTPClient.request."""
+        method, retryable = self._prepare(method, idempotency_key, kwargs)
+
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                if not self._should_retry(attempt, retryable):
+                    raise PaymentProviderError(f"{method} {path} failed: {str(e)}") from e
+                response = None
+                logger.warning(f"Retrying {method} {path} after {type(e).__name__}")
+            else:
+                if not self._should_retry(attempt, retryable, response):
+                    return self._result(method, path, response)
+                logger.warning(f"Retrying {method} {path} after {response.status_code}")
+
+            await asyncio.sleep(self._delay(attempt, response))
+            attempt += 1
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class HTTPPaymentProvider(PaymentProvider):
+    """
+    Base class for providers with an HTTP API.
+
+    Config keys: `base_url` (required), `headers`, and any
+    ProviderHTTPClient option (`timeout`, `max_connections`, ...).
+    The client is created once per provider instance, so keep instances
+    around to reuse their connections.
+    """
+    CLIENT_OPTIONS = ('timeout', 'max_connections', 'max_retries', 'backoff', 'transport')
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.http = ProviderHTTPClient(
+            config['base_url'],
+            headers=config.get('headers'),
+            **{name: config[name] for name in self.CLIENT_OPTIONS if name in config}
+        )
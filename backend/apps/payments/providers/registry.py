@@ -0,0 +1,106 @@
+"""
+Payment provider registry.
+
+Providers are declared in settings.PAYMENT_PROVIDERS (name -> BACKEND
+dotted path + OPTIONS), like CACHES or DATABASES. Each backend is imported
+on first use and instantiated once per process; the instance (with its
+parsed config and pooled HTTP client) is then shared by every checkout,
+webhook and reconciliation run in that process.
+
+Payment methods are routed to providers by PAYMENT_METHOD_PROVIDERS,
+falling back to PAYMENT_DEFAULT_PROVIDER.
+
+Test providers (stub, fake) accept unsigned webhooks, so they are refused
+unless PAYMENT_ALLOW_TEST_PROVIDERS is set (local settings only).
+"""
+
+import logging
+import threading
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from .base import PaymentProvider
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownProviderError(ValueError):
+    """Raised for provider names missing from PAYMENT_PROVIDERS, or test
+    providers while PAYMENT_ALLOW_TEST_PROVIDERS is off."""
+
+
+class ProviderRegistry:
+    """
+    Lazily built, per-process provider instances.
+    """
+
+    def __init__(self):
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def create(self, name, options=None) -> PaymentProvider:
+        """
+        Build a new, uncached instance of provider `name`.
+
+        Args:
+            name: Key of settings.PAYMENT_PROVIDERS
+            options: Overrides for the provider's OPTIONS
+
+        Raises:
+            UnknownProviderError: If the provider is not configured, or is a
+                                  test provider and those are not allowed
+        """
+        try:
+            definition = settings.PAYMENT_PROVIDERS[name]
+        except KeyError:
+            raise UnknownProviderError(f"Unknown payment provider: {name}")
+
+        backend = import_string(definition['BACKEND'])
+        if backend.IS_TEST_PROVIDER and not settings.PAYMENT_ALLOW_TEST_PROVIDERS:
+            raise UnknownProviderError(f"Test payment provider {name} is disabled")
+        return backend({**definition.get('OPTIONS', {}), **(options or {})})
+
+    def get(self, name=None) -> PaymentProvider:
+        """
+        Shared instance of provider `name` (the default provider if None).
+
+        Raises:
+            UnknownProviderError: If the provider is not configured
+        """
+        name = name or settings.PAYMENT_DEFAULT_PROVIDER
+        provider = self._instances.get(name)
+        if provider is None:
+            with self._lock:
+                provider = self._instances.get(name)
+                if provider is None:
+                    provider = self._instances[name] = self.create(name)
+                    logger.info(f"Payment provider {name} initialised")
+        return provider
+
+    def name_for_method(self, method):
+        """Name of the provider handling payment `method`."""
+        return settings.PAYMENT_METHOD_PROVIDERS.get(method, settings.PAYMENT_DEFAULT_PROVIDER)
+
+    def for_method(self, method) -> PaymentProvider:
+        """Shared instance of the provider handling payment `method`."""
+        return self.get(self.name_for_method(method))
+
+    def reset(self):
+        """Drop the cached instances, closing their HTTP clients."""
+        with self._lock:
+            instances, self._instances = self._instances, {}
+
+        for provider in instances.values():
+            http = getattr(provider, 'http', None)
+            if http is not None:
+                http.close()
+
+
+providers = ProviderRegistry()
+
+
+@receiver(setting_changed)
+def _reset_providers(setting, **kwargs):
+    if setting in ('PAYMENT_PROVIDERS', 'PAYMENT_DEFAULT_PROVIDER', 'PAYMENT_ALLOW_TEST_PROVIDERS'):
+        providers.reset()
@@ -24,6 +24,7 @@ class StubPaymentProvider(PaymentProvider):
     """
 
     PROVIDER_NAME = 'stub'
+    IS_TEST_PROVIDER = True
 
     def create_payment(self, request: PaymentRequest) -> PaymentResponse:
         """
@@ -81,6 +82,8 @@ class StubPaymentProvider(PaymentProvider):
             payload = json.loads(body)
             return WebhookVerification(
                 is_valid=True,
+                # Redeliveries without an explicit id have the same body
+                event_id=payload.get('event_id') or hashlib.sha256(body).hexdigest(),
                 provider_transaction_id=payload.get('transaction_id'),
                 new_status=payload.get('status', 'COMPLETED'),
                 paid_at=timezone.now() if payload.get('status') == 'COMPLETED' else None
@@ -154,23 +157,18 @@ class StubPaymentProvider(PaymentProvider):
 
 def get_payment_provider(provider_name: str = 'stub', config: Dict[str, Any] = None) -> PaymentProvider:
     """
-    Factory function to get payment provider instance.
+    Get a payment provider instance (kept for compatibility; use
+    apps.payments.providers.registry.providers instead).
 
     Args:
-        provider_name: Name of the provider (stub, mercadopago, asaas, etc.)
-        config: Provider-specific configuration
+        provider_name: Name of the provider in settings.PAYMENT_PROVIDERS
+        config: Option overrides; builds a new, uncached instance
 
     Returns:
-        PaymentProvider instance
+        PaymentProvider instance (the shared one when no config is given)
     """
-    config = config or {}
+    from .registry import providers
 
-    if provider_name == 'stub':
-        return StubPaymentProvider(config)
-
-    # Future providers can be added here:
-    # elif provider_name == 'mercadopago':
-    #     from .mercadopago import MercadoPagoProvider
-    #     return MercadoPagoProvider(config)
-
-    raise ValueError(f"Unknown payment provider: {provider_name}")
+    if config:
+        return providers.create(provider_name, config)
+    return providers.get(provider_name)
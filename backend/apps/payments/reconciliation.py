@@ -0,0 +1,185 @@
+"""
+Payment status reconciliation.
+
+Payments still PENDING/PROCESSING some minutes after checkout may have
+missed their webhook. `reconcile` polls their providers concurrently
+(a bounded thread pool, with each provider's calls spaced by its rate
+limit) and applies the answers in bulk: one UPDATE per new status, plus
+the confirmation of the orders whose payment completed (paid at the time
+the provider reports) or the cancellation of the pending orders whose
+payment failed or was cancelled, returning their stock like payment expiry.
+
+Only provider calls run in the pool; all database work happens in the
+calling thread.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from apps.core.exceptions import PaymentProviderError
+from apps.orders.models import Order
+from apps.orders.signals import order_status_changed
+from .expiry import cancel_pending_orders
+from .models import PaymentTransaction
+from .providers.registry import providers as payment_providers
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = (PaymentTransaction.Status.PENDING, PaymentTransaction.Status.PROCESSING)
+CANCELLING_STATUSES = (PaymentTransaction.Status.FAILED, PaymentTransaction.Status.CANCELLED)
+
+
+class RateLimiter:
+    """
+    Spaces calls to at most `rate` per second, across threads.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the next call is allowed."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+def stale_payments(now=None):
+    """Open payments created more than PAYMENT_RECONCILIATION_AFTER_MINUTES ago, oldest first."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(minutes=settings.PAYMENT_RECONCILIATION_AFTER_MINUTES)
+
+    return list(
+        PaymentTransaction.objects.filter(
+            status__in=OPEN_STATUSES,
+            created_at__lt=cutoff
+        ).exclude(
+            provider_transaction_id=''
+        ).order_by('created_at').only(
+            'id', 'order_id', 'provider', 'provider_transaction_id', 'status'
+        )[:settings.PAYMENT_RECONCILIATION_BATCH_SIZE]
+    )
+
+
+def poll_statuses(payments):
+    """
+    Ask the providers for the status of `payments`, concurrently.
+
+    Returns:
+        Dict of payment id -> PaymentStatus (failed polls are left out)
+    """
+    providers = {name: payment_providers.get(name) for name in {payment.provider for payment in payments}}
+    limiters = {
+        name: RateLimiter(settings.PAYMENT_PROVIDER_RATE_LIMITS.get(name, settings.PAYMENT_PROVIDER_DEFAULT_RATE_LIMIT))
+        for name in providers
+    }
+
+    def poll(payment):
+        limiters[payment.provider].acquire()
+        try:
+            return payment.id, providers[payment.provider].get_payment_status(payment.provider_transaction_id)
+        except PaymentProviderError as e:
+            logger.warning(f"Could not poll payment {payment.provider_transaction_id}: {str(e)}")
+            return payment.id, None
+
+    with ThreadPoolExecutor(max_workers=settings.PAYMENT_RECONCILIATION_WORKERS) as executor:
+        results = executor.map(poll, payments)
+        return {payment_id: status for payment_id, status in results if status}
+
+
+def apply_statuses(statuses):
+    """
+    Store polled statuses in bulk and confirm the orders of completed
+    payments, or cancel the pending orders of failed and cancelled ones
+    (returning their stock). Payments that left the open statuses
+    meanwhile (e.g. through a webhook) are not touched.
+
+    Args:
+        statuses: Dict of payment id -> PaymentStatus
+
+    Returns:
+        Number of payments updated
+    """
+    now = timezone.now()
+    by_status = defaultdict(dict)
+    for payment_id, polled in statuses.items():
+        by_status[polled.status][payment_id] = polled.paid_at
+
+    updated = 0
+    cancelled = []
+    with transaction.atomic():
+        for status, paid_at in by_status.items():
+            if status in OPEN_STATUSES or status not in PaymentTransaction.Status.values:
+                continue
+
+            payments = PaymentTransaction.objects.select_for_update().filter(
+                id__in=list(paid_at),
+                status__in=OPEN_STATUSES
+            )
+            order_ids = list(payments.values_list('order_id', flat=True))
+
+            fields = {'status': status, 'updated_at': now}
+            if status == PaymentTransaction.Status.COMPLETED:
+                # The provider's capture time; now if it does not report one
+                fields['paid_at'] = Case(
+                    *[When(id=payment_id, then=Value(at)) for payment_id, at in paid_at.items() if at],
+                    default=Value(now),
+                    output_field=DateTimeField()
+                )
+            updated += payments.update(**fields)
+
+            if status == PaymentTransaction.Status.COMPLETED:
+                _confirm_orders(order_ids, now)
+            elif status in CANCELLING_STATUSES:
+                cancelled += cancel_pending_orders(order_ids, now)
+
+    for order in cancelled:
+        logger.info(f"Cancelled order {order.order_number}: payment failed (reconciliation)")
+    return updated
+
+
+def _confirm_orders(order_ids, now):
+    """Move PENDING orders to CONFIRMED in one statement and send the events."""
+    orders = list(Order.objects.select_for_update().filter(id__in=order_ids, status=Order.Status.PENDING))
+    Order.objects.filter(id__in=[order.id for order in orders]).update(
+        status=Order.Status.CONFIRMED,
+        updated_at=now
+    )
+
+    for order in orders:
+        order.status = Order.Status.CONFIRMED
+        order_status_changed.send(
+            sender=Order,
+            order=order,
+            old_status=Order.Status.PENDING,
+            new_status=Order.Status.CONFIRMED
+        )
+        logger.info(f"Payment confirmed for order {order.order_number} by reconciliation")
+
+
+def reconcile():
+    """
+    Poll and update one batch of stale open payments.
+
+    Returns:
+        Tuple of (payments polled, payments updated)
+    """
+    payments = stale_payments()
+    if not payments:
+        return 0, 0
+
+    statuses = poll_statuses(payments)
+    return len(payments), apply_statuses(statuses)
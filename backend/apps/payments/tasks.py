@@ -0,0 +1,79 @@
+from celery import shared_task
+from django.utils import timezone
+from apps.core.exceptions import PaymentProviderError
+from . import expiry, reconciliation, webhooks
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def process_webhook_events():
+    """
+    Apply a batch of stored webhook events.
+    Queued by the webhook endpoint on every new event and run every few
+    seconds by Celery Beat as a safety net.
+    """
+    claimed = webhooks.process_pending()
+    if claimed:
+        logger.info(f"Processed {claimed} webhook events")
+    return claimed
+
+
+@shared_task
+def reconcile_payments():
+    """
+    Poll providers for payments left open past
+    PAYMENT_RECONCILIATION_AFTER_MINUTES (missed webhooks) and apply the
+    answers. Runs every 5 minutes via Celery Beat.
+    """
+    polled, updated = reconciliation.reconcile()
+    if polled:
+        logger.info(f"Reconciled {polled} open payments, {updated} updated")
+    return {'polled': polled, 'updated': updated}
+
+
+@shared_task
+def expire_unpaid_payments():
+    """
+    Cancel pending payments past their expiry, cancel their orders and
+    return the stock. Runs every 5 minutes via Celery Beat.
+    """
+    expired, cancelled = expiry.expire_payments()
+    if expired:
+        logger.info(f"Expired {expired} unpaid payments, {cancelled} orders cancelled")
+    return {'expired': expired, 'cancelled': cancelled}
+
+
+@shared_task
+def refund_late_payment(payment_id):
+    """
+    Refund a payment captured after its order was cancelled (queued by
+    webhook processing). On provider errors the payment stays flagged
+    `needs_review` for manual handling.
+    """
+    from .models import PaymentTransaction
+    from .providers.registry import providers
+
+    payment = PaymentTransaction.objects.get(id=payment_id)
+    if payment.status != PaymentTransaction.Status.COMPLETED or not payment.needs_review:
+        return False
+
+    try:
+        refunded = providers.get(payment.provider).refund(payment.provider_transaction_id)
+    except PaymentProviderError as e:
+        refunded = False
+        logger.error(f"Refund of late payment {payment.provider_transaction_id} failed: {str(e)}")
+    if not refunded:
+        return False
+
+    updated = PaymentTransaction.objects.filter(
+        id=payment.id,
+        status=PaymentTransaction.Status.COMPLETED
+    ).update(
+        status=PaymentTransaction.Status.REFUNDED,
+        needs_review=False,
+        updated_at=timezone.now()
+    )
+    logger.info(f"Refunded late payment {payment.provider_transaction_id}")
+    return updated == 1
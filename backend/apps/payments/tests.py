@@ -0,0 +1,579 @@
+"""
+Tests for webhook ingestion, reconciliation, expiry and the provider HTTP client.
+"""
+
+import asyncio
+import json
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.test import APIClient
+from apps.core.exceptions import PaymentProviderError
+from apps.inventory.models import Inventory
+from apps.orders.models import Order, OrderItem
+from apps.payments import expiry, reconciliation, tasks, webhooks
+from apps.payments.models import PaymentTransaction, WebhookEvent
+from apps.payments.providers.base import PaymentRequest, PaymentStatus, WebhookVerification
+from apps.payments.providers.fake import FakeServerProvider
+from apps.payments.providers.fake_server import FakeProviderServer
+from apps.payments.providers.http_client import AsyncProviderHTTPClient, ProviderHTTPClient
+from apps.payments.providers.registry import ProviderRegistry, UnknownProviderError, providers
+from apps.payments.providers.stub import StubPaymentProvider, get_payment_provider
+from apps.products.models import Product, SKU
+
+
+class WebhookTestCase(TestCase):
+    """Test that webhooks are stored on receipt and applied in batches."""
+
+    def setUp(self):
+        """Create a pending order with its payment."""
+        self.order = Order.objects.create(
+            customer_email="buyer@example.com",
+            customer_name="Buyer",
+            customer_cpf="123.456.789-09",
+            customer_phone="11999999999",
+            shipping_street="Rua A",
+            shipping_number="10",
+            shipping_neighborhood="Centro",
+            shipping_city="Sao Paulo",
+            shipping_state="SP",
+            shipping_cep="01001-000",
+            subtotal_cents=1000,
+            total_cents=1000,
+        )
+        self.payment = PaymentTransaction.objects.create(
+            order=self.order,
+            idempotency_key="key",
+            provider="stub",
+            provider_transaction_id="STUB-1",
+            method="PIX",
+            amount_cents=1000,
+        )
+        self.client = APIClient()
+
+    def post_webhook(self, **payload):
+        with mock.patch("apps.payments.views.process_webhook_events.delay") as delay:
+            response = self.client.post(
+                "/api/v1/payments/webhook/",
+                json.dumps(payload),
+                content_type="application/json",
+            )
+        return response, delay
+
+    def store(self, event_id, new_status, transaction_id="STUB-1", provider="stub", **fields):
+        webhooks.store_event(
+            provider,
+            WebhookVerification(
+                is_valid=True,
+                event_id=event_id,
+                provider_transaction_id=transaction_id,
+                new_status=new_status,
+            ),
+            b"{}"
+        )
+        if fields:
+            WebhookEvent.objects.filter(event_id=event_id).update(**fields)
+
+    def test_webhook_is_stored_once_and_queued(self):
+        """Test that the endpoint only stores the event, and dedupes redeliveries."""
+        response, delay = self.post_webhook(event_id="evt-1", transaction_id="STUB-1", status="COMPLETED")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["message"], "Webhook received")
+        delay.assert_called_once()
+        self.assertEqual(WebhookEvent.objects.get().status, WebhookEvent.Status.PENDING)
+        self.assertEqual(PaymentTransaction.objects.get().status, PaymentTransaction.Status.PENDING)
+
+        response, delay = self.post_webhook(event_id="evt-1", transaction_id="STUB-1", status="COMPLETED")
+
+        self.assertEqual(response.json()["message"], "Webhook already received")
+        delay.assert_not_called()
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_provider_webhook_url(self):
+        """Test that webhooks can name their provider, and unknown ones are rejected."""
+        with mock.patch("apps.payments.views.process_webhook_events.delay"):
+            response = self.client.post(
+                "/api/v1/payments/webhook/stub/",
+                json.dumps({"event_id": "evt-1", "transaction_id": "STUB-1"}),
+                content_type="application/json",
+            )
+            unknown = self.client.post("/api/v1/payments/webhook/nope/", "{}", content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(WebhookEvent.objects.get().provider, "stub")
+        self.assertEqual(unknown.status_code, 404)
+
+    def test_invalid_webhook_is_rejected(self):
+        """Test that unparseable bodies are not stored."""
+        response = self.client.post("/api/v1/payments/webhook/", "not json", content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_batch_applies_events_in_order(self):
+        """Test that a transaction's events are applied in arrival order."""
+        self.store("evt-1", "PROCESSING")
+        self.store("evt-2", "COMPLETED")
+
+        self.assertEqual(webhooks.process_pending(), 2)
+
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentTransaction.Status.COMPLETED)
+        self.assertEqual(self.order.status, Order.Status.CONFIRMED)
+        self.assertEqual(
+            set(WebhookEvent.objects.values_list("status", flat=True)),
+            {WebhookEvent.Status.PROCESSED}
+        )
+        self.assertEqual(webhooks.process_pending(), 0)
+
+    def test_older_pending_event_blocks_transaction(self):
+        """Test that newer events wait for an older event of the same transaction."""
+        self.store("evt-1", "COMPLETED", available_at=timezone.now() + timedelta(minutes=1))
+        self.store("evt-2", "FAILED")
+
+        webhooks.process_pending()
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentTransaction.Status.PENDING)
+        self.assertEqual(WebhookEvent.objects.get(event_id="evt-2").status, WebhookEvent.Status.PENDING)
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=2)
+    def test_unknown_transaction_is_retried_then_failed(self):
+        """Test that events for unknown transactions back off and eventually fail."""
+        self.store("evt-1", "COMPLETED", transaction_id="STUB-UNKNOWN")
+
+        webhooks.process_pending()
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, WebhookEvent.Status.PENDING)
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.available_at, timezone.now())
+        self.assertEqual(webhooks.process_pending(), 0)
+
+        WebhookEvent.objects.update(available_at=timezone.now())
+        webhooks.process_pending()
+        self.assertEqual(WebhookEvent.objects.get().status, WebhookEvent.Status.FAILED)
+
+
+    def test_late_capture_on_cancelled_order_is_refunded(self):
+        """Test that a capture after cancellation flags the payment instead of confirming the order."""
+        Order.objects.filter(id=self.order.id).update(status=Order.Status.CANCELLED)
+        PaymentTransaction.objects.filter(id=self.payment.id).update(status=PaymentTransaction.Status.FAILED)
+        self.store("evt-1", "COMPLETED")
+
+        with mock.patch("apps.payments.tasks.refund_late_payment.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                webhooks.process_pending()
+
+        self.order.refresh_from_db()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.order.status, Order.Status.CANCELLED)
+        self.assertEqual(self.payment.status, PaymentTransaction.Status.COMPLETED)
+        self.assertTrue(self.payment.needs_review)
+        delay.assert_called_once_with(str(self.payment.id))
+
+        self.assertTrue(tasks.refund_late_payment(str(self.payment.id)))
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentTransaction.Status.REFUNDED)
+        self.assertFalse(self.payment.needs_review)
+
+    def test_backward_transition_is_ignored(self):
+        """Test that a stale update cannot move a completed payment back."""
+        self.store("evt-1", "COMPLETED")
+        self.store("evt-2", "PENDING")
+        self.store("evt-3", "FAILED")
+
+        webhooks.process_pending()
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentTransaction.Status.COMPLETED)
+        self.assertIn("Ignored transition", WebhookEvent.objects.get(event_id="evt-3").error)
+        self.assertEqual(WebhookEvent.objects.get(event_id="evt-1").error, "")
+
+    def test_events_match_provider_and_transaction(self):
+        """Test that another provider's event with the same transaction id is not applied."""
+        self.store("evt-1", "COMPLETED", provider="fake")
+
+        webhooks.process_pending()
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentTransaction.Status.PENDING)
+        self.assertEqual(WebhookEvent.objects.get().error, "Transaction not found")
+
+
+class ReconciliationTestCase(TestCase):
+    """Test polling providers for payments that missed their webhook."""
+
+    def setUp(self):
+        """Create old open payments and a recent one."""
+        self.payments = [self._payment(f"STUB-{index}", minutes_ago=60) for index in range(4)]
+        self.recent = self._payment("STUB-RECENT", minutes_ago=1)
+
+    def _payment(self, transaction_id, minutes_ago):
+        order = Order.objects.create(
+            customer_email="buyer@example.com",
+            customer_name="Buyer",
+            customer_cpf="123.456.789-09",
+            customer_phone="11999999999",
+            shipping_street="Rua A",
+            shipping_number="10",
+            shipping_neighborhood="Centro",
+            shipping_city="Sao Paulo",
+            shipping_state="SP",
+            shipping_cep="01001-000",
+            subtotal_cents=1000,
+            total_cents=1000,
+        )
+        payment = PaymentTransaction.objects.create(
+            order=order,
+            idempotency_key=transaction_id,
+            provider="stub",
+            provider_transaction_id=transaction_id,
+            method="PIX",
+            amount_cents=1000,
+        )
+        PaymentTransaction.objects.filter(id=payment.id).update(
+            created_at=timezone.now() - timedelta(minutes=minutes_ago)
+        )
+        return payment
+
+    def test_reconcile_applies_polled_statuses(self):
+        """Test that stale payments are polled and updated in bulk."""
+        answers = {"STUB-0": "COMPLETED", "STUB-1": "COMPLETED", "STUB-2": "FAILED", "STUB-3": "PENDING"}
+
+        with mock.patch(
+            "apps.payments.providers.stub.StubPaymentProvider.get_status",
+            side_effect=lambda transaction_id: answers[transaction_id]
+        ) as get_status:
+            polled, updated = reconciliation.reconcile()
+
+        self.assertEqual((polled, updated), (4, 3))
+        self.assertEqual(get_status.call_count, 4)
+
+        statuses = dict(PaymentTransaction.objects.values_list("provider_transaction_id", "status"))
+        self.assertEqual(statuses["STUB-0"], "COMPLETED")
+        self.assertEqual(statuses["STUB-2"], "FAILED")
+        self.assertEqual(statuses["STUB-3"], "PENDING")
+        self.assertEqual(statuses["STUB-RECENT"], "PENDING")
+        self.assertEqual(
+            Order.objects.filter(status=Order.Status.CONFIRMED).count(), 2
+        )
+        self.assertEqual(Order.objects.get(id=self.payments[2].order_id).status, Order.Status.CANCELLED)
+        self.assertIsNotNone(PaymentTransaction.objects.get(provider_transaction_id="STUB-0").paid_at)
+
+    def test_paid_at_comes_from_provider(self):
+        """Test that completed payments keep the capture time the provider reports."""
+        captured = timezone.now() - timedelta(minutes=42)
+
+        updated = reconciliation.apply_statuses({
+            self.payments[0].id: PaymentStatus("COMPLETED", paid_at=captured),
+            self.payments[1].id: PaymentStatus("COMPLETED"),
+        })
+
+        self.assertEqual(updated, 2)
+        self.assertEqual(PaymentTransaction.objects.get(id=self.payments[0].id).paid_at, captured)
+        self.assertGreater(PaymentTransaction.objects.get(id=self.payments[1].id).paid_at, captured)
+
+    def test_failed_payment_cancels_order_and_returns_stock(self):
+        """Test that a polled failure cancels the pending order and restocks its items."""
+        product = Product.objects.create(
+            name="Test Card",
+            brand="Test TCG",
+            set_name="Test Set",
+            rarity=Product.Rarity.RARE,
+        )
+        sku = SKU.objects.create(product=product, price_cents=1000)
+        Inventory.objects.filter(sku=sku).update(quantity_on_hand=5)
+        OrderItem.objects.create(
+            order_id=self.payments[0].order_id, sku=sku, quantity=2, unit_price_cents=1000, line_total_cents=2000
+        )
+        confirmed = Order.objects.filter(id=self.payments[1].order_id)
+        confirmed.update(status=Order.Status.CONFIRMED)
+
+        updated = reconciliation.apply_statuses({
+            self.payments[0].id: PaymentStatus("FAILED"),
+            self.payments[1].id: PaymentStatus("CANCELLED"),
+        })
+
+        self.assertEqual(updated, 2)
+        self.assertEqual(Order.objects.get(id=self.payments[0].order_id).status, Order.Status.CANCELLED)
+        self.assertEqual(Inventory.objects.with_lapsed_reservations().get(sku=sku).quantity_on_hand, 7)
+        # Only pending orders are cancelled
+        self.assertEqual(confirmed.get().status, Order.Status.CONFIRMED)
+
+    def test_webhook_update_wins(self):
+        """Test that payments closed meanwhile are not overwritten."""
+        PaymentTransaction.objects.filter(id=self.payments[0].id).update(status="CANCELLED")
+
+        updated = reconciliation.apply_statuses({self.payments[0].id: PaymentStatus("COMPLETED")})
+
+        self.assertEqual(updated, 0)
+        self.assertEqual(PaymentTransaction.objects.get(id=self.payments[0].id).status, "CANCELLED")
+
+    def test_rate_limiter_spaces_calls(self):
+        """Test that the limiter spaces calls by the configured rate."""
+        limiter = reconciliation.RateLimiter(rate=10)
+
+        with mock.patch("apps.payments.reconciliation.time.sleep") as sleep:
+            for _ in range(3):
+                limiter.acquire()
+
+        waits = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(len(waits), 2)
+        self.assertAlmostEqual(waits[1], 0.2, delta=0.05)
+
+
+
+class PaymentExpiryTestCase(TestCase):
+    """Test that expired unpaid payments cancel their orders and return stock."""
+
+    def setUp(self):
+        """Create two SKUs and orders whose Pix payments expired an hour ago."""
+        product = Product.objects.create(
+            name="Test Card",
+            brand="Test TCG",
+            set_name="Test Set",
+            rarity=Product.Rarity.RARE,
+        )
+        self.skus = [
+            SKU.objects.create(product=product, price_cents=1000),
+            SKU.objects.create(product=product, price_cents=1000, is_foil=True),
+        ]
+        Inventory.objects.update(quantity_on_hand=5)
+
+        self.expired = [self._order(f"PIX-{index}", expires_in=timedelta(hours=-1)) for index in range(3)]
+
+    def _order(self, key, expires_in, status=Order.Status.PENDING):
+        order = Order.objects.create(
+            customer_email="buyer@example.com",
+            customer_name="Buyer",
+            customer_cpf="123.456.789-09",
+            customer_phone="11999999999",
+            shipping_street="Rua A",
+            shipping_number="10",
+            shipping_neighborhood="Centro",
+            shipping_city="Sao Paulo",
+            shipping_state="SP",
+            shipping_cep="01001-000",
+            subtotal_cents=3000,
+            total_cents=3000,
+            status=status,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, sku=self.skus[0], quantity=2, unit_price_cents=1000, line_total_cents=2000),
+            OrderItem(order=order, sku=self.skus[1], quantity=1, unit_price_cents=1000, line_total_cents=1000),
+        ])
+        PaymentTransaction.objects.create(
+            order=order,
+            idempotency_key=key,
+            provider="stub",
+            provider_transaction_id=key,
+            method="PIX",
+            amount_cents=3000,
+            expires_at=timezone.now() + expires_in,
+        )
+        return order
+
+    def stock(self):
+        return list(Inventory.objects.filter(sku__in=self.skus).order_by("sku__is_foil").values_list(
+            "quantity_on_hand", flat=True
+        ))
+
+    def test_expired_orders_are_cancelled_and_restocked(self):
+        """Test that only expired pending payments are swept, restocking per SKU."""
+        recent = self._order("PIX-RECENT", expires_in=timedelta(hours=1))
+        in_grace = self._order("PIX-GRACE", expires_in=timedelta(minutes=-1))
+        confirmed = self._order("PIX-PAID", expires_in=timedelta(hours=-1), status=Order.Status.CONFIRMED)
+
+        with mock.patch("apps.payments.expiry.order_status_changed.send") as send:
+            self.assertEqual(expiry.expire_payments(), (4, 3))
+
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(self.stock(), [5 + 3 * 2, 5 + 3])
+        self.assertEqual(
+            set(Order.objects.filter(status=Order.Status.CANCELLED).values_list("id", flat=True)),
+            {order.id for order in self.expired}
+        )
+        self.assertEqual(Order.objects.get(id=confirmed.id).status, Order.Status.CONFIRMED)
+        self.assertEqual(
+            PaymentTransaction.objects.filter(status=PaymentTransaction.Status.CANCELLED).count(), 4
+        )
+        for order in (recent, in_grace):
+            self.assertEqual(PaymentTransaction.objects.get(order=order).status, PaymentTransaction.Status.PENDING)
+
+        self.assertEqual(expiry.expire_payments(), (0, 0))
+        self.assertEqual(self.stock(), [11, 8])
+
+    @override_settings(PAYMENT_EXPIRY_BATCH_SIZE=2, PAYMENT_EXPIRY_MAX_BATCHES=1)
+    def test_sweep_is_bounded(self):
+        """Test that one run handles at most MAX_BATCHES batches of BATCH_SIZE."""
+        self.assertEqual(expiry.expire_payments(), (2, 2))
+        self.assertEqual(expiry.expire_payments(), (1, 1))
+        self.assertEqual(self.stock(), [11, 8])
+
+    def test_batch_query_count_is_constant(self):
+        """Test that a batch runs a fixed number of queries, whatever its size."""
+        # Savepoint, claim, payments, orders, per-SKU sums, stock, orders, release
+        with self.assertNumQueries(8):
+            expiry.expire_batch()
+
+
+class ProviderHTTPClientTestCase(TestCase):
+    """Test the pooled provider HTTP client against the fake provider server."""
+
+    def setUp(self):
+        """Start a fake provider server and a client without backoff."""
+        self.server = FakeProviderServer()
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.client = ProviderHTTPClient(self.server.url, backoff=0)
+        self.addCleanup(self.client.close)
+
+    def test_connection_is_reused(self):
+        """Test that consecutive requests share one kept-alive connection."""
+        payment = self.client.post("/v1/payments", json={"amount_cents": 1000}, idempotency_key="key-1")
+        for _ in range(3):
+            self.assertEqual(self.client.get(f"/v1/payments/{payment['id']}")["status"], "PENDING")
+
+        self.assertEqual(self.server.state.requests, 4)
+        self.assertEqual(self.server.state.connections, 1)
+
+    def test_retries_transient_failures(self):
+        """Test that 503 answers are retried up to max_retries."""
+        self.server.state.fail_next = 2
+
+        payment = self.client.post("/v1/payments", json={"amount_cents": 1000}, idempotency_key="key-1")
+
+        self.assertEqual(payment["status"], "PENDING")
+        self.assertEqual(self.server.state.requests, 3)
+        self.assertEqual(len(self.server.state.payments), 1)
+
+        self.server.state.fail_next = 3
+        with self.assertRaises(PaymentProviderError):
+            self.client.get(f"/v1/payments/{payment['id']}")
+
+    def test_post_without_key_is_not_retried(self):
+        """Test that a POST without idempotency key is sent only once."""
+        self.server.state.fail_next = 1
+
+        with self.assertRaises(PaymentProviderError):
+            self.client.post("/v1/payments", json={"amount_cents": 1000})
+
+        self.assertEqual(self.server.state.requests, 1)
+
+    def test_error_answer_raises(self):
+        """Test that non-retryable error answers raise PaymentProviderError."""
+        with self.assertRaises(PaymentProviderError):
+            self.client.get("/v1/payments/FAKE-MISSING")
+
+    def test_async_client(self):
+        """Test that the asyncio client retries and pools the same way."""
+        self.server.state.fail_next = 1
+
+        async def run():
+            client = AsyncProviderHTTPClient(self.server.url, backoff=0)
+            try:
+                payment = await client.post("/v1/payments", json={"amount_cents": 500}, idempotency_key="key-2")
+                return await client.get(f"/v1/payments/{payment['id']}")
+            finally:
+                await client.aclose()
+
+        payment = asyncio.run(run())
+
+        self.assertEqual(payment["amount_cents"], 500)
+        self.assertEqual(self.server.state.requests, 3)
+
+    def test_fake_provider(self):
+        """Test that the fake provider creates and polls payments over HTTP."""
+        provider = FakeServerProvider({"base_url": self.server.url, "backoff": 0})
+        self.addCleanup(provider.http.close)
+        request = PaymentRequest(
+            idempotency_key="key-3",
+            order_id="1",
+            order_number="ORD-1",
+            amount_cents=1000,
+            method="PIX",
+            customer_email="buyer@example.com",
+            customer_name="Buyer",
+            customer_cpf="123.456.789-09",
+        )
+
+        response = provider.create_payment(request)
+
+        self.assertTrue(response.success)
+        self.assertEqual(provider.create_payment(request).provider_transaction_id, response.provider_transaction_id)
+        self.assertEqual(provider.get_status(response.provider_transaction_id), "PENDING")
+        self.assertTrue(provider.refund(response.provider_transaction_id))
+        self.assertEqual(provider.get_status(response.provider_transaction_id), "REFUNDED")
+
+        self.client.post(
+            f"/v1/payments/{response.provider_transaction_id}/status",
+            json={"status": "COMPLETED", "paid_at": "2026-01-02T03:04:05+00:00"},
+        )
+        self.assertEqual(
+            provider.get_payment_status(response.provider_transaction_id).paid_at.isoformat(),
+            "2026-01-02T03:04:05+00:00"
+        )
+
+
+class ProviderRegistryTestCase(TestCase):
+    """Test the settings-driven provider registry."""
+
+    def test_instances_are_cached(self):
+        """Test that providers are built once per process and shared."""
+        registry = ProviderRegistry()
+
+        with mock.patch("apps.payments.providers.registry.import_string", wraps=import_string) as loader:
+            first = registry.get("stub")
+            second = registry.get()
+
+        self.assertIsInstance(first, StubPaymentProvider)
+        self.assertIs(first, second)
+        self.assertEqual(loader.call_count, 1)
+
+    def test_unknown_provider(self):
+        """Test that unconfigured providers raise UnknownProviderError."""
+        with self.assertRaises(UnknownProviderError):
+            ProviderRegistry().get("nope")
+
+    @override_settings(PAYMENT_METHOD_PROVIDERS={"CREDIT_CARD": "fake"})
+    def test_routing_by_method(self):
+        """Test that payment methods are routed to their provider."""
+        self.assertEqual(providers.name_for_method("CREDIT_CARD"), "fake")
+        self.assertEqual(providers.name_for_method("PIX"), "stub")
+        self.assertIs(providers.for_method("PIX"), providers.get("stub"))
+
+    def test_settings_change_resets_instances(self):
+        """Test that overriding PAYMENT_PROVIDERS drops cached instances."""
+        before = providers.get("stub")
+
+        with override_settings(PAYMENT_PROVIDERS={
+            "stub": {"BACKEND": "apps.payments.providers.stub.StubPaymentProvider", "OPTIONS": {"flag": 1}},
+        }):
+            overridden = providers.get("stub")
+            self.assertEqual(overridden.config, {"flag": 1})
+
+        self.assertIsNot(overridden, before)
+        self.assertEqual(providers.get("stub").config, {})
+
+    @override_settings(PAYMENT_ALLOW_TEST_PROVIDERS=False)
+    def test_test_providers_are_refused(self):
+        """Test that test providers are refused unless explicitly allowed."""
+        with self.assertRaises(UnknownProviderError):
+            providers.get("stub")
+
+        response = APIClient().post(
+            "/api/v1/payments/webhook/stub/",
+            json.dumps({"event_id": "evt-1", "transaction_id": "STUB-1", "status": "COMPLETED"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_get_payment_provider_compatibility(self):
+        """Test that the old factory returns the shared instance."""
+        self.assertIs(get_payment_provider("stub"), providers.get("stub"))
+        self.assertIsNot(get_payment_provider("stub", {"flag": 1}), providers.get("stub"))
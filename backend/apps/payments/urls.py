@@ -3,4 +3,5 @@ from .views import WebhookView
 
 urlpatterns = [
     path('webhook/', WebhookView.as_view(), name='payment-webhook'),
+    path('webhook/<slug:provider_name>/', WebhookView.as_view(), name='payment-provider-webhook'),
 ]
@@ -3,10 +3,9 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from django.db import transaction
-from .models import PaymentTransaction
-from apps.orders.models import Order
-from .providers.stub import get_payment_provider
+from . import webhooks
+from .providers.registry import UnknownProviderError, providers
+from .tasks import process_webhook_events
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,25 +15,33 @@ logger = logging.getLogger(__name__)
 class WebhookView(APIView):
     """
     Webhook endpoint for payment provider callbacks.
-    Validates webhook signature and updates payment status.
+    Validates the webhook signature and stores the event; payment and
+    order updates are applied by Celery workers (see apps.payments.webhooks).
     """
     authentication_classes = []
     permission_classes = []
 
-    def post(self, request):
+    def post(self, request, provider_name=None):
         """
-        Handle payment provider webhook.
+        Handle payment provider webhook (for `provider_name`, or the
+        default provider on the bare webhook URL).
         1. Verify webhook signature
-        2. Parse payment update
-        3. Update PaymentTransaction status
-        4. Update Order status
+        2. Store the event (one insert; redeliveries are ignored)
+        3. Queue the event processor
+
+        Returns 200 as soon as the event is stored.
         """
         # Get request body as bytes for signature verification
         body = request.body
         headers = {key: value for key, value in request.META.items() if key.startswith('HTTP_')}
 
-        # Get payment provider (stub for now)
-        provider = get_payment_provider('stub')
+        try:
+            provider = providers.get(provider_name)
+        except UnknownProviderError:
+            return Response(
+                {'success': False, 'error': 'Unknown provider'},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
         # Verify webhook signature
         verification = provider.verify_webhook(headers, body)
@@ -46,42 +53,25 @@ class WebhookView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Find payment transaction
-        try:
-            payment = PaymentTransaction.objects.select_for_update().get(
-                provider_transaction_id=verification.provider_transaction_id
-            )
-        except PaymentTransaction.DoesNotExist:
-            logger.error(f"Payment transaction not found: {verification.provider_transaction_id}")
+        if not (verification.event_id and verification.provider_transaction_id):
             return Response(
-                {'success': False, 'error': 'Transaction not found'},
-                status=status.HTTP_404_NOT_FOUND
+                {'success': False, 'error': 'Missing event or transaction ID'},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Update payment status in transaction
-        with transaction.atomic():
-            # Update payment transaction
-            old_status = payment.status
-            payment.status = verification.new_status
-            if verification.paid_at:
-                payment.paid_at = verification.paid_at
-            payment.save()
-
-            # Update order status if payment completed
-            if verification.new_status == 'COMPLETED' and old_status != 'COMPLETED':
-                order = payment.order
-                order.status = Order.Status.CONFIRMED
-                order.save()
-
-                logger.info(
-                    f"Payment confirmed for order {order.order_number}, "
-                    f"transaction {payment.provider_transaction_id}"
-                )
+        created = webhooks.store_event(provider.PROVIDER_NAME, verification, body)
+        if created:
+            try:
+                process_webhook_events.delay()
+            except Exception as e:
+                # Celery Beat picks the event up anyway
+                logger.warning(f"Could not queue webhook processing: {str(e)}")
 
         return Response(
             {
                 'success': True,
-                'message': 'Webhook processed successfully',
+                'message': 'Webhook received' if created else 'Webhook already received',
+                'event_id': verification.event_id,
                 'transaction_id': verification.provider_transaction_id,
                 'status': verification.new_status
             },
@@ -0,0 +1,180 @@
+"""
+Webhook ingestion.
+
+The webhook endpoint only verifies the signature and stores the event
+(`store_event`, a single INSERT ... ON CONFLICT DO NOTHING keyed by the
+provider event id, so redeliveries are dropped). Workers then apply stored
+events in batches (`process_pending`):
+
+- the oldest PENDING events are claimed with SELECT ... FOR UPDATE SKIP
+  LOCKED, so several workers can drain the queue concurrently;
+- events are applied per payment transaction (matched by provider and
+  provider transaction id) in the order they were received; a transaction
+  with older events still pending elsewhere is left for a later batch;
+- updates that would move a payment backwards (see
+  PaymentTransaction.TRANSITIONS) are ignored, and only PENDING orders are
+  confirmed: a capture reported after the order was cancelled flags the
+  payment for review and queues its refund;
+- events for transactions that do not exist yet (the webhook can beat the
+  provider response) are retried with a growing delay, up to
+  WEBHOOK_MAX_ATTEMPTS times.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from apps.core.db import insert_ignore
+from apps.orders.models import Order
+from .models import PaymentTransaction, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+
+def store_event(provider, verification, body):
+    """
+    Persist a verified webhook in one statement.
+
+    Returns:
+        True if the event was new, False for a redelivery
+    """
+    return insert_ignore(
+        WebhookEvent(
+            provider=provider,
+            event_id=verification.event_id,
+            provider_transaction_id=verification.provider_transaction_id,
+            new_status=verification.new_status,
+            paid_at=verification.paid_at,
+            body=body.decode('utf-8', errors='replace'),
+        ),
+        conflict_fields=['provider', 'event_id']
+    )
+
+
+def process_pending(batch_size=None):
+    """
+    Apply a batch of pending webhook events.
+
+    Returns:
+        Number of events claimed (processed, failed or deferred)
+    """
+    batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+    now = timezone.now()
+
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True).filter(
+                status=WebhookEvent.Status.PENDING,
+                available_at__lte=now
+            ).order_by('created_at')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        # Keyed by (provider, provider_transaction_id)
+        events_by_transaction = defaultdict(list)
+        for event in events:
+            events_by_transaction[(event.provider, event.provider_transaction_id)].append(event)
+        transaction_ids = {transaction_id for _, transaction_id in events_by_transaction}
+
+        # Transactions with an older event claimed by another worker wait
+        blocked = set(
+            WebhookEvent.objects.filter(
+                status=WebhookEvent.Status.PENDING,
+                provider_transaction_id__in=transaction_ids,
+                created_at__lt=max(event.created_at for event in events)
+            ).exclude(
+                id__in=[event.id for event in events]
+            ).values_list('provider', 'provider_transaction_id')
+        )
+
+        payments = {
+            (payment.provider, payment.provider_transaction_id): payment
+            for payment in PaymentTransaction.objects.select_for_update().filter(
+                provider_transaction_id__in={
+                    transaction_id for provider, transaction_id in events_by_transaction
+                    if (provider, transaction_id) not in blocked
+                }
+            ).order_by('id')
+        }
+
+        handled = []
+        for key, transaction_events in events_by_transaction.items():
+            if key in blocked:
+                continue
+            transaction_id = key[1]
+
+            payment = payments.get(key)
+            if payment is None:
+                for event in transaction_events:
+                    event.attempts += 1
+                    event.error = "Transaction not found"
+                    event.available_at = now + timedelta(seconds=settings.WEBHOOK_RETRY_SECONDS * event.attempts)
+                    if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                        event.status = WebhookEvent.Status.FAILED
+                        logger.error(f"Payment transaction not found: {transaction_id}")
+                handled += transaction_events
+                continue
+
+            _apply(payment, transaction_events)
+            for event in transaction_events:
+                event.attempts += 1
+                event.status = WebhookEvent.Status.PROCESSED
+                event.processed_at = now
+            handled += transaction_events
+
+        for event in handled:
+            event.updated_at = now
+        WebhookEvent.objects.bulk_update(
+            handled,
+            ['status', 'attempts', 'available_at', 'error', 'processed_at', 'updated_at']
+        )
+
+    return len(events)
+
+
+def _apply(payment, events):
+    """
+    Apply a transaction's events in order, then save once.
+
+    Events that would move the payment backwards are skipped (their error
+    says why). On completion the order is confirmed only if it is still
+    PENDING; otherwise the capture is flagged and refunded.
+    """
+    old_status = payment.status
+    for event in events:
+        event.error = ''
+        if event.new_status == payment.status:
+            continue
+        if not PaymentTransaction.can_transition(payment.status, event.new_status):
+            event.error = f"Ignored transition {payment.status} -> {event.new_status}"
+            logger.warning(
+                f"Ignored webhook {event.event_id} for {payment.provider_transaction_id}: "
+                f"{payment.status} -> {event.new_status}"
+            )
+            continue
+        payment.status = event.new_status
+        if event.paid_at:
+            payment.paid_at = event.paid_at
+
+    if payment.status == PaymentTransaction.Status.COMPLETED and old_status != payment.status:
+        order = Order.objects.select_for_update().get(id=payment.order_id)
+        if order.status == Order.Status.PENDING:
+            order.set_status(Order.Status.CONFIRMED)
+            logger.info(
+                f"Payment confirmed for order {order.order_number}, "
+                f"transaction {payment.provider_transaction_id}"
+            )
+        else:
+            from .tasks import refund_late_payment
+
+            payment.needs_review = True
+            transaction.on_commit(lambda: refund_late_payment.delay(str(payment.id)))
+            logger.error(
+                f"Payment {payment.provider_transaction_id} captured for {order.status} "
+                f"order {order.order_number}; refund queued"
+            )
+
+    payment.save(update_fields=['status', 'paid_at', 'needs_review', 'updated_at'])
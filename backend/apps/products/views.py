@@ -1,7 +1,9 @@
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db.models import Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
+from apps.inventory.models import Inventory
 from .models import Product, SKU
 from .serializers import ProductListSerializer, ProductDetailSerializer, SKUSerializer
 
@@ -11,7 +13,10 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     API endpoint for products.
     List and retrieve operations only (read-only for public API).
     """
-    queryset = Product.objects.filter(is_active=True).prefetch_related('skus', 'skus__inventory')
+    queryset = Product.objects.filter(is_active=True).prefetch_related(
+        'skus',
+        Prefetch('skus__inventory', queryset=Inventory.objects.with_lapsed_reservations()),
+    )
     lookup_field = 'slug'
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['brand', 'set_name', 'rarity']
@@ -29,7 +34,9 @@ class SKUViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for SKUs.
     """
-    queryset = SKU.objects.filter(is_active=True).select_related('product', 'inventory')
+    queryset = SKU.objects.filter(is_active=True).select_related('product').prefetch_related(
+        Prefetch('inventory', queryset=Inventory.objects.with_lapsed_reservations()),
+    )
     serializer_class = SKUSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['product', 'condition', 'language', 'is_foil']
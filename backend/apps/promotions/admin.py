@@ -0,0 +1,30 @@
+from django.contrib import admin
+from .models import Promotion
+
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = [
+        'name',
+        'code',
+        'kind',
+        'percent_off',
+        'amount_off_cents',
+        'min_subtotal_cents',
+        'starts_at',
+        'ends_at',
+        'is_active'
+    ]
+    list_filter = ['kind', 'is_active']
+    search_fields = ['name', 'code', 'set_name']
+    fieldsets = (
+        (None, {
+            'fields': ('name', 'code', 'kind', 'is_active')
+        }),
+        ('Discount', {
+            'fields': ('percent_off', 'amount_off_cents', 'buy_quantity', 'get_quantity')
+        }),
+        ('Conditions', {
+            'fields': ('min_subtotal_cents', 'set_name', 'rarity', 'starts_at', 'ends_at')
+        }),
+    )
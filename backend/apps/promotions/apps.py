@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class PromotionsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.promotions'
+    verbose_name = 'Promotions'
+
+    def ready(self):
+        import apps.promotions.signals
@@ -0,0 +1,229 @@
+"""
+Promotion engine.
+
+Active promotions are compiled once into small evaluator objects held in
+process memory (see apps.core.process_cache). Evaluating a cart walks its
+lines once, feeding every line-level rule, then applies the cart-level
+rules to the subtotal; nothing is queried per line or per rule.
+
+Every applicable rule is computed on the undiscounted lines and the
+discounts are added up, capped at the subtotal.
+
+Rows that fail Promotion.clean() (saved by scripts or the shell without
+validation) or have an unknown kind are skipped and logged when compiling,
+so one bad row cannot break every cart and checkout.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from apps.core.exceptions import InvalidCouponError
+from apps.core.process_cache import ProcessCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PromotionResult:
+    """
+    Discount computed for a cart.
+    """
+    subtotal_cents: int
+    discount_cents: int
+    applied: list = field(default_factory=list)
+
+    @property
+    def discount_brl(self):
+        """Discount in BRL."""
+        return self.discount_cents / 100
+
+
+class Rule:
+    """
+    Compiled promotion. Subclasses implement `line_discount` (evaluated
+    for every cart line) or `cart_discount` (evaluated on the subtotal).
+    """
+    per_line = False
+
+    def __init__(self, promotion):
+        self.name = promotion.name
+        self.min_subtotal_cents = promotion.min_subtotal_cents
+        self.starts_at = promotion.starts_at
+        self.ends_at = promotion.ends_at
+        self.set_name = promotion.set_name
+        self.rarity = promotion.rarity
+
+    def is_live(self, now):
+        return (
+            (self.starts_at is None or self.starts_at <= now)
+            and (self.ends_at is None or now < self.ends_at)
+        )
+
+    def matches(self, set_name, rarity):
+        """Whether a line is in the promotion's set/rarity scope."""
+        return (
+            (not self.set_name or set_name == self.set_name)
+            and (not self.rarity or rarity == self.rarity)
+        )
+
+    def line_discount(self, set_name, rarity, unit_price_cents, quantity):
+        return 0
+
+    def cart_discount(self, subtotal_cents):
+        return 0
+
+
+class PercentageOffCart(Rule):
+    def __init__(self, promotion):
+        super().__init__(promotion)
+        self.percent_off = promotion.percent_off
+
+    def cart_discount(self, subtotal_cents):
+        return subtotal_cents * self.percent_off // 100
+
+
+class AmountOffCart(Rule):
+    def __init__(self, promotion):
+        super().__init__(promotion)
+        self.amount_off_cents = promotion.amount_off_cents
+
+    def cart_discount(self, subtotal_cents):
+        return min(self.amount_off_cents, subtotal_cents)
+
+
+class PercentageOffLines(Rule):
+    per_line = True
+
+    def __init__(self, promotion):
+        super().__init__(promotion)
+        self.percent_off = promotion.percent_off
+
+    def line_discount(self, set_name, rarity, unit_price_cents, quantity):
+        if not self.matches(set_name, rarity):
+            return 0
+        return unit_price_cents * quantity * self.percent_off // 100
+
+
+class BuyXGetY(Rule):
+    per_line = True
+
+    def __init__(self, promotion):
+        super().__init__(promotion)
+        self.buy_quantity = promotion.buy_quantity
+        self.get_quantity = promotion.get_quantity
+
+    def line_discount(self, set_name, rarity, unit_price_cents, quantity):
+        if not self.matches(set_name, rarity):
+            return 0
+        free_units = quantity // (self.buy_quantity + self.get_quantity) * self.get_quantity
+        return free_units * unit_price_cents
+
+
+RULES_BY_KIND = {
+    'PERCENTAGE': PercentageOffCart,
+    'FIXED': AmountOffCart,
+    'MIN_SUBTOTAL': AmountOffCart,
+    'SET': PercentageOffLines,
+    'RARITY': PercentageOffLines,
+    'BUY_X_GET_Y': BuyXGetY,
+}
+
+
+@dataclass
+class CompiledPromotions:
+    automatic: list
+    coupons: dict
+
+
+def _compile_rules():
+    """Compile active, valid promotions (one query)."""
+    from .models import Promotion
+
+    automatic, coupons = [], {}
+    for promotion in Promotion.objects.filter(is_active=True):
+        rule_class = RULES_BY_KIND.get(promotion.kind)
+        try:
+            if rule_class is None:
+                raise ValidationError(f"Unknown kind {promotion.kind}")
+            promotion.clean()
+        except ValidationError as e:
+            logger.error(f"Skipping invalid promotion {promotion.id} ({promotion.name}): {'; '.join(e.messages)}")
+            continue
+
+        rule = rule_class(promotion)
+        if promotion.code:
+            coupons[promotion.code] = rule
+        else:
+            automatic.append(rule)
+
+    return CompiledPromotions(automatic=automatic, coupons=coupons)
+
+
+promotion_rules = ProcessCache('promotion_rules', _compile_rules)
+
+
+def normalize_code(code):
+    return (code or '').strip().upper()
+
+
+def find_coupon(code, now=None):
+    """
+    Compiled rule for a coupon code.
+
+    Raises:
+        InvalidCouponError: If the code is unknown, inactive or expired
+    """
+    rule = promotion_rules.get().coupons.get(normalize_code(code))
+    if rule is None or not rule.is_live(now or timezone.now()):
+        raise InvalidCouponError(f"Invalid coupon code: {code}")
+    return rule
+
+
+def evaluate(cart_items, coupon_code=None, now=None):
+    """
+    Compute the discount for a cart in a single pass over its lines.
+
+    Args:
+        cart_items: Cart lines with `sku__product` already loaded
+        coupon_code: Optional coupon entered by the customer
+        now: Evaluation time (defaults to now)
+
+    Returns:
+        PromotionResult
+
+    Raises:
+        InvalidCouponError: If the coupon code is not valid
+    """
+    now = now or timezone.now()
+    rules = [rule for rule in promotion_rules.get().automatic if rule.is_live(now)]
+    if coupon_code:
+        rules.append(find_coupon(coupon_code, now))
+
+    line_rules = [rule for rule in rules if rule.per_line]
+    line_totals = dict.fromkeys(line_rules, 0)
+
+    subtotal_cents = 0
+    for item in cart_items:
+        product = item.sku.product
+        subtotal_cents += item.unit_price_cents * item.quantity
+        for rule in line_rules:
+            line_totals[rule] += rule.line_discount(
+                product.set_name, product.rarity, item.unit_price_cents, item.quantity
+            )
+
+    discount_cents = 0
+    applied = []
+    for rule in rules:
+        if subtotal_cents < rule.min_subtotal_cents:
+            continue
+        amount = line_totals[rule] if rule.per_line else rule.cart_discount(subtotal_cents)
+        if amount > 0:
+            discount_cents += amount
+            applied.append(rule.name)
+
+    return PromotionResult(
+        subtotal_cents=subtotal_cents,
+        discount_cents=min(discount_cents, subtotal_cents),
+        applied=applied,
+    )
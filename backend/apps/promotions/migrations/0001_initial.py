@@ -0,0 +1,115 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:44
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Promotion",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("name", models.CharField(max_length=100)),
+                (
+                    "code",
+                    models.CharField(
+                        blank=True,
+                        help_text="Coupon code (case-insensitive); leave blank to apply automatically",
+                        max_length=50,
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("PERCENTAGE", "Percentage off the cart"),
+                            ("FIXED", "Fixed amount off the cart"),
+                            ("BUY_X_GET_Y", "Buy X get Y free"),
+                            ("SET", "Percentage off a set"),
+                            ("RARITY", "Percentage off a rarity"),
+                            ("MIN_SUBTOTAL", "Fixed amount off above a subtotal"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "percent_off",
+                    models.PositiveSmallIntegerField(
+                        default=0, help_text="Percentage off (0-100)"
+                    ),
+                ),
+                (
+                    "amount_off_cents",
+                    models.IntegerField(default=0, help_text="Amount off in BRL cents"),
+                ),
+                (
+                    "buy_quantity",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Units to buy (buy X get Y)"
+                    ),
+                ),
+                (
+                    "get_quantity",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Free units (buy X get Y)"
+                    ),
+                ),
+                (
+                    "min_subtotal_cents",
+                    models.IntegerField(
+                        default=0, help_text="Cart subtotal (in cents) required"
+                    ),
+                ),
+                (
+                    "set_name",
+                    models.CharField(
+                        blank=True, help_text="Only lines of this set", max_length=200
+                    ),
+                ),
+                (
+                    "rarity",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("COMMON", "Common"),
+                            ("UNCOMMON", "Uncommon"),
+                            ("RARE", "Rare"),
+                            ("MYTHIC", "Mythic Rare"),
+                            ("SPECIAL", "Special"),
+                        ],
+                        help_text="Only lines of this rarity",
+                        max_length=20,
+                    ),
+                ),
+                ("starts_at", models.DateTimeField(blank=True, null=True)),
+                ("ends_at", models.DateTimeField(blank=True, null=True)),
+                ("is_active", models.BooleanField(db_index=True, default=True)),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="promotion",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("code", ""), _negated=True),
+                fields=("code",),
+                name="unique_promotion_code",
+            ),
+        ),
+    ]
@@ -0,0 +1,83 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import Q
+from apps.core.models import TimeStampedModel
+from apps.products.models import Product
+
+
+class Promotion(TimeStampedModel):
+    """
+    Discount rule. Promotions without a code apply automatically to every
+    cart; coupon promotions apply only when their code is entered at checkout.
+    """
+    class Kind(models.TextChoices):
+        PERCENTAGE = 'PERCENTAGE', 'Percentage off the cart'
+        FIXED = 'FIXED', 'Fixed amount off the cart'
+        BUY_X_GET_Y = 'BUY_X_GET_Y', 'Buy X get Y free'
+        SET = 'SET', 'Percentage off a set'
+        RARITY = 'RARITY', 'Percentage off a rarity'
+        MIN_SUBTOTAL = 'MIN_SUBTOTAL', 'Fixed amount off above a subtotal'
+
+    name = models.CharField(max_length=100)
+    code = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text="Coupon code (case-insensitive); leave blank to apply automatically"
+    )
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+
+    # Discount
+    percent_off = models.PositiveSmallIntegerField(default=0, help_text="Percentage off (0-100)")
+    amount_off_cents = models.IntegerField(default=0, help_text="Amount off in BRL cents")
+    buy_quantity = models.PositiveIntegerField(default=0, help_text="Units to buy (buy X get Y)")
+    get_quantity = models.PositiveIntegerField(default=0, help_text="Free units (buy X get Y)")
+
+    # Conditions
+    min_subtotal_cents = models.IntegerField(default=0, help_text="Cart subtotal (in cents) required")
+    set_name = models.CharField(max_length=200, blank=True, help_text="Only lines of this set")
+    rarity = models.CharField(
+        max_length=20,
+        choices=Product.Rarity.choices,
+        blank=True,
+        help_text="Only lines of this rarity"
+    )
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+
+    is_active = models.BooleanField(default=True, db_index=True)
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['code'], condition=~Q(code=''), name='unique_promotion_code'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.code})" if self.code else self.name
+
+    def save(self, *args, **kwargs):
+        self.code = self.code.strip().upper()
+        super().save(*args, **kwargs)
+
+    def clean(self):
+        if self.kind in (self.Kind.PERCENTAGE, self.Kind.SET, self.Kind.RARITY):
+            if not 0 < self.percent_off <= 100:
+                raise ValidationError({'percent_off': "Must be between 1 and 100"})
+
+        if self.kind in (self.Kind.FIXED, self.Kind.MIN_SUBTOTAL) and self.amount_off_cents <= 0:
+            raise ValidationError({'amount_off_cents': "Must be positive"})
+
+        if self.kind == self.Kind.MIN_SUBTOTAL and self.min_subtotal_cents <= 0:
+            raise ValidationError({'min_subtotal_cents': "Must be positive"})
+
+        if self.kind == self.Kind.BUY_X_GET_Y and not (self.buy_quantity and self.get_quantity):
+            raise ValidationError("Buy and get quantities are required")
+
+        if self.kind == self.Kind.SET and not self.set_name:
+            raise ValidationError({'set_name': "Required for set promotions"})
+
+        if self.kind == self.Kind.RARITY and not self.rarity:
+            raise ValidationError({'rarity': "Required for rarity promotions"})
+
+        if self.starts_at and self.ends_at and self.starts_at >= self.ends_at:
+            raise ValidationError("starts_at must be before ends_at")
@@ -0,0 +1,7 @@
+from django.db.models.signals import post_delete, post_save
+from .engine import promotion_rules
+from .models import Promotion
+
+# Recompile the in-memory rules when a promotion changes
+post_save.connect(promotion_rules.invalidate_on_commit, sender=Promotion, dispatch_uid='promotion_rules_save')
+post_delete.connect(promotion_rules.invalidate_on_commit, sender=Promotion, dispatch_uid='promotion_rules_delete')
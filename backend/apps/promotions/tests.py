@@ -0,0 +1,128 @@
+"""
+Tests for the promotion engine.
+"""
+
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.products.models import Product, SKU
+from apps.inventory.models import Inventory
+from apps.cart.models import Cart, CartItem
+from apps.core.exceptions import InvalidCouponError
+from apps.promotions import engine
+from apps.promotions.models import Promotion
+
+
+class PromotionEngineTestCase(TestCase):
+    """Test compiled promotion rules."""
+
+    def setUp(self):
+        """Create a cart with a rare and a common line."""
+        rare = Product.objects.create(name="Rare Card", set_name="Alpha", rarity=Product.Rarity.RARE)
+        common = Product.objects.create(name="Common Card", set_name="Beta", rarity=Product.Rarity.COMMON)
+        self.rare_sku = SKU.objects.create(product=rare, price_cents=1000, sku_code="RARE-1")
+        self.common_sku = SKU.objects.create(product=common, price_cents=200, sku_code="COMMON-1")
+        Inventory.objects.filter(sku__in=[self.rare_sku, self.common_sku]).update(quantity_on_hand=20)
+
+        self.cart = Cart.objects.create(session_id="promo-session")
+        CartItem.objects.add(self.cart, self.rare_sku, 2)
+        CartItem.objects.add(self.cart, self.common_sku, 5)
+        # Subtotal: 2 x 1000 + 5 x 200 = 3000
+
+    def evaluate(self, coupon_code=None, now=None):
+        engine.promotion_rules.invalidate()
+        return engine.evaluate(self.cart.items.select_related('sku__product'), coupon_code, now)
+
+    def test_each_kind(self):
+        """Test the discount computed by every promotion kind."""
+        cases = [
+            (dict(kind=Promotion.Kind.PERCENTAGE, percent_off=10), 300),
+            (dict(kind=Promotion.Kind.FIXED, amount_off_cents=500), 500),
+            (dict(kind=Promotion.Kind.SET, percent_off=50, set_name="Alpha"), 1000),
+            (dict(kind=Promotion.Kind.RARITY, percent_off=25, rarity=Product.Rarity.COMMON), 250),
+            (dict(kind=Promotion.Kind.BUY_X_GET_Y, buy_quantity=2, get_quantity=1), 200),
+            (dict(kind=Promotion.Kind.MIN_SUBTOTAL, amount_off_cents=700, min_subtotal_cents=3000), 700),
+        ]
+
+        for fields, expected in cases:
+            with self.subTest(kind=fields['kind']):
+                promotion = Promotion.objects.create(name=fields['kind'], **fields)
+                promotion.full_clean()
+
+                result = self.evaluate()
+
+                self.assertEqual(result.subtotal_cents, 3000)
+                self.assertEqual(result.discount_cents, expected)
+                self.assertEqual(result.applied, [fields['kind']])
+                promotion.delete()
+
+    def test_conditions(self):
+        """Test minimum subtotal, time windows and the subtotal cap."""
+        Promotion.objects.create(
+            name="Big spender", kind=Promotion.Kind.MIN_SUBTOTAL, amount_off_cents=500, min_subtotal_cents=5000
+        )
+        Promotion.objects.create(
+            name="Next week", kind=Promotion.Kind.PERCENTAGE, percent_off=50,
+            starts_at=timezone.now() + timedelta(days=7)
+        )
+        self.assertEqual(self.evaluate().discount_cents, 0)
+
+        Promotion.objects.create(name="Everything", kind=Promotion.Kind.FIXED, amount_off_cents=2500)
+        Promotion.objects.create(name="Half off", kind=Promotion.Kind.PERCENTAGE, percent_off=50)
+        result = self.evaluate()
+        self.assertEqual(result.discount_cents, 3000)
+        self.assertCountEqual(result.applied, ["Everything", "Half off"])
+
+    def test_invalid_rows_are_skipped(self):
+        """Test that rows saved without validation do not break evaluation."""
+        Promotion.objects.create(name="Broken bogo", kind=Promotion.Kind.BUY_X_GET_Y, buy_quantity=0, get_quantity=0)
+        Promotion.objects.create(name="Retired kind", kind="BUNDLE", percent_off=10)
+        Promotion.objects.create(name="Too generous", kind=Promotion.Kind.PERCENTAGE, percent_off=150)
+        Promotion.objects.create(name="Half off", kind=Promotion.Kind.PERCENTAGE, percent_off=50)
+
+        with self.assertLogs('apps.promotions.engine', level='ERROR') as logs:
+            result = self.evaluate()
+
+        self.assertEqual(result.discount_cents, 1500)
+        self.assertEqual(result.applied, ["Half off"])
+        self.assertEqual(len(logs.records), 3)
+
+    def test_coupons(self):
+        """Test that coupons only apply with their (case-insensitive) code."""
+        Promotion.objects.create(name="Drop day", code="drop10", kind=Promotion.Kind.PERCENTAGE, percent_off=10)
+
+        self.assertEqual(self.evaluate().discount_cents, 0)
+        self.assertEqual(self.evaluate(" Drop10 ").discount_cents, 300)
+
+        with self.assertRaises(InvalidCouponError):
+            self.evaluate("NOPE")
+
+        Promotion.objects.filter(code="DROP10").update(ends_at=timezone.now())
+        with self.assertRaises(InvalidCouponError):
+            self.evaluate("DROP10")
+
+    def test_evaluation_makes_no_queries(self):
+        """Test that a loaded cart is evaluated without queries."""
+        Promotion.objects.create(name="Rares", kind=Promotion.Kind.RARITY, percent_off=10, rarity=Product.Rarity.RARE)
+        Promotion.objects.create(name="3 for 2", kind=Promotion.Kind.BUY_X_GET_Y, buy_quantity=2, get_quantity=1)
+        engine.promotion_rules.invalidate()
+        engine.promotion_rules.get()
+        lines = list(self.cart.items.select_related('sku__product'))
+
+        with self.assertNumQueries(0):
+            result = engine.evaluate(lines * 50)
+
+        self.assertEqual(result.discount_cents, 50 * (200 + 200))
+
+    def test_cart_shows_automatic_discount(self):
+        """Test that the cart endpoint reports automatic promotions."""
+        Promotion.objects.create(name="Alpha week", kind=Promotion.Kind.SET, percent_off=10, set_name="Alpha")
+        engine.promotion_rules.invalidate()
+
+        response = APIClient().get("/api/v1/cart/", HTTP_X_SESSION_ID="promo-session")
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(data["discount_cents"], 200)
+        self.assertEqual(data["applied_promotions"], ["Alpha week"])
@@ -0,0 +1,27 @@
+from django.contrib import admin
+from .models import SalesRollup
+
+
+@admin.register(SalesRollup)
+class SalesRollupAdmin(admin.ModelAdmin):
+    list_display = [
+        'bucket',
+        'granularity',
+        'dimension',
+        'value',
+        'revenue_display',
+        'units',
+        'orders'
+    ]
+    list_filter = ['granularity', 'dimension', 'bucket']
+    search_fields = ['value']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def revenue_display(self, obj):
+        return f"R$ {obj.revenue_brl:.2f}"
+    revenue_display.short_description = 'Revenue'
@@ -0,0 +1,24 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from apps.reports import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute sales rollups from orders (all, or from a given day on)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help="Only rebuild buckets from this day on (YYYY-MM-DD)"
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+
+        count = rollups.rebuild(since=since)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} sales rollup rows"))
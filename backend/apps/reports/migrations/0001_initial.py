@@ -0,0 +1,83 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:37
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="SalesRollup",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("HOUR", "Hourly"), ("DAY", "Daily")], max_length=4
+                    ),
+                ),
+                (
+                    "bucket",
+                    models.DateTimeField(
+                        help_text="Start of the hour or day (local time)"
+                    ),
+                ),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("TOTAL", "Total"),
+                            ("SKU", "SKU"),
+                            ("PRODUCT", "Product"),
+                            ("SET", "Set"),
+                            ("BRAND", "Brand"),
+                            ("PAYMENT_METHOD", "Payment method"),
+                            ("STATE", "Shipping state"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "value",
+                    models.CharField(
+                        blank=True,
+                        help_text="Dimension value (SKU/product id, set name, brand, method or state)",
+                        max_length=255,
+                    ),
+                ),
+                ("revenue_cents", models.BigIntegerField(default=0)),
+                ("units", models.BigIntegerField(default=0)),
+                ("orders", models.IntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["-bucket"],
+                "indexes": [
+                    models.Index(
+                        fields=["granularity", "dimension", "bucket"],
+                        name="reports_sal_granula_bce071_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="salesrollup",
+            constraint=models.UniqueConstraint(
+                fields=("granularity", "bucket", "dimension", "value"),
+                name="unique_sales_rollup",
+            ),
+        ),
+    ]
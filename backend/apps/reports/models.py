@@ -0,0 +1,58 @@
+from django.db import models
+from apps.core.models import TimeStampedModel
+
+
+class SalesRollup(TimeStampedModel):
+    """
+    Pre-aggregated sales per time bucket and dimension value.
+
+    Maintained incrementally from order status transitions (see
+    apps.reports.rollups) so reports never aggregate order tables at query
+    time. Orders are bucketed by their creation time; SKU, product, set and
+    brand rows count line totals, the other dimensions count order totals.
+    """
+    class Granularity(models.TextChoices):
+        HOUR = 'HOUR', 'Hourly'
+        DAY = 'DAY', 'Daily'
+
+    class Dimension(models.TextChoices):
+        TOTAL = 'TOTAL', 'Total'
+        SKU = 'SKU', 'SKU'
+        PRODUCT = 'PRODUCT', 'Product'
+        SET = 'SET', 'Set'
+        BRAND = 'BRAND', 'Brand'
+        PAYMENT_METHOD = 'PAYMENT_METHOD', 'Payment method'
+        STATE = 'STATE', 'Shipping state'
+
+    granularity = models.CharField(max_length=4, choices=Granularity.choices)
+    bucket = models.DateTimeField(help_text="Start of the hour or day (local time)")
+    dimension = models.CharField(max_length=20, choices=Dimension.choices)
+    value = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Dimension value (SKU/product id, set name, brand, method or state)"
+    )
+
+    revenue_cents = models.BigIntegerField(default=0)
+    units = models.BigIntegerField(default=0)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-bucket']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'bucket', 'dimension', 'value'],
+                name='unique_sales_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'dimension', 'bucket']),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket:%Y-%m-%d %H:00} {self.dimension}={self.value}"
+
+    @property
+    def revenue_brl(self):
+        """Revenue in BRL."""
+        return self.revenue_cents / 100
@@ -0,0 +1,215 @@
+"""
+Sales rollup maintenance.
+
+An order counts as a sale while its status is in SALE_STATUSES. Each
+transition into or out of that set adds or subtracts the order's
+contribution to every hourly and daily bucket/dimension row with
+multi-row upserts in one transaction, run by a task after the status change commits (see
+apps.reports.signals). Rows are upserted in conflict key order so
+concurrent upserts lock them in the same order and cannot deadlock.
+`rebuild` recomputes the rows from the order tables.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time
+from django.db import transaction
+from django.utils import timezone
+from apps.core.db import upsert_many
+from apps.orders.models import Order, OrderItem
+from apps.payments.models import PaymentTransaction
+from .models import SalesRollup
+
+SALE_STATUSES = {
+    Order.Status.CONFIRMED,
+    Order.Status.PROCESSING,
+    Order.Status.SHIPPED,
+    Order.Status.DELIVERED,
+}
+
+ITEM_FIELDS = (
+    'order_id',
+    'sku_id',
+    'sku__product_id',
+    'sku__product__set_name',
+    'sku__product__brand',
+    'quantity',
+    'line_total_cents',
+)
+
+INCREMENT = {
+    field: f'{{table}}."{field}" + EXCLUDED."{field}"'
+    for field in ('revenue_cents', 'units', 'orders')
+}
+INCREMENT['updated_at'] = 'EXCLUDED."updated_at"'
+
+
+def status_delta(old_status, new_status):
+    """+1 when an order becomes a sale, -1 when it stops being one, else 0."""
+    return int(new_status in SALE_STATUSES) - int(old_status in SALE_STATUSES)
+
+
+def buckets(created_at):
+    """Hour and day buckets (local time) an order falls into."""
+    hour = timezone.localtime(created_at).replace(minute=0, second=0, microsecond=0)
+    return [
+        (SalesRollup.Granularity.HOUR, hour),
+        (SalesRollup.Granularity.DAY, hour.replace(hour=0)),
+    ]
+
+
+def contributions(total_cents, shipping_state, payment_method, items):
+    """
+    Per-dimension (revenue_cents, units, orders) of one order.
+
+    Args:
+        items: Rows of ITEM_FIELDS for the order's lines
+
+    Returns:
+        Dict of (dimension, value) -> [revenue_cents, units, orders]
+    """
+    Dimension = SalesRollup.Dimension
+    totals = defaultdict(lambda: [0, 0, 0])
+
+    units = 0
+    for _, sku_id, product_id, set_name, brand, quantity, line_total_cents in items:
+        units += quantity
+        for key in (
+            (Dimension.SKU, str(sku_id)),
+            (Dimension.PRODUCT, str(product_id)),
+            (Dimension.SET, set_name),
+            (Dimension.BRAND, brand),
+        ):
+            totals[key][0] += line_total_cents
+            totals[key][1] += quantity
+
+    # Each order counts once per distinct value
+    for row in totals.values():
+        row[2] = 1
+
+    for key in (
+        (Dimension.TOTAL, ''),
+        (Dimension.PAYMENT_METHOD, payment_method or ''),
+        (Dimension.STATE, shipping_state),
+    ):
+        totals[key] = [total_cents, units, 1]
+
+    return totals
+
+
+def _payment_methods(order_ids):
+    """
+    Payment method per order: the completed payment's, otherwise the
+    latest attempt's.
+    """
+    methods = {}
+    for order_id, method, status in PaymentTransaction.objects.filter(
+        order_id__in=order_ids
+    ).order_by('created_at').values_list('order_id', 'method', 'status'):
+        if methods.get(order_id, (None, None))[1] != PaymentTransaction.Status.COMPLETED:
+            methods[order_id] = (method, status)
+    return {order_id: method for order_id, (method, _) in methods.items()}
+
+
+def apply_order(order, sign):
+    """
+    Add (sign=1) or subtract (sign=-1) an order's contribution to the
+    rollups. Large orders take several upsert batches; they run in one
+    transaction, so a deadlock in a later batch rolls back the earlier ones
+    and the task can safely retry.
+    """
+    items = OrderItem.objects.filter(order=order).values_list(*ITEM_FIELDS)
+    payment_method = _payment_methods([order.id]).get(order.id)
+
+    rows = [
+        SalesRollup(
+            granularity=granularity,
+            bucket=bucket,
+            dimension=dimension,
+            value=value,
+            revenue_cents=sign * revenue_cents,
+            units=sign * units,
+            orders=sign * orders,
+        )
+        for (dimension, value), (revenue_cents, units, orders) in contributions(
+            order.total_cents, order.shipping_state, payment_method, items
+        ).items()
+        for granularity, bucket in buckets(order.created_at)
+    ]
+    rows.sort(key=lambda row: (row.granularity, row.bucket, row.dimension, row.value))
+
+    with transaction.atomic():
+        upsert_many(
+            rows,
+            conflict_fields=['granularity', 'bucket', 'dimension', 'value'],
+            update_fields=INCREMENT
+        )
+
+
+def rebuild(since=None, chunk_size=2000):
+    """
+    Recompute the rollups from the order tables.
+
+    Args:
+        since: Optional date; only buckets from that day on are rebuilt
+
+    Returns:
+        Number of rollup rows written
+    """
+    orders = Order.objects.filter(status__in=SALE_STATUSES)
+    stale = SalesRollup.objects.all()
+
+    if since is not None:
+        start = timezone.make_aware(datetime.combine(since, time.min))
+        orders = orders.filter(created_at__gte=start)
+        stale = stale.filter(bucket__gte=start)
+
+    totals = defaultdict(lambda: [0, 0, 0])
+
+    def add_chunk(chunk):
+        order_ids = [order['id'] for order in chunk]
+        items = defaultdict(list)
+        for row in OrderItem.objects.filter(order_id__in=order_ids).values_list(*ITEM_FIELDS):
+            items[row[0]].append(row)
+        payment_methods = _payment_methods(order_ids)
+
+        for order in chunk:
+            order_totals = contributions(
+                order['total_cents'],
+                order['shipping_state'],
+                payment_methods.get(order['id']),
+                items[order['id']]
+            )
+            for granularity, bucket in buckets(order['created_at']):
+                for (dimension, value), row in order_totals.items():
+                    total = totals[(granularity, bucket, dimension, value)]
+                    for index in range(3):
+                        total[index] += row[index]
+
+    chunk = []
+    for order in orders.values('id', 'created_at', 'total_cents', 'shipping_state').iterator(chunk_size=chunk_size):
+        chunk.append(order)
+        if len(chunk) == chunk_size:
+            add_chunk(chunk)
+            chunk = []
+    if chunk:
+        add_chunk(chunk)
+
+    with transaction.atomic():
+        stale.delete()
+        SalesRollup.objects.bulk_create(
+            [
+                SalesRollup(
+                    granularity=granularity,
+                    bucket=bucket,
+                    dimension=dimension,
+                    value=value,
+                    revenue_cents=revenue_cents,
+                    units=units,
+                    orders=order_count,
+                )
+                for (granularity, bucket, dimension, value), (revenue_cents, units, order_count) in totals.items()
+            ],
+            batch_size=1000
+        )
+
+    return len(totals)
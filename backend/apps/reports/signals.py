@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.dispatch import receiver
+from apps.orders.signals import order_status_changed
+from . import rollups
+from .tasks import apply_order_rollups
+
+
+@receiver(order_status_changed)
+def update_sales_rollups(sender, order, old_status, new_status, **kwargs):
+    """
+    Add an order to the rollups when it becomes a sale, and take it out
+    again when it is cancelled or refunded. Applied by a task once the
+    status change commits.
+    """
+    sign = rollups.status_delta(old_status, new_status)
+    if sign:
+        order_id = str(order.id)
+        transaction.on_commit(lambda: apply_order_rollups.delay(order_id, sign))
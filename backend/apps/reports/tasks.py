@@ -0,0 +1,19 @@
+from celery import shared_task
+from django.db import OperationalError
+from apps.orders.models import Order
+from . import rollups
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(autoretry_for=(OperationalError,), retry_backoff=True, max_retries=5)
+def apply_order_rollups(order_id, sign):
+    """
+    Add (sign=1) or subtract (sign=-1) an order's contribution to the
+    sales rollups. Queued when an order's transaction commits, so
+    checkout never waits on the hot TOTAL rows; deadlocks are retried.
+    """
+    order = Order.objects.only('id', 'created_at', 'total_cents', 'shipping_state').get(id=order_id)
+    rollups.apply_order(order, sign)
+    logger.info(f"Applied order {order_id} to sales rollups ({sign:+d})")
@@ -0,0 +1,159 @@
+"""
+Tests for incrementally maintained sales rollups.
+"""
+
+import functools
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase
+from apps.core import db
+from apps.products.models import Product, SKU
+from apps.orders.models import Order, OrderItem
+from apps.payments.models import PaymentTransaction
+from apps.reports import rollups
+from apps.reports.models import SalesRollup
+from apps.reports.tasks import apply_order_rollups
+
+
+class SalesRollupTestCase(TestCase):
+    """Test rollups follow order status transitions."""
+
+    def setUp(self):
+        """Create a pending order with two lines and a payment."""
+        self.product = Product.objects.create(
+            name="Test Card",
+            brand="Test TCG",
+            set_name="Test Set",
+            rarity=Product.Rarity.RARE,
+        )
+        self.sku = SKU.objects.create(product=self.product, price_cents=1000)
+        self.foil = SKU.objects.create(product=self.product, price_cents=3000, is_foil=True)
+
+        self.order = Order.objects.create(
+            customer_email="buyer@example.com",
+            customer_name="Buyer",
+            customer_cpf="123.456.789-09",
+            customer_phone="11999999999",
+            shipping_street="Rua A",
+            shipping_number="10",
+            shipping_neighborhood="Centro",
+            shipping_city="Sao Paulo",
+            shipping_state="SP",
+            shipping_cep="01001-000",
+            subtotal_cents=5000,
+            total_cents=5000,
+        )
+        OrderItem.objects.create(order=self.order, sku=self.sku, quantity=2, unit_price_cents=1000)
+        OrderItem.objects.create(order=self.order, sku=self.foil, quantity=1, unit_price_cents=3000)
+        PaymentTransaction.objects.create(
+            order=self.order,
+            idempotency_key="rollup-test",
+            provider="stub",
+            method="PIX",
+            status=PaymentTransaction.Status.COMPLETED,
+            amount_cents=5000,
+        )
+
+    def _set_status(self, status):
+        """Change the order's status and run the queued rollup task."""
+        with mock.patch(
+            "apps.reports.signals.apply_order_rollups.delay", side_effect=apply_order_rollups
+        ), self.captureOnCommitCallbacks(execute=True):
+            self.order.set_status(status)
+
+    def _rollup(self, dimension, value, granularity=SalesRollup.Granularity.DAY):
+        return SalesRollup.objects.get(granularity=granularity, dimension=dimension, value=value)
+
+    def _snapshot(self):
+        return sorted(
+            SalesRollup.objects.values_list(
+                'granularity', 'bucket', 'dimension', 'value', 'revenue_cents', 'units', 'orders'
+            )
+        )
+
+    def test_pending_orders_are_not_counted(self):
+        """Test that only confirmed orders reach the rollups."""
+        self.assertFalse(SalesRollup.objects.exists())
+
+    def test_confirmation_adds_order_to_every_dimension(self):
+        """Test that confirming an order increments all dimensions."""
+        self._set_status(Order.Status.CONFIRMED)
+
+        total = self._rollup(SalesRollup.Dimension.TOTAL, '')
+        self.assertEqual((total.revenue_cents, total.units, total.orders), (5000, 3, 1))
+
+        sku = self._rollup(SalesRollup.Dimension.SKU, str(self.foil.id), SalesRollup.Granularity.HOUR)
+        self.assertEqual((sku.revenue_cents, sku.units, sku.orders), (3000, 1, 1))
+
+        product = self._rollup(SalesRollup.Dimension.PRODUCT, str(self.product.id))
+        self.assertEqual((product.revenue_cents, product.units, product.orders), (5000, 3, 1))
+
+        self.assertEqual(self._rollup(SalesRollup.Dimension.PAYMENT_METHOD, 'PIX').orders, 1)
+        self.assertEqual(self._rollup(SalesRollup.Dimension.STATE, 'SP').revenue_cents, 5000)
+
+        # Moving between sale statuses does not count the order twice
+        self._set_status(Order.Status.SHIPPED)
+        self.assertEqual(self._rollup(SalesRollup.Dimension.TOTAL, '').orders, 1)
+
+    def test_rollups_are_queued_on_commit(self):
+        """Test that the status change only queues the rollup task."""
+        with mock.patch("apps.reports.signals.apply_order_rollups.delay") as delay:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.order.set_status(Order.Status.CONFIRMED)
+            delay.assert_not_called()
+
+            for callback in callbacks:
+                callback()
+        delay.assert_called_once_with(str(self.order.id), 1)
+        self.assertFalse(SalesRollup.objects.exists())
+
+    def test_rows_are_upserted_in_key_order(self):
+        """Test that rows are sorted by conflict key to avoid deadlocks."""
+        with mock.patch("apps.reports.rollups.upsert_many") as upsert:
+            rollups.apply_order(self.order, 1)
+
+        keys = [(row.granularity, row.bucket, row.dimension, row.value) for row in upsert.call_args.args[0]]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_failed_batch_rolls_back_earlier_batches(self):
+        """Test that a deadlock in a later upsert batch leaves nothing applied, so a retry counts once."""
+        upsert_sql = db._upsert_sql
+        calls = []
+
+        def deadlock_on_second_batch(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise OperationalError("deadlock detected")
+            return upsert_sql(*args, **kwargs)
+
+        with mock.patch("apps.reports.rollups.upsert_many", functools.partial(db.upsert_many, batch_size=4)), \
+                mock.patch("apps.core.db._upsert_sql", side_effect=deadlock_on_second_batch):
+            with self.assertRaises(OperationalError):
+                rollups.apply_order(self.order, 1)
+
+        self.assertFalse(SalesRollup.objects.exists())
+
+        # The retry applies the order exactly once
+        rollups.apply_order(self.order, 1)
+        total = self._rollup(SalesRollup.Dimension.TOTAL, '')
+        self.assertEqual((total.revenue_cents, total.units, total.orders), (5000, 3, 1))
+
+    def test_refund_subtracts_order(self):
+        """Test that refunding a confirmed order takes it out again."""
+        self._set_status(Order.Status.CONFIRMED)
+        self._set_status(Order.Status.REFUNDED)
+
+        total = self._rollup(SalesRollup.Dimension.TOTAL, '')
+        self.assertEqual((total.revenue_cents, total.units, total.orders), (0, 0, 0))
+
+    def test_rebuild_matches_incremental_rollups(self):
+        """Test that the rebuild command reproduces the incremental rows."""
+        self._set_status(Order.Status.CONFIRMED)
+        incremental = self._snapshot()
+
+        SalesRollup.objects.update(revenue_cents=0)
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+
+        self.assertEqual(self._snapshot(), incremental)
@@ -0,0 +1,23 @@
+from django.contrib import admin
+from .models import ShippingRate, ShippingZone
+
+
+class ShippingRateInline(admin.TabularInline):
+    model = ShippingRate
+    extra = 0
+
+
+@admin.register(ShippingZone)
+class ShippingZoneAdmin(admin.ModelAdmin):
+    list_display = [
+        'name',
+        'cep_start',
+        'cep_end',
+        'delivery_days',
+        'ad_valorem_bps',
+        'free_shipping_min_cents',
+        'is_active'
+    ]
+    list_filter = ['is_active']
+    search_fields = ['name', 'cep_start', 'cep_end']
+    inlines = [ShippingRateInline]
@@ -0,0 +1,103 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:41
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ShippingZone",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("name", models.CharField(max_length=100)),
+                (
+                    "cep_start",
+                    models.CharField(
+                        help_text="First CEP of the range (8 digits)", max_length=8
+                    ),
+                ),
+                (
+                    "cep_end",
+                    models.CharField(
+                        help_text="Last CEP of the range (8 digits)", max_length=8
+                    ),
+                ),
+                (
+                    "delivery_days",
+                    models.PositiveIntegerField(
+                        help_text="Estimated business days to deliver"
+                    ),
+                ),
+                (
+                    "ad_valorem_bps",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Insurance charged on the goods value, in basis points (100 = 1%)",
+                    ),
+                ),
+                (
+                    "free_shipping_min_cents",
+                    models.IntegerField(
+                        blank=True,
+                        help_text="Goods value (in cents) from which shipping is free",
+                        null=True,
+                    ),
+                ),
+                ("is_active", models.BooleanField(db_index=True, default=True)),
+            ],
+            options={
+                "ordering": ["cep_start"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ShippingRate",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("max_weight_grams", models.PositiveIntegerField()),
+                ("price_cents", models.IntegerField(help_text="Price in BRL cents")),
+                (
+                    "zone",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rates",
+                        to="shipping.shippingzone",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["zone", "max_weight_grams"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="shippingrate",
+            constraint=models.UniqueConstraint(
+                fields=("zone", "max_weight_grams"), name="unique_zone_weight_bracket"
+            ),
+        ),
+    ]
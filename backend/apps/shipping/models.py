@@ -0,0 +1,73 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+from apps.core.models import TimeStampedModel
+
+
+class ShippingZone(TimeStampedModel):
+    """
+    Delivery zone covering a contiguous range of CEPs (8 digits, inclusive).
+    Ranges of active zones must not overlap.
+    """
+    name = models.CharField(max_length=100)
+    cep_start = models.CharField(max_length=8, help_text="First CEP of the range (8 digits)")
+    cep_end = models.CharField(max_length=8, help_text="Last CEP of the range (8 digits)")
+
+    delivery_days = models.PositiveIntegerField(help_text="Estimated business days to deliver")
+    ad_valorem_bps = models.PositiveIntegerField(
+        default=0,
+        help_text="Insurance charged on the goods value, in basis points (100 = 1%)"
+    )
+    free_shipping_min_cents = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text="Goods value (in cents) from which shipping is free"
+    )
+
+    is_active = models.BooleanField(default=True, db_index=True)
+
+    class Meta:
+        ordering = ['cep_start']
+
+    def __str__(self):
+        return f"{self.name} ({self.cep_start}-{self.cep_end})"
+
+    def clean(self):
+        for field in ('cep_start', 'cep_end'):
+            value = getattr(self, field)
+            if not (len(value) == 8 and value.isdigit()):
+                raise ValidationError({field: "CEP must have exactly 8 digits"})
+
+        if self.cep_start > self.cep_end:
+            raise ValidationError("cep_start must not be after cep_end")
+
+        overlapping = ShippingZone.objects.filter(
+            is_active=True,
+            cep_start__lte=self.cep_end,
+            cep_end__gte=self.cep_start
+        ).exclude(id=self.id)
+        if self.is_active and overlapping.exists():
+            raise ValidationError(f"CEP range overlaps zone {overlapping.first()}")
+
+
+class ShippingRate(TimeStampedModel):
+    """
+    Price for parcels up to a weight in a zone.
+    The cheapest bracket whose max weight fits the parcel applies.
+    """
+    zone = models.ForeignKey(
+        ShippingZone,
+        on_delete=models.CASCADE,
+        related_name='rates'
+    )
+
+    max_weight_grams = models.PositiveIntegerField()
+    price_cents = models.IntegerField(help_text="Price in BRL cents")
+
+    class Meta:
+        ordering = ['zone', 'max_weight_grams']
+        constraints = [
+            models.UniqueConstraint(fields=['zone', 'max_weight_grams'], name='unique_zone_weight_bracket'),
+        ]
+
+    def __str__(self):
+        return f"{self.zone.name} up to {self.max_weight_grams}g: R$ {self.price_cents / 100:.2f}"
@@ -0,0 +1,151 @@
+"""
+Shipping quote engine.
+
+Zones and their weight brackets are compiled into a sorted range index held
+in process memory (see apps.core.process_cache), so a quote is two binary
+searches and no queries:
+
+1. the CEP is located among the zones' sorted start CEPs (bisect);
+2. the parcel weight is located among the zone's weight brackets (bisect).
+
+Price = bracket price + ad valorem insurance on the goods value, or zero
+above the zone's free shipping threshold.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
+from dataclasses import dataclass
+from django.conf import settings
+from apps.core.process_cache import ProcessCache
+
+CompiledZone = namedtuple(
+    'CompiledZone',
+    ['name', 'delivery_days', 'ad_valorem_bps', 'free_shipping_min_cents', 'weights', 'prices']
+)
+
+
+@dataclass(frozen=True)
+class ShippingQuote:
+    """
+    Shipping price and delivery estimate for a parcel.
+    """
+    zone: str
+    price_cents: int
+    delivery_days: int
+    weight_grams: int
+
+    @property
+    def price_brl(self):
+        """Price in BRL."""
+        return self.price_cents / 100
+
+
+class ZoneIndex:
+    """
+    Non-overlapping CEP ranges sorted by start, searched with bisect.
+    """
+
+    def __init__(self, ranges):
+        """
+        Args:
+            ranges: Iterable of (cep_start, cep_end, CompiledZone) with
+                    CEPs as integers
+        """
+        ranges = sorted(ranges, key=lambda entry: entry[0])
+        self._starts = [start for start, _, _ in ranges]
+        self._ends = [end for _, end, _ in ranges]
+        self._zones = [zone for _, _, zone in ranges]
+
+    def __len__(self):
+        return len(self._zones)
+
+    def find(self, cep):
+        """Zone whose range contains the integer `cep`, or None."""
+        index = bisect_right(self._starts, cep) - 1
+        if index >= 0 and cep <= self._ends[index]:
+            return self._zones[index]
+        return None
+
+
+def _compile_rate_tables():
+    """Load active zones and their brackets into a ZoneIndex (two queries)."""
+    from .models import ShippingRate, ShippingZone
+
+    brackets = defaultdict(list)
+    for zone_id, max_weight_grams, price_cents in ShippingRate.objects.filter(
+        zone__is_active=True
+    ).order_by('max_weight_grams').values_list('zone_id', 'max_weight_grams', 'price_cents'):
+        brackets[zone_id].append((max_weight_grams, price_cents))
+
+    ranges = []
+    for zone in ShippingZone.objects.filter(is_active=True).values(
+        'id', 'name', 'cep_start', 'cep_end', 'delivery_days', 'ad_valorem_bps', 'free_shipping_min_cents'
+    ):
+        zone_brackets = brackets.get(zone['id'], [])
+        ranges.append((
+            int(zone['cep_start']),
+            int(zone['cep_end']),
+            CompiledZone(
+                name=zone['name'],
+                delivery_days=zone['delivery_days'],
+                ad_valorem_bps=zone['ad_valorem_bps'],
+                free_shipping_min_cents=zone['free_shipping_min_cents'],
+                weights=tuple(weight for weight, _ in zone_brackets),
+                prices=tuple(price for _, price in zone_brackets),
+            )
+        ))
+
+    return ZoneIndex(ranges)
+
+
+rate_tables = ProcessCache('shipping_rate_tables', _compile_rate_tables)
+
+
+def normalize_cep(cep):
+    """CEP as an integer, or None if it does not have 8 digits."""
+    digits = ''.join(char for char in str(cep or '') if char.isdigit())
+    return int(digits) if len(digits) == 8 else None
+
+
+def parcel_weight_grams(units):
+    """Estimated parcel weight for `units` cards, packaging included."""
+    return settings.SHIPPING_PACKAGE_WEIGHT_GRAMS + units * settings.SHIPPING_ITEM_WEIGHT_GRAMS
+
+
+def quote(cep, units, subtotal_cents):
+    """
+    Quote shipping for a parcel.
+
+    Args:
+        cep: Destination CEP, with or without the dash
+        units: Number of cards in the parcel
+        subtotal_cents: Goods value in cents
+
+    Returns:
+        ShippingQuote, or None if the CEP is invalid, not served, or the
+        parcel exceeds the zone's heaviest bracket
+    """
+    cep_value = normalize_cep(cep)
+    if cep_value is None:
+        return None
+
+    zone = rate_tables.get().find(cep_value)
+    if zone is None:
+        return None
+
+    weight = parcel_weight_grams(units)
+    bracket = bisect_left(zone.weights, weight)
+    if bracket == len(zone.weights):
+        return None
+
+    if zone.free_shipping_min_cents is not None and subtotal_cents >= zone.free_shipping_min_cents:
+        price_cents = 0
+    else:
+        price_cents = zone.prices[bracket] + subtotal_cents * zone.ad_valorem_bps // 10000
+
+    return ShippingQuote(
+        zone=zone.name,
+        price_cents=price_cents,
+        delivery_days=zone.delivery_days,
+        weight_grams=weight,
+    )
@@ -0,0 +1,8 @@
+from django.db.models.signals import post_delete, post_save
+from .models import ShippingRate, ShippingZone
+from .quotes import rate_tables
+
+# Rebuild the in-memory zone index when zones or rates change
+for model in (ShippingZone, ShippingRate):
+    post_save.connect(rate_tables.invalidate_on_commit, sender=model, dispatch_uid=f'shipping_tables_{model.__name__}_save')
+    post_delete.connect(rate_tables.invalidate_on_commit, sender=model, dispatch_uid=f'shipping_tables_{model.__name__}_delete')
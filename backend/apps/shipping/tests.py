@@ -0,0 +1,103 @@
+"""
+Tests for the shipping quote engine.
+"""
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+from apps.products.models import Product, SKU
+from apps.inventory.models import Inventory
+from apps.cart.models import Cart, CartItem
+from apps.shipping import quotes
+from apps.shipping.models import ShippingRate, ShippingZone
+
+
+class ShippingQuoteTestCase(TestCase):
+    """Test zone lookup and pricing."""
+
+    def setUp(self):
+        """Create two zones with weight brackets."""
+        capital = ShippingZone.objects.create(
+            name="SP Capital",
+            cep_start="01000000",
+            cep_end="05999999",
+            delivery_days=2,
+            ad_valorem_bps=100,
+            free_shipping_min_cents=50000,
+        )
+        ShippingRate.objects.create(zone=capital, max_weight_grams=300, price_cents=1200)
+        ShippingRate.objects.create(zone=capital, max_weight_grams=1000, price_cents=2000)
+
+        north = ShippingZone.objects.create(
+            name="Norte",
+            cep_start="66000000",
+            cep_end="69999999",
+            delivery_days=9,
+        )
+        ShippingRate.objects.create(zone=north, max_weight_grams=1000, price_cents=4500)
+
+        quotes.rate_tables.invalidate()
+        self.client = APIClient()
+
+    def test_zone_index_finds_ranges(self):
+        """Test that CEPs map to the zone whose range contains them."""
+        index = quotes.rate_tables.get()
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.find(1001000).name, "SP Capital")
+        self.assertEqual(index.find(5999999).name, "SP Capital")
+        self.assertEqual(index.find(69900000).name, "Norte")
+        self.assertIsNone(index.find(6000000))
+        self.assertIsNone(index.find(99999999))
+
+    def test_quote_prices_by_weight_and_value(self):
+        """Test bracket selection, ad valorem and free shipping."""
+        light = quotes.quote("01001-000", units=10, subtotal_cents=10000)
+        self.assertEqual(light.weight_grams, 150)
+        self.assertEqual(light.price_cents, 1200 + 100)
+
+        heavy = quotes.quote("01001000", units=100, subtotal_cents=10000)
+        self.assertEqual(heavy.price_cents, 2000 + 100)
+
+        self.assertEqual(quotes.quote("01001-000", units=10, subtotal_cents=50000).price_cents, 0)
+        self.assertIsNone(quotes.quote("01001-000", units=1000, subtotal_cents=10000))
+        self.assertIsNone(quotes.quote("0100", units=1, subtotal_cents=0))
+
+    def test_quotes_need_no_queries(self):
+        """Test that quotes are served from the compiled tables."""
+        quotes.rate_tables.get()
+
+        with self.assertNumQueries(0):
+            for _ in range(100):
+                quotes.quote("69900-000", units=3, subtotal_cents=3000)
+
+    def test_quote_endpoint_uses_session_cart(self):
+        """Test that the endpoint prices the session cart."""
+        product = Product.objects.create(name="Test Card", rarity=Product.Rarity.RARE)
+        sku = SKU.objects.create(product=product, price_cents=1000)
+        Inventory.objects.filter(sku=sku).update(quantity_on_hand=10)
+        cart = Cart.objects.create(session_id="quote-session")
+        CartItem.objects.add(cart, sku, 4)
+
+        response = self.client.get(
+            "/api/v1/shipping/quote/",
+            {"cep": "69900-000"},
+            HTTP_X_SESSION_ID="quote-session",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(data["zone"], "Norte")
+        self.assertEqual(data["price_cents"], 4500)
+        self.assertEqual(data["weight_grams"], 120)
+
+        response = self.client.get("/api/v1/shipping/quote/", {"cep": "99999-999"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_quote_endpoint_rejects_out_of_range_parameters(self):
+        """Test that negative units or subtotal cannot produce a negative price."""
+        for params in ({"units": "0"}, {"units": "-5"}, {"subtotal_cents": "-100000"}, {"units": "x"}):
+            response = self.client.get("/api/v1/shipping/quote/", {"cep": "69900-000", **params})
+            self.assertEqual(response.status_code, 400, params)
+
+        response = self.client.get("/api/v1/shipping/quote/", {"cep": "69900-000", "units": "2", "subtotal_cents": "0"})
+        self.assertEqual(response.status_code, 200)
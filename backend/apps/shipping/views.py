@@ -0,0 +1,71 @@
+from rest_framework import status
+from rest_framework.views import APIView
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from apps.core.exceptions import api_response
+from apps.cart.models import CartItem
+from . import quotes
+
+
+class ShippingQuoteView(APIView):
+    """
+    Quote shipping for a CEP.
+
+    GET /api/v1/shipping/quote/?cep=01001-000
+    Uses the session cart (X-Session-ID) for weight and value, or the
+    `units` and `subtotal_cents` query parameters when there is no cart.
+    """
+
+    def get(self, request):
+        cep = request.query_params.get('cep', '')
+        if quotes.normalize_cep(cep) is None:
+            return api_response(
+                data=None,
+                message="A valid 8-digit CEP is required",
+                success=False,
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        session_id = request.headers.get('X-Session-ID')
+        if session_id:
+            # Cart weight and value in one aggregate query
+            totals = CartItem.objects.filter(
+                cart__session_id=session_id,
+                cart__expires_at__gt=timezone.now()
+            ).aggregate(
+                units=Coalesce(Sum('quantity'), 0),
+                subtotal_cents=Coalesce(Sum(F('quantity') * F('unit_price_cents')), 0)
+            )
+            units, subtotal_cents = totals['units'], totals['subtotal_cents']
+        else:
+            try:
+                units = int(request.query_params.get('units', 1))
+                subtotal_cents = int(request.query_params.get('subtotal_cents', 0))
+                if units < 1 or subtotal_cents < 0:
+                    raise ValueError
+            except ValueError:
+                return api_response(
+                    data=None,
+                    message="units must be a positive integer and subtotal_cents a non-negative integer",
+                    success=False,
+                    status_code=status.HTTP_400_BAD_REQUEST
+                )
+
+        shipping_quote = quotes.quote(cep, units, subtotal_cents)
+        if shipping_quote is None:
+            return api_response(
+                data=None,
+                message="Shipping is not available for this CEP",
+                success=False,
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+
+        return api_response(data={
+            'cep': cep,
+            'zone': shipping_quote.zone,
+            'price_cents': shipping_quote.price_cents,
+            'price_brl': shipping_quote.price_brl,
+            'delivery_days': shipping_quote.delivery_days,
+            'weight_grams': shipping_quote.weight_grams,
+        })
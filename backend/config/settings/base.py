@@ -46,6 +46,9 @@ INSTALLED_APPS = [
     'apps.cart',
     'apps.orders',
     'apps.payments',
+    'apps.reports',
+    'apps.shipping',
+    'apps.promotions',
 ]
 
 MIDDLEWARE = [
@@ -159,21 +162,105 @@ CELERY_BEAT_SCHEDULE = {
     },
     'cleanup-expired-reservations': {
         'task': 'apps.cart.tasks.cleanup_expired_reservations',
-        'schedule': crontab(minute='*/10'),  # Every 10 minutes
+        'schedule': crontab(minute='*/30'),  # Every 30 minutes (safety net)
+    },
+    'release-due-reservations': {
+        'task': 'apps.cart.tasks.release_due_reservations',
+        'schedule': 30.0,  # Every 30 seconds
+    },
+    'process-webhook-events': {
+        'task': 'apps.payments.tasks.process_webhook_events',
+        'schedule': 10.0,  # Every 10 seconds (safety net)
+    },
+    'reconcile-payments': {
+        'task': 'apps.payments.tasks.reconcile_payments',
+        'schedule': crontab(minute='*/5'),  # Every 5 minutes
+    },
+    'expire-unpaid-payments': {
+        'task': 'apps.payments.tasks.expire_unpaid_payments',
+        'schedule': crontab(minute='*/5'),  # Every 5 minutes
+    },
+    'maintain-order-partitions': {
+        'task': 'apps.orders.tasks.maintain_partitions',
+        'schedule': crontab(minute='0', hour='3'),  # Daily at 3 AM
     },
 }
 
 # Redis
 REDIS_URL = env('REDIS_URL', default='redis://localhost:6379/0')
+REDIS_SOCKET_TIMEOUT_SECONDS = env.float('REDIS_SOCKET_TIMEOUT_SECONDS', default=0.5)
+
+# In-process caches of compiled tables (shipping rates, ...): how often to check for invalidations
+PROCESS_CACHE_CHECK_SECONDS = env.float('PROCESS_CACHE_CHECK_SECONDS', default=5.0)
+
+# Stored payment webhooks: batch size and retries for events whose transaction is not known yet
+WEBHOOK_BATCH_SIZE = env.int('WEBHOOK_BATCH_SIZE', default=200)
+WEBHOOK_MAX_ATTEMPTS = env.int('WEBHOOK_MAX_ATTEMPTS', default=5)
+WEBHOOK_RETRY_SECONDS = env.int('WEBHOOK_RETRY_SECONDS', default=30)
+
+# Polling of payments left open (missed webhooks); rate limits are provider requests per second
+PAYMENT_RECONCILIATION_AFTER_MINUTES = env.int('PAYMENT_RECONCILIATION_AFTER_MINUTES', default=15)
+PAYMENT_RECONCILIATION_BATCH_SIZE = env.int('PAYMENT_RECONCILIATION_BATCH_SIZE', default=500)
+PAYMENT_RECONCILIATION_WORKERS = env.int('PAYMENT_RECONCILIATION_WORKERS', default=8)
+PAYMENT_PROVIDER_DEFAULT_RATE_LIMIT = 10
+PAYMENT_PROVIDER_RATE_LIMITS = {
+    'stub': 100,
+}
+
+# Expiry of unpaid Pix/Boleto payments (cancels the order and returns its stock)
+PAYMENT_EXPIRY_GRACE_MINUTES = env.int('PAYMENT_EXPIRY_GRACE_MINUTES', default=10)
+PAYMENT_EXPIRY_BATCH_SIZE = env.int('PAYMENT_EXPIRY_BATCH_SIZE', default=200)
+PAYMENT_EXPIRY_MAX_BATCHES = env.int('PAYMENT_EXPIRY_MAX_BATCHES', default=20)
+
+# Idempotency-Key records (in flight while the request runs, then the stored response)
+IDEMPOTENCY_KEY_PREFIX = 'idempotency'
+IDEMPOTENCY_IN_FLIGHT_TTL_SECONDS = env.int('IDEMPOTENCY_IN_FLIGHT_TTL_SECONDS', default=60)
+IDEMPOTENCY_TTL_SECONDS = env.int('IDEMPOTENCY_TTL_SECONDS', default=24 * 60 * 60)
 
 # Cart settings
 CART_RESERVATION_TIMEOUT_MINUTES = env.int('CART_RESERVATION_TIMEOUT_MINUTES', default=15)
 CART_EXPIRY_DAYS = env.int('CART_EXPIRY_DAYS', default=30)
+CART_EXPIRY_EXTENSION_SLACK_MINUTES = env.int('CART_EXPIRY_EXTENSION_SLACK_MINUTES', default=60)
+# 'apply' updates stale cart price snapshots on read, 'flag' only reports them
+CART_PRICE_REVALIDATION_MODE = env('CART_PRICE_REVALIDATION_MODE', default='apply')
+CART_RESERVATION_QUEUE_KEY = 'cart:reservation_expiry'
+CART_RESERVATION_QUEUE_BATCH_SIZE = env.int('CART_RESERVATION_QUEUE_BATCH_SIZE', default=500)
+CART_RESERVATION_QUEUE_MAX_BATCHES = env.int('CART_RESERVATION_QUEUE_MAX_BATCHES', default=20)
+
+# Shipping (parcel weight estimate for quotes)
+SHIPPING_ITEM_WEIGHT_GRAMS = env.int('SHIPPING_ITEM_WEIGHT_GRAMS', default=5)
+SHIPPING_PACKAGE_WEIGHT_GRAMS = env.int('SHIPPING_PACKAGE_WEIGHT_GRAMS', default=100)
 
-# Payment providers
+# Monthly partitions of order tables (Postgres only)
+PARTITIONED_MODELS = ['orders.Order', 'orders.OrderItem', 'payments.PaymentTransaction']
+PARTITION_MONTHS_AHEAD = env.int('PARTITION_MONTHS_AHEAD', default=3)
+# Detach partitions older than this many months (0 keeps everything attached)
+PARTITION_RETENTION_MONTHS = env.int('PARTITION_RETENTION_MONTHS', default=0)
+
+# Payment providers: name -> backend class and its options. Instances are
+# created on first use and shared by the process (apps.payments.providers.registry)
+PAYMENT_PROVIDERS = {
+    'stub': {
+        'BACKEND': 'apps.payments.providers.stub.StubPaymentProvider',
+        'OPTIONS': {},
+    },
+}
+# Test providers (stub, fake) accept unsigned webhooks; only local settings enable them
+PAYMENT_ALLOW_TEST_PROVIDERS = False
+PAYMENT_DEFAULT_PROVIDER = env('PAYMENT_DEFAULT_PROVIDER', default='stub')
+# Payment method -> provider name, e.g. {'CREDIT_CARD': 'mercadopago'}
+PAYMENT_METHOD_PROVIDERS = {}
 MERCADOPAGO_ACCESS_TOKEN = env('MERCADOPAGO_ACCESS_TOKEN', default='')
 MERCADOPAGO_WEBHOOK_SECRET = env('MERCADOPAGO_WEBHOOK_SECRET', default='')
 
+# Pooled HTTP client shared by provider integrations (timeouts in seconds)
+PAYMENT_HTTP_TIMEOUT_SECONDS = env.float('PAYMENT_HTTP_TIMEOUT_SECONDS', default=10.0)
+PAYMENT_HTTP_CONNECT_TIMEOUT_SECONDS = env.float('PAYMENT_HTTP_CONNECT_TIMEOUT_SECONDS', default=3.0)
+PAYMENT_HTTP_MAX_CONNECTIONS = env.int('PAYMENT_HTTP_MAX_CONNECTIONS', default=20)
+PAYMENT_HTTP_KEEPALIVE_SECONDS = env.float('PAYMENT_HTTP_KEEPALIVE_SECONDS', default=60.0)
+PAYMENT_HTTP_MAX_RETRIES = env.int('PAYMENT_HTTP_MAX_RETRIES', default=2)
+PAYMENT_HTTP_BACKOFF_SECONDS = env.float('PAYMENT_HTTP_BACKOFF_SECONDS', default=0.2)
+
 # Email
 EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 DEFAULT_FROM_EMAIL = 'noreply@nomacardhouse.com'
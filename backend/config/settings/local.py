@@ -22,6 +22,16 @@ INTERNAL_IPS = [
     'localhost',
 ]
 
+# Test payment providers, including the local fake provider server
+# (`manage.py run_fake_provider`)
+PAYMENT_ALLOW_TEST_PROVIDERS = True
+FAKE_PROVIDER_URL = env('FAKE_PROVIDER_URL', default='http://127.0.0.1:8765')
+PAYMENT_PROVIDERS['fake'] = {
+    'BACKEND': 'apps.payments.providers.fake.FakeServerProvider',
+    'OPTIONS': {'base_url': FAKE_PROVIDER_URL},
+}
+PAYMENT_PROVIDER_RATE_LIMITS['fake'] = 50
+
 # Allow all origins in development
 CORS_ALLOW_ALL_ORIGINS = True
 
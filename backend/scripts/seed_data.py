@@ -11,6 +11,7 @@ django.setup()
 
 from apps.products.models import Product, SKU
 from apps.inventory.models import Inventory
+from apps.shipping.models import ShippingRate, ShippingZone
 
 
 def create_sample_products():
@@ -281,6 +282,35 @@ def set_inventory_levels():
         print(f"Set inventory for {sku_name}: {quantity} units")
 
 
+def create_shipping_zones():
+    """Create shipping zones by CEP range with weight brackets."""
+    ShippingZone.objects.all().delete()
+
+    zones = [
+        # name, cep_start, cep_end, delivery_days, prices for 300g / 1kg / 5kg
+        ("SP Capital", "01000000", "05999999", 2, (1200, 1800, 3500)),
+        ("SP Interior", "06000000", "19999999", 4, (1600, 2400, 4500)),
+        ("Sudeste", "20000000", "39999999", 5, (1900, 2900, 5500)),
+        ("Nordeste", "40000000", "65999999", 8, (2600, 3900, 7500)),
+        ("Norte", "66000000", "69999999", 10, (3200, 4800, 9000)),
+        ("Centro-Oeste", "70000000", "79999999", 7, (2400, 3600, 7000)),
+        ("Sul", "80000000", "99999999", 6, (2100, 3200, 6000)),
+    ]
+
+    for name, cep_start, cep_end, delivery_days, prices in zones:
+        zone = ShippingZone.objects.create(
+            name=name,
+            cep_start=cep_start,
+            cep_end=cep_end,
+            delivery_days=delivery_days,
+            ad_valorem_bps=100,
+            free_shipping_min_cents=50000,
+        )
+        for max_weight_grams, price_cents in zip((300, 1000, 5000), prices):
+            ShippingRate.objects.create(zone=zone, max_weight_grams=max_weight_grams, price_cents=price_cents)
+        print(f"Created shipping zone: {name} ({cep_start}-{cep_end})")
+
+
 if __name__ == '__main__':
     print("=" * 50)
     print("NOMA CARD HOUSE - SEED DATA SCRIPT")
@@ -296,6 +326,9 @@ if __name__ == '__main__':
     # Set inventory
     set_inventory_levels()
 
+    # Create shipping zones
+    create_shipping_zones()
+
     print("\n" + "=" * 50)
     print("SEED DATA COMPLETED SUCCESSFULLY")
     print("=" * 50)